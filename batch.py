@@ -0,0 +1,317 @@
+"""
+batch.py
+
+Headless batch runner: applies a filter chain to every image under a
+directory (or matching a glob) on a process pool, writing results into a
+mirrored output tree.
+
+Usage:
+    python batch.py photos/ out/ --chain gauss:5,median:3,sobel:3
+    python batch.py "photos/**/*.jpg" out/ --chain laplace --workers 8
+    python batch.py scans/ out/ --chain gauss:5 --tile 2048   # huge .npy/.tif/.raw
+    python batch.py huge.tif out/ --chain median:9 --workers 1 --threads auto
+    python batch.py photos/ out/ --chain median:5,sobel:3 --cache-dir /tmp/fcache
+    python batch.py scans16/ out/ --chain gauss:5,laplace --precision float32
+
+Results of decoded images are kept in a persistent cache keyed by the source
+pixels and the chain (filters/result_cache.py), so re-running a job only
+copies cached results; --no-cache turns it off.
+
+--trace run.jsonl records every filter call and chain of every worker
+(filters/trace.py); `python -m filters.trace run.jsonl run.json` turns it
+into a Chrome trace.
+
+--precision float32 runs every chain in float32 and rounds once at the end
+(filters/precision.py). Inputs are then decoded at their own bit depth, so
+16-bit PNG/TIFF stay 16-bit through the chain and are written as 16-bit
+where the output format allows it (PNG, TIFF); other formats get 8 bits.
+
+Chain syntax is described in filters/chain.py.
+"""
+
+from __future__ import annotations
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import cv2
+
+from filters import trace
+from filters.chain import parse_chain
+from filters.fuse import plan_chain
+from filters.parallel import run_chain_parallel
+from filters.precision import PRECISIONS, check_precision, quantize, run_chain_float
+from filters.result_cache import DiskCache
+from filters.tiled import process_file
+
+IMAGE_EXTS = {".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff"}
+# containers the tiled engine can memory-map
+TILED_EXTS = {".npy", ".raw", ".tif", ".tiff"}
+# outputs cv2.imwrite can store 16 bits per channel in
+DEPTH16_EXTS = {".png", ".tif", ".tiff"}
+
+
+# -------------------- Input discovery --------------------
+def _glob_root(pattern: str) -> Path:
+    """Longest leading directory of a glob pattern that holds no wildcards."""
+    parts = []
+    for part in Path(pattern).parts:
+        if any(c in part for c in "*?["):
+            break
+        parts.append(part)
+    return Path(*parts) if parts else Path(".")
+
+
+def collect_inputs(source: str, exts=IMAGE_EXTS) -> Tuple[Path, List[Path]]:
+    """
+    Resolve a directory or glob pattern to (root, image paths).
+    Output files are written at the same path relative to root.
+    """
+    src = Path(source)
+    if src.is_dir():
+        root = src
+        paths = [p for p in src.rglob("*") if p.suffix.lower() in exts]
+    else:
+        root = _glob_root(source)
+        paths = [
+            Path(p)
+            for p in glob.glob(source, recursive=True)
+            if Path(p).suffix.lower() in exts
+        ]
+    return root, sorted(p for p in paths if p.is_file())
+
+
+# -------------------- Worker side --------------------
+# one DiskCache per (root, size) and process, so its size estimate is reused
+_caches: Dict[Tuple[Optional[str], int], DiskCache] = {}
+
+
+def _result_cache(root: Optional[str], max_bytes: int) -> DiskCache:
+    cache = _caches.get((root, max_bytes))
+    if cache is None:
+        cache = _caches[root, max_bytes] = DiskCache(root, max_bytes)
+    return cache
+
+
+def _init_worker(threads=1, trace_path=None):
+    # one process per core already; stop OpenCV from spawning its own
+    # thread pool in every worker unless band threads were asked for
+    if threads == 1:
+        cv2.setNumThreads(1)
+    if trace_path:
+        # line-buffered appends, so workers can share one file
+        trace.add_sink(trace.JsonlSink(trace_path))
+
+
+def _process_one(
+    src: str,
+    dst: str,
+    chain_spec: str,
+    tile: Optional[int] = None,
+    raw_shape: Optional[Tuple[int, ...]] = None,
+    threads: Union[int, str] = 1,
+    cache: Optional[Tuple[Optional[str], int]] = None,
+    precision: str = "native",
+) -> Tuple[str, Optional[str]]:
+    """
+    Run the chain on one file. cache is (root, max_bytes) of the result
+    cache, or None to always compute. Returns (src, error message or None).
+    """
+    try:
+        if tile is not None:
+            process_file(
+                src, dst, parse_chain(chain_spec), tile=tile, shape=raw_shape, precision=precision
+            )
+            return src, None
+        native = precision == "native"
+        flags = cv2.IMREAD_COLOR if native else cv2.IMREAD_COLOR | cv2.IMREAD_ANYDEPTH
+        img = cv2.imread(src, flags)
+        if img is None:
+            return src, "could not decode image"
+        steps = parse_chain(chain_spec)
+        store = key = out = None
+        if cache is not None:
+            store = _result_cache(*cache)
+            key = store.key(img, steps, precision)
+            out = store.get(key)
+        if out is None:
+            start = time.perf_counter()
+            if native:
+                out = run_chain_parallel(img, plan_chain(steps), threads)
+            else:
+                out = run_chain_float(
+                    img, plan_chain(steps), run=lambda im, st: run_chain_parallel(im, st, threads)
+                )
+            if store is not None:
+                store.put(key, out, time.perf_counter() - start)
+        if out.dtype != np.uint8 and Path(dst).suffix.lower() not in DEPTH16_EXTS:
+            out = quantize(out, np.uint8)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        if not cv2.imwrite(dst, out):
+            return src, f"could not write {dst}"
+        return src, None
+    except Exception as e:
+        return src, str(e)
+
+
+# -------------------- Driver --------------------
+def run_batch(
+    source: str,
+    out_dir: str,
+    chain_spec: str,
+    *,
+    workers: Optional[int] = None,
+    overwrite: bool = True,
+    tile: Optional[int] = None,
+    raw_shape: Optional[Tuple[int, ...]] = None,
+    threads: Union[int, str] = 1,
+    cache: Optional[Tuple[Optional[str], int]] = (None, 2 * 2**30),
+    trace_path: Optional[str] = None,
+    precision: str = "native",
+) -> Tuple[int, List[Tuple[str, str]]]:
+    """
+    Process every image found by collect_inputs(source) into out_dir.
+    With tile set, inputs are memory-mapped containers processed by the
+    tiled engine (filters/tiled.py) instead of being decoded whole.
+    threads splits each decoded image into bands processed on that many
+    threads ("auto" measures the best count; see filters/parallel.py).
+    cache is (directory or None for the default, max bytes) of the result
+    cache consulted for decoded images, or None to disable it.
+    trace_path appends a JSON-lines trace of every filter call.
+    precision "float32" runs chains in float32 and decodes 16-bit inputs
+    as 16-bit (see filters/precision.py).
+    Returns (number processed, [(path, error), ...] for failures).
+    """
+    parse_chain(chain_spec)  # fail fast, before any worker starts
+    check_precision(precision)
+    root, paths = collect_inputs(source, TILED_EXTS if tile else IMAGE_EXTS)
+    out_root = Path(out_dir)
+
+    jobs = []
+    for p in paths:
+        dst = out_root / p.relative_to(root)
+        if not overwrite and dst.exists():
+            continue
+        jobs.append((str(p), str(dst)))
+
+    failures: List[Tuple[str, str]] = []
+    if not jobs:
+        return 0, failures
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(threads, trace_path)
+    ) as pool:
+        futures = [
+            pool.submit(_process_one, s, d, chain_spec, tile, raw_shape, threads, cache, precision)
+            for s, d in jobs
+        ]
+        for fut in as_completed(futures):
+            src, err = fut.result()
+            if err is not None:
+                failures.append((src, err))
+    return len(jobs), failures
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Apply a filter chain to a directory of images."
+    )
+    parser.add_argument("source", help="input directory or glob pattern")
+    parser.add_argument("output", help="output directory (input tree is mirrored)")
+    parser.add_argument(
+        "--chain", required=True, help="filter chain, e.g. gauss:5,median:3,sobel:3"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="worker processes (default: CPU count)"
+    )
+    parser.add_argument(
+        "--threads",
+        default="1",
+        help="band-parallel threads per image, or 'auto' (default: 1)",
+    )
+    parser.add_argument(
+        "--skip-existing", action="store_true", help="leave existing outputs untouched"
+    )
+    parser.add_argument(
+        "--tile",
+        type=int,
+        default=None,
+        help="process memory-mapped .npy/.tif/.raw inputs in tiles of this size",
+    )
+    parser.add_argument(
+        "--raw-shape", default=None, help="shape of .raw inputs as H,W[,C] (uint8)"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="result cache directory (default: $IMAGE_FILTER_CACHE or ~/.cache)",
+    )
+    parser.add_argument(
+        "--cache-size", type=int, default=2048, help="result cache budget in MiB (default: 2048)"
+    )
+    parser.add_argument("--no-cache", action="store_true", help="always recompute")
+    parser.add_argument(
+        "--trace", default=None, help="append a JSON-lines trace of every filter call to this file"
+    )
+    parser.add_argument(
+        "--precision",
+        choices=PRECISIONS,
+        default="native",
+        help="float32: run chains in float32, keep 16-bit inputs, round once (default: native)",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        parse_chain(args.chain)
+    except ValueError as e:
+        parser.error(str(e))
+    raw_shape = None
+    if args.raw_shape:
+        try:
+            raw_shape = tuple(int(v) for v in args.raw_shape.split(","))
+        except ValueError:
+            parser.error(f"bad --raw-shape {args.raw_shape!r}")
+    if args.tile is not None and args.tile < 1:
+        parser.error("--tile must be >= 1")
+    threads: Union[int, str] = args.threads
+    if threads != "auto":
+        try:
+            threads = int(threads)
+        except ValueError:
+            parser.error(f"bad --threads {args.threads!r}")
+        if threads < 1:
+            parser.error("--threads must be >= 1 or 'auto'")
+    if args.cache_size < 0:
+        parser.error("--cache-size must be >= 0")
+    cache = None if args.no_cache else (args.cache_dir, args.cache_size * 2**20)
+
+    start = time.perf_counter()
+    count, failures = run_batch(
+        args.source,
+        args.output,
+        args.chain,
+        workers=args.workers,
+        overwrite=not args.skip_existing,
+        tile=args.tile,
+        raw_shape=raw_shape,
+        threads=threads,
+        cache=cache,
+        trace_path=args.trace,
+        precision=args.precision,
+    )
+    elapsed = time.perf_counter() - start
+
+    for src, err in failures:
+        print(f"FAILED {src}: {err}", file=sys.stderr)
+    print(f"Processed {count} image(s), {len(failures)} failed, in {elapsed:.2f}s")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
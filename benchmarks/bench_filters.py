@@ -0,0 +1,394 @@
+"""
+bench_filters.py
+
+Benchmark every filter in filters.smooth, filters.sharp and filters.noise,
+plus the FilterSession Apply path, across image sizes, kernel sizes and
+grayscale vs BGR input. Results are written as JSON so two commits can be
+compared.
+
+Usage:
+    python -m benchmarks.bench_filters --out bench.json
+    python -m benchmarks.bench_filters --quick --filter "Median|Gaussian"
+    python -m benchmarks.bench_filters --compare old.json new.json
+
+Reported per case:
+    seconds          median wall time of one call
+    mpix_per_s       megapixels processed per second
+    peak_traced      peak bytes allocated through Python/NumPy (tracemalloc)
+    peak_rss         peak growth of process RSS while running (Linux only;
+                     includes OpenCV's own buffers, which tracemalloc misses)
+    frames_at_peak   peak_traced divided by the input size, i.e. how many
+                     full-frame buffers were alive at once
+    allocations      memory blocks (Python objects, NumPy buffers) the call
+                     allocated and left alive, result included: the sum of
+                     count_diff between tracemalloc snapshots before and
+                     after it
+
+The same descriptions are stored under "columns" in the JSON output.
+"""
+
+from __future__ import annotations
+import argparse
+import importlib
+import inspect
+import json
+import os
+import pkgutil
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import cv2
+
+from filters.chain import Step
+from filters.fuse import plan_chain
+from filters.smooth import gauss, mean, median
+from filters.sharp import sobel
+
+SIZES = (256, 512, 1024, 2048, 4096, 8192)
+KSIZES = (3, 5, 9, 15, 21)
+CHANNELS = (1, 3)
+QUICK_SIZES = (256, 1024)
+QUICK_KSIZES = (3, 9)
+CATEGORIES = ("filters.smooth", "filters.sharp", "filters.noise")
+# reported per case; written to the JSON header
+COLUMNS = {
+    "seconds": "median wall time of one call",
+    "mpix_per_s": "megapixels processed per second",
+    "peak_traced": "peak bytes allocated through Python/NumPy (tracemalloc)",
+    "peak_rss": "peak growth of process RSS while running (Linux only)",
+    "frames_at_peak": "peak_traced / input bytes: full-frame buffers alive at once",
+    "allocations": "blocks allocated by one call and alive after it, result included "
+    "(sum of tracemalloc count_diff)",
+}
+# tracemalloc's own bookkeeping, left out of the allocation count
+_SNAPSHOT_FILTERS = [tracemalloc.Filter(False, tracemalloc.__file__)]
+
+
+# -------------------- Discovery --------------------
+def discover_filters() -> List[Tuple[str, Callable]]:
+    """
+    (qualified name, function) for every public filter function: the
+    capitalised functions defined in the filters.* category modules.
+    """
+    found = []
+    for pkg_name in CATEGORIES:
+        pkg = importlib.import_module(pkg_name)
+        for info in pkgutil.iter_modules(pkg.__path__):
+            mod = importlib.import_module(f"{pkg_name}.{info.name}")
+            for name, obj in vars(mod).items():
+                if (
+                    inspect.isfunction(obj)
+                    and obj.__module__ == mod.__name__
+                    and name[:1].isupper()
+                ):
+                    found.append((f"{mod.__name__}.{name}", obj))
+    return sorted(found)
+
+
+def _param_grid(func: Callable, ksizes: Sequence[int]) -> List[Dict[str, Any]]:
+    params = inspect.signature(func).parameters
+    grid: List[Dict[str, Any]] = [{}]
+    if "ksize" in params:
+        grid = [{"ksize": k} for k in ksizes]
+    if "seed" in params:
+        grid = [dict(g, seed=0) for g in grid]
+    return grid
+
+
+def _session_chains(ksizes: Sequence[int]) -> List[Tuple[str, List[Step]]]:
+    """Representative chains for the FilterSession Apply path."""
+    chains = []
+    for k in ksizes:
+        chains.append(
+            (
+                f"gauss:{k},mean:{k},gauss:{k}",
+                [
+                    Step("gauss", gauss.Gaussian, {"ksize": k}),
+                    Step("mean", mean.Mean, {"ksize": k}),
+                    Step("gauss", gauss.Gaussian, {"ksize": k}),
+                ],
+            )
+        )
+        chains.append(
+            (
+                f"median:{k},sobel:3",
+                [
+                    Step("median", median.Median, {"ksize": k}),
+                    Step("sobel", sobel.Sobel, {"ksize": 3}),
+                ],
+            )
+        )
+    return chains
+
+
+# -------------------- Measurement --------------------
+def make_image(size: int, channels: int, seed: int = 0) -> np.ndarray:
+    """Deterministic, photo-like (not white-noise) uint8 test image."""
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 256, (max(size // 8, 2), max(size // 8, 2), channels), np.uint8)
+    img = cv2.resize(small, (size, size), interpolation=cv2.INTER_CUBIC)
+    img = img.reshape(size, size, channels)
+    return img[:, :, 0].copy() if channels == 1 else img
+
+
+class _RssSampler:
+    """Samples /proc/self/statm in a thread to find peak RSS growth."""
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.peak = 0
+        self._base = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._page = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+    def _rss(self) -> Optional[int]:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * self._page
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def __enter__(self):
+        base = self._rss()
+        if base is None:
+            return self
+        self._base = base
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = self._rss()
+            if rss is not None:
+                self.peak = max(self.peak, rss - self._base)
+            self._stop.wait(self.interval)
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    @property
+    def available(self) -> bool:
+        return self._thread is not None
+
+
+def measure(
+    fn: Callable[[], Any], *, repeats: int = 5, min_time: float = 0.2
+) -> Dict[str, Any]:
+    """Time fn (median of at least `repeats` calls) and record its memory peaks."""
+    fn()  # warm-up: first-call costs (imports, OpenCV dispatch) are not the filter's
+
+    tracemalloc.start()
+    with _RssSampler() as rss:
+        # snapshots inside the sampler, so its thread is not counted
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        result = fn()
+        _, peak_traced = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    diff = after.filter_traces(_SNAPSHOT_FILTERS).compare_to(
+        before.filter_traces(_SNAPSHOT_FILTERS), "filename"
+    )
+    allocations = sum(max(0, stat.count_diff) for stat in diff)
+    del before, after, diff, result
+
+    times = []
+    start = time.perf_counter()
+    while len(times) < repeats or (time.perf_counter() - start) < min_time:
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+        if len(times) >= 1000:
+            break
+    return {
+        "seconds": statistics.median(times),
+        "repeats": len(times),
+        "peak_traced": peak_traced,
+        "peak_rss": rss.peak if rss.available else None,
+        "allocations": allocations,
+    }
+
+
+# -------------------- Runner --------------------
+def iter_cases(
+    ksizes: Sequence[int], pattern: Optional[str]
+) -> Iterator[Tuple[str, Dict[str, Any], Callable[[np.ndarray], Callable[[], Any]]]]:
+    """
+    (name, params, prepare) for every filter and session chain, where
+    prepare(img) does any untimed setup and returns the call to time.
+    """
+    regex = re.compile(pattern) if pattern else None
+    for name, func in discover_filters():
+        if regex and not regex.search(name):
+            continue
+        for params in _param_grid(func, ksizes):
+            yield name, params, (lambda img, f=func, p=params: lambda: f(img, **p))
+
+    session_name = "FilterSession.apply"
+    if regex and not regex.search(session_name):
+        return
+    from pages.assets.filter_toolkit import FilterSession  # needs tkinter only
+
+    for spec, chain in _session_chains(ksizes):
+
+        def prepare(img, chain=chain):
+            sess = FilterSession(None, [], img, prerender_full=False)
+            # the same worker-side call _on_apply submits (without the cache)
+            return lambda: sess._run_steps(
+                sess._generation, sess.base_full.copy(), plan_chain(chain), False, True
+            )
+
+        yield session_name, {"chain": spec}, prepare
+
+
+def run_benchmarks(
+    sizes: Sequence[int] = SIZES,
+    ksizes: Sequence[int] = KSIZES,
+    channels: Sequence[int] = CHANNELS,
+    pattern: Optional[str] = None,
+    repeats: int = 5,
+    verbose: bool = True,
+) -> List[Dict[str, Any]]:
+    cases = list(iter_cases(ksizes, pattern))
+    results = []
+    for size in sizes:
+        for ch in channels:
+            img = make_image(size, ch)
+            for name, params, prepare in cases:
+                row: Dict[str, Any] = {
+                    "filter": name,
+                    "params": params,
+                    "size": size,
+                    "channels": ch,
+                    "dtype": str(img.dtype),
+                }
+                try:
+                    row.update(measure(prepare(img), repeats=repeats))
+                    row["mpix_per_s"] = (size * size / 1e6) / row["seconds"]
+                    row["frames_at_peak"] = row["peak_traced"] / img.nbytes
+                    row["error"] = None
+                except Exception as e:  # e.g. Sobel on a 1-channel image
+                    if tracemalloc.is_tracing():
+                        tracemalloc.stop()
+                    row["error"] = f"{type(e).__name__}: {e}"
+                results.append(row)
+                if verbose:
+                    print(_format_row(row), flush=True)
+    return results
+
+
+def _format_row(row: Dict[str, Any]) -> str:
+    params = ",".join(f"{k}={v}" for k, v in row["params"].items())
+    head = f"{row['filter']:<45} {params:<28} {row['size']:>5}px c{row['channels']}"
+    if row["error"]:
+        return f"{head}  ERROR {row['error']}"
+    return (
+        f"{head}  {row['seconds'] * 1e3:9.2f} ms  {row['mpix_per_s']:9.1f} MPix/s"
+        f"  peak {row['peak_traced'] / 2**20:8.1f} MiB ({row['frames_at_peak']:.1f} frames)"
+        f"  {row['allocations']:6d} allocs"
+    )
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "opencv_threads": cv2.getNumThreads(),
+        "cpus": os.cpu_count(),
+        "machine": platform.machine(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+# -------------------- Comparison --------------------
+def _case_key(row: Dict[str, Any]) -> Tuple:
+    return (row["filter"], json.dumps(row["params"], sort_keys=True), row["size"], row["channels"])
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], threshold: float = 0.10) -> int:
+    """Print per-case speed ratios; returns the number of regressions."""
+    before = {_case_key(r): r for r in old["results"] if not r["error"]}
+    regressions = 0
+    for row in new["results"]:
+        prev = before.get(_case_key(row))
+        if prev is None or row["error"]:
+            continue
+        ratio = prev["seconds"] / row["seconds"]  # > 1 means faster now
+        flag = ""
+        if ratio < 1.0 - threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif ratio > 1.0 + threshold:
+            flag = "  faster"
+        params = ",".join(f"{k}={v}" for k, v in row["params"].items())
+        print(
+            f"{row['filter']:<45} {params:<28} {row['size']:>5}px c{row['channels']}"
+            f"  x{ratio:5.2f}{flag}"
+        )
+    print(
+        f"{regressions} regression(s) beyond {threshold:.0%} "
+        f"({old['environment'].get('commit')} -> {new['environment'].get('commit')})"
+    )
+    return regressions
+
+
+def _int_list(text: str) -> List[int]:
+    return [int(v) for v in text.split(",") if v.strip()]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the image filters.")
+    parser.add_argument("--out", default="bench.json", help="JSON results file")
+    parser.add_argument("--sizes", type=_int_list, default=None, help="e.g. 256,1024,8192")
+    parser.add_argument("--ksizes", type=_int_list, default=None, help="e.g. 3,9,21")
+    parser.add_argument("--channels", type=_int_list, default=list(CHANNELS))
+    parser.add_argument("--filter", default=None, help="regex on filter names")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--quick", action="store_true", help="small sizes/kernels only")
+    parser.add_argument(
+        "--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files"
+    )
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            old = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        return 1 if compare(old, new, args.threshold) else 0
+
+    sizes = args.sizes or (QUICK_SIZES if args.quick else SIZES)
+    ksizes = args.ksizes or (QUICK_KSIZES if args.quick else KSIZES)
+    results = run_benchmarks(sizes, ksizes, args.channels, args.filter, args.repeats)
+    with open(args.out, "w") as f:
+        json.dump({"environment": environment(), "columns": COLUMNS, "results": results}, f, indent=1)
+    print(f"Wrote {len(results)} result(s) to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
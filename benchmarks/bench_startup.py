@@ -0,0 +1,178 @@
+"""
+bench_startup.py
+
+Startup benchmark: how long importing an entry point takes, which modules
+dominate, and whether any heavy module is loaded before it is needed.
+
+Each run imports the module in a fresh interpreter under `python -X
+importtime` and parses its report. The median over --runs is compared with
+--budget-ms and the modules that must stay lazy (--forbid) are checked, so
+the exit code can gate CI: 0 within budget, 1 otherwise.
+
+main.py only imports tkinter and the page registry (pages/__init__.py) at
+startup; OpenCV, NumPy, PIL and the filters load on first use or in the
+background after the window is shown. The default budget keeps it that way.
+
+Usage:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --module main --budget-ms 120 --top 20
+    python -m benchmarks.bench_startup --module pages.Smooth --budget-ms 0 --forbid ""
+    python -m benchmarks.bench_startup --json startup.json
+
+Reported:
+    cumulative_ms    time to import the module, imports it triggers included
+                     (median over runs)
+    modules          number of modules it loaded
+    top              modules with the largest self time (own code, excluding
+                     their imports)
+    forbidden        heavy modules that were imported although they should
+                     load lazily
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODULE = "main"
+DEFAULT_BUDGET_MS = 100.0
+# must not be imported while the main window starts up
+HEAVY = ("cv2", "numpy", "PIL", "pandas", "matplotlib", "seaborn", "PySimpleGUI", "tifffile")
+
+# "import time:       123 |        456 |   package.module"
+_LINE = re.compile(r"^import time:\s*(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)\s*$")
+
+
+def parse_importtime(report: str) -> List[Tuple[str, int, int, int]]:
+    """(module, self_us, cumulative_us, depth) per line of an -X importtime report."""
+    rows = []
+    for line in report.splitlines():
+        m = _LINE.match(line)
+        if m:
+            self_us, cum_us, indent, name = m.groups()
+            rows.append((name, int(self_us), int(cum_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def import_once(module: str, python: str = sys.executable) -> List[Tuple[str, int, int, int]]:
+    """Import module in a fresh interpreter and return its parsed importtime report."""
+    proc = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1"),
+    )
+    if proc.returncode != 0:
+        errors = [l for l in proc.stderr.splitlines() if not l.startswith("import time:")]
+        raise RuntimeError(f"importing {module} failed:\n" + "\n".join(errors[-10:]))
+    return parse_importtime(proc.stderr)
+
+
+def measure(module: str, runs: int = 5, top: int = 15) -> Dict[str, Any]:
+    """Median import time of module over runs, with its slowest modules."""
+    if runs < 1:
+        raise ValueError(f"runs must be >= 1, got {runs}")
+    samples = []
+    for _ in range(runs):
+        rows = import_once(module)
+        # the module's own line comes last among the top-level entries
+        cumulative = next((cum for name, _, cum, depth in rows if name == module and depth == 0), None)
+        if cumulative is None:
+            raise RuntimeError(f"{module} was already imported at interpreter startup")
+        samples.append((cumulative, rows))
+    samples.sort(key=lambda s: s[0])
+    cumulative, rows = samples[len(samples) // 2]
+    loaded = {name for name, _, _, _ in rows}
+    slowest = sorted(rows, key=lambda r: r[1], reverse=True)[:top]
+    return {
+        "module": module,
+        "runs": runs,
+        "cumulative_ms": cumulative / 1e3,
+        "min_ms": samples[0][0] / 1e3,
+        "max_ms": samples[-1][0] / 1e3,
+        "modules": len(rows),
+        "loaded": sorted(loaded),
+        "top": [{"module": name, "self_ms": s / 1e3, "cumulative_ms": c / 1e3} for name, s, c, _ in slowest],
+    }
+
+
+def check(result: Dict[str, Any], budget_ms: float, forbid: Sequence[str]) -> List[str]:
+    """Reasons the result fails the budget (empty when it passes)."""
+    problems = []
+    if budget_ms > 0 and result["cumulative_ms"] > budget_ms:
+        problems.append(
+            f"importing {result['module']} took {result['cumulative_ms']:.1f} ms "
+            f"(budget {budget_ms:.0f} ms)"
+        )
+    loaded = set(result["loaded"])
+    for name in forbid:
+        if name in loaded:
+            problems.append(f"{result['module']} imports {name} at startup; load it on first use")
+    return problems
+
+
+def report(result: Dict[str, Any]):
+    print(
+        f"{result['module']}: {result['cumulative_ms']:.1f} ms "
+        f"(median of {result['runs']}, {result['min_ms']:.1f}..{result['max_ms']:.1f}), "
+        f"{result['modules']} module(s)"
+    )
+    print(f"  {'self ms':>8} {'cum ms':>8}  module")
+    for row in result["top"]:
+        print(f"  {row['self_ms']:8.2f} {row['cumulative_ms']:8.2f}  {row['module']}")
+
+
+def _names(text: str) -> List[str]:
+    return [n.strip() for n in text.split(",") if n.strip()]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure and budget the import time of entry points.")
+    parser.add_argument(
+        "--module", action="append", default=None, help=f"module to import (repeatable; default: {DEFAULT_MODULE})"
+    )
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=DEFAULT_BUDGET_MS,
+        help=f"max median import time per module, 0 for none (default: {DEFAULT_BUDGET_MS:.0f})",
+    )
+    parser.add_argument(
+        "--forbid",
+        type=_names,
+        default=list(HEAVY),
+        help="comma-separated modules that must not be imported (default: %(default)s)",
+    )
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per module (default: 5)")
+    parser.add_argument("--top", type=int, default=15, help="slowest modules to list (default: 15)")
+    parser.add_argument("--json", default=None, help="also write the results to this file")
+    args = parser.parse_args(argv)
+    if args.runs < 1:
+        parser.error("--runs must be >= 1")
+
+    results, problems = [], []
+    for module in args.module or [DEFAULT_MODULE]:
+        try:
+            result = measure(module, args.runs, args.top)
+        except RuntimeError as e:
+            print(f"FAILED: {e}", file=sys.stderr)
+            return 1
+        report(result)
+        results.append(result)
+        problems += check(result, args.budget_ms, args.forbid)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"python": sys.version, "budget_ms": args.budget_ms, "results": results}, f, indent=1)
+    for problem in problems:
+        print(f"OVER BUDGET: {problem}", file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,454 @@
+"""
+augment.py
+
+Batched augmentation: applies registered filters to stacks of same-shaped
+images (N x H x W [x C]) with random parameters drawn per sample, e.g. to
+generate degraded copies for training denoisers.
+
+An augmentation is a list of Ops. Each op names a registered filter
+(filters/registry.py), gives every parameter a distribution, and has a
+probability of being applied to a sample:
+
+    Op("salt_and_pepper", salt_prob=Uniform(0.01, 0.2), pepper_prob=Uniform(0.0, 0.1))
+    Op("median", ksize=Choice([3, 5, 7]), p=0.5)
+
+Parameters without a distribution keep the filter's default. Noise seeds are
+drawn from the Augmenter's generator, so a run is reproducible for a seed.
+
+Samples that drew the same parameters are processed together: pointwise
+filters (kernel radius 0: all the noise models) run once on the whole group
+viewed as one tall image, spatial filters once per image. Constant
+parameters therefore cost one call per chunk.
+
+Op specs can also be written as text, in the chain syntax with a
+distribution per argument and an optional probability:
+
+    "salt_and_pepper:0.01..0.2:0..0.1"     # uniform ranges
+    "median:3|5|7@0.5"                     # choice, applied to half the samples
+    "gaussian_noise:~1..50"                # log-uniform
+
+Exports:
+    - Const(value), Uniform(lo, hi), LogUniform(lo, hi), Choice(values, p=None)
+    - Op(name, p=1.0, **distributions), parse_op(text), parse_ops(spec)
+    - Augmenter(ops, seed=None)            # .apply(batch) -> (out, params)
+    - iter_chunks(images, chunk)           # ndarray stack or iterator
+    - chunk_size(sample_shape, dtype, memory_bytes)
+    - augment_to_shards(images, ops, out_dir, *, fmt="npz", ...)
+"""
+
+from __future__ import annotations
+import json
+import math
+import os
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+import numpy as np
+
+from filters.chain import Step
+from filters.registry import FilterSpec, lookup
+
+ArrayLike = np.ndarray
+Images = Union[ArrayLike, Iterable[ArrayLike]]
+
+# chunk buffers per sample in flight: input, output and one temporary
+_BUFFERS_PER_SAMPLE = 3
+SHARD_FORMATS = ("npy", "npz")
+
+
+# -------------------- Distributions --------------------
+class Const:
+    """Always value."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def sample(self, rng: np.random.Generator, n: int) -> ArrayLike:
+        return np.full(n, self.value)
+
+    def __repr__(self) -> str:
+        return f"Const({self.value!r})"
+
+
+class Uniform:
+    """
+    Uniform on [lo, hi]; integers (both ends included) with integer=True.
+    integer=None follows the parameter an Op binds it to (Param.kind).
+    """
+
+    __slots__ = ("lo", "hi", "integer")
+
+    def __init__(self, lo, hi, integer: Optional[bool] = None):
+        if hi < lo:
+            raise ValueError(f"Uniform needs lo <= hi, got {lo}, {hi}")
+        if integer and math.ceil(lo) > math.floor(hi):
+            raise ValueError(f"Uniform({lo}, {hi}) contains no integer")
+        self.lo = lo
+        self.hi = hi
+        self.integer = integer
+
+    def sample(self, rng: np.random.Generator, n: int) -> ArrayLike:
+        if self.integer:
+            return rng.integers(math.ceil(self.lo), math.floor(self.hi), size=n, endpoint=True)
+        return rng.uniform(self.lo, self.hi, size=n)
+
+    def __repr__(self) -> str:
+        return f"Uniform({self.lo!r}, {self.hi!r})"
+
+
+class LogUniform:
+    """Log-uniform on [lo, hi] (both > 0): every decade equally likely."""
+
+    __slots__ = ("lo", "hi")
+
+    def __init__(self, lo: float, hi: float):
+        if not 0 < lo <= hi:
+            raise ValueError(f"LogUniform needs 0 < lo <= hi, got {lo}, {hi}")
+        self.lo = float(lo)
+        self.hi = float(hi)
+
+    def sample(self, rng: np.random.Generator, n: int) -> ArrayLike:
+        return np.exp(rng.uniform(np.log(self.lo), np.log(self.hi), size=n))
+
+    def __repr__(self) -> str:
+        return f"LogUniform({self.lo!r}, {self.hi!r})"
+
+
+class Choice:
+    """One of values, with probabilities p (default: equally likely)."""
+
+    __slots__ = ("values", "p")
+
+    def __init__(self, values: Sequence[Any], p: Optional[Sequence[float]] = None):
+        if not len(values):
+            raise ValueError("Choice needs at least one value")
+        if p is not None and len(p) != len(values):
+            raise ValueError("Choice needs one probability per value")
+        self.values = list(values)
+        self.p = None if p is None else np.asarray(p, dtype=np.float64) / np.sum(p)
+
+    def sample(self, rng: np.random.Generator, n: int) -> ArrayLike:
+        idx = rng.choice(len(self.values), size=n, p=self.p)
+        return np.asarray(self.values, dtype=object)[idx]
+
+    def __repr__(self) -> str:
+        return f"Choice({self.values!r})"
+
+
+Distribution = Union[Const, Uniform, LogUniform, Choice]
+
+
+def _number(text: str):
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def _value(text: str):
+    try:
+        return _number(text)
+    except ValueError:
+        return text  # e.g. a method name
+
+
+def parse_distribution(text: str) -> Distribution:
+    """'a..b' uniform, '~a..b' log-uniform, 'a|b|c' choice, else a constant."""
+    text = text.strip()
+    try:
+        if "|" in text:
+            return Choice([_value(v) for v in text.split("|")])
+        if ".." in text:
+            log = text.startswith("~")
+            lo, hi = (_number(v) for v in text.lstrip("~").split("..", 1))
+            return LogUniform(lo, hi) if log else Uniform(lo, hi)
+    except ValueError as e:
+        raise ValueError(f"Bad distribution {text!r}: {e}") from None
+    return Const(text)
+
+
+# -------------------- Ops --------------------
+def _bind(dist, kind: str) -> Distribution:
+    """dist for a parameter of this Param.kind (ranges of ints draw integers)."""
+    if not hasattr(dist, "sample"):
+        return Const(dist)
+    if isinstance(dist, Uniform) and dist.integer is None:
+        return Uniform(dist.lo, dist.hi, integer=kind == "int")
+    return dist
+
+
+class Op:
+    """A registered filter with a distribution per parameter, applied with probability p."""
+
+    __slots__ = ("spec", "dists", "p")
+
+    def __init__(self, name: str, p: float = 1.0, **dists):
+        self.spec: FilterSpec = lookup(name)
+        names = {param.name for param in self.spec.params}
+        for key in dists:
+            if key not in names:
+                raise ValueError(f"Filter '{name}' has no parameter '{key}'")
+            if key == "seed":
+                raise ValueError("seeds are drawn by the Augmenter; set Augmenter(seed=...)")
+        if not 0.0 <= p <= 1.0:
+            raise ValueError(f"p must be within [0, 1], got {p}")
+        kinds = {param.name: param.kind for param in self.spec.params}
+        self.dists: Dict[str, Distribution] = {
+            k: _bind(d, kinds[k]) for k, d in dists.items()
+        }
+        self.p = float(p)
+
+    @property
+    def name(self) -> str:
+        return self.spec.name
+
+    def sample(self, rng: np.random.Generator, n: int) -> Dict[str, List[Any]]:
+        """n validated values per parameter that has a distribution."""
+        out = {}
+        for param in self.spec.params:
+            dist = self.dists.get(param.name)
+            if dist is None:
+                continue
+            values = dist.sample(rng, n)
+            try:
+                # the chain converters validate (and round even ksizes up)
+                out[param.name] = [param.convert(str(v)) for v in values.tolist()]
+            except ValueError as e:
+                raise ValueError(f"Bad value for '{self.name}' {param.name}: {e}") from None
+        return out
+
+    def __repr__(self) -> str:
+        args = ", ".join(f"{k}={d!r}" for k, d in self.dists.items())
+        return f"Op({self.name!r}, p={self.p}{', ' if args else ''}{args})"
+
+
+def parse_op(text: str) -> Op:
+    """Parse 'name[:dist...][@p]' (see the module docstring)."""
+    text, _, prob = text.strip().partition("@")
+    name, *args = [a.strip() for a in text.split(":")]
+    spec = lookup(name)
+    asked = [param for param in spec.params if param.name != "seed"]
+    if len(args) > len(asked):
+        raise ValueError(f"Filter '{name}' takes at most {len(asked)} argument(s), got {len(args)}")
+    dists = {param.name: parse_distribution(raw) for param, raw in zip(asked, args) if raw}
+    try:
+        p = float(prob) if prob else 1.0
+    except ValueError:
+        raise ValueError(f"Bad probability {prob!r} in {text!r}") from None
+    return Op(name, p, **dists)
+
+
+def parse_ops(spec: str) -> List[Op]:
+    ops = [parse_op(part) for part in spec.split(",") if part.strip()]
+    if not ops:
+        raise ValueError("augmentation is empty")
+    return ops
+
+
+# -------------------- Engine --------------------
+class Augmenter:
+    """Applies ops in order to batches, drawing parameters per sample."""
+
+    def __init__(self, ops: Sequence[Op], seed=None):
+        if not ops:
+            raise ValueError("no ops given")
+        self.ops = list(ops)
+        self.rng = np.random.default_rng(seed)
+
+    def apply(self, batch: ArrayLike) -> Tuple[ArrayLike, Dict[str, ArrayLike]]:
+        """
+        Augment an N x H x W [x C] batch into a new array. Returns it with
+        the parameters used: "op{i}_{name}_applied" (bool) and
+        "op{i}_{name}_{param}" per sample (the default where not applied).
+        """
+        if batch.ndim not in (3, 4):
+            raise ValueError(f"expected an N x H x W [x C] batch, got shape {batch.shape}")
+        out = np.array(batch, copy=True, order="C")
+        n = out.shape[0]
+        record: Dict[str, ArrayLike] = {}
+        for i, op in enumerate(self.ops):
+            prefix = f"op{i}_{op.name}"
+            applied = self.rng.random(n) < op.p
+            values = op.sample(self.rng, n)
+            record[prefix + "_applied"] = applied
+            defaults = op.spec.defaults()
+            for name, vals in values.items():
+                col = np.asarray(vals)
+                col[~applied] = defaults[name] if defaults[name] is not None else 0
+                record[f"{prefix}_{name}"] = col
+            groups: Dict[tuple, List[int]] = {}
+            for j in np.flatnonzero(applied).tolist():
+                key = tuple(vals[j] for vals in values.values())
+                groups.setdefault(key, []).append(j)
+            for key, idx in groups.items():
+                params = dict(zip(values, key))
+                if any(p.name == "seed" for p in op.spec.params):
+                    params["seed"] = int(self.rng.integers(2**63))
+                self._run_group(out, idx, Step(op.name, op.spec.func, params), op.spec)
+        return out, record
+
+    @staticmethod
+    def _run_group(out: ArrayLike, idx: List[int], step: Step, spec: FilterSpec):
+        n, h = len(idx), out.shape[1]
+        radius = None if spec.radius is None else spec.radius(**step.params)
+        if radius == 0:
+            # pointwise: the whole group as one (n*H) x W image
+            sel = slice(None) if n == out.shape[0] else idx
+            sub = out[sel]
+            res = step(sub.reshape((n * h,) + sub.shape[2:]))
+            out[sel] = res.reshape(sub.shape)
+            return
+        for j in idx:
+            out[j] = step(out[j])
+
+
+# -------------------- Chunked input --------------------
+def chunk_size(sample_shape: Sequence[int], dtype, memory_bytes: int) -> int:
+    """Samples per chunk so the chunk's buffers fit in memory_bytes."""
+    per_sample = int(np.prod(sample_shape)) * np.dtype(dtype).itemsize * _BUFFERS_PER_SAMPLE
+    return max(1, memory_bytes // max(1, per_sample))
+
+
+def iter_chunks(images: Images, chunk: int) -> Iterator[ArrayLike]:
+    """
+    Batches of at most chunk samples. An ndarray (memory-mapped ones
+    included) is sliced without copying; other iterables are gathered into
+    one reused buffer, so each batch is only valid until the next.
+    """
+    if chunk < 1:
+        raise ValueError(f"chunk must be >= 1, got {chunk}")
+    if isinstance(images, np.ndarray):
+        for i in range(0, images.shape[0], chunk):
+            yield images[i : i + chunk]
+        return
+    buf: Optional[ArrayLike] = None
+    n = 0
+    for img in images:
+        img = np.asarray(img)
+        if buf is None:
+            buf = np.empty((chunk,) + img.shape, dtype=img.dtype)
+        elif img.shape != buf.shape[1:] or img.dtype != buf.dtype:
+            raise ValueError(
+                f"all images must have the same shape and dtype; got {img.shape} {img.dtype} "
+                f"after {buf.shape[1:]} {buf.dtype}"
+            )
+        buf[n] = img
+        n += 1
+        if n == chunk:
+            yield buf
+            n = 0
+    if n:
+        yield buf[:n]
+
+
+def _peek(images: Images) -> Tuple[ArrayLike, Images]:
+    """First sample and an equivalent images (the iterator is not consumed)."""
+    if isinstance(images, np.ndarray):
+        if images.shape[0] == 0:
+            raise ValueError("no images given")
+        return images[0], images
+    it = iter(images)
+    try:
+        first = np.asarray(next(it))
+    except StopIteration:
+        raise ValueError("no images given") from None
+
+    def chained():
+        yield first
+        yield from it
+
+    return first, chained()
+
+
+# -------------------- Sharded output --------------------
+def augment_to_shards(
+    images: Images,
+    ops: Sequence[Op],
+    out_dir: str,
+    *,
+    fmt: str = "npz",
+    shard_size: Optional[int] = None,
+    memory_bytes: int = 512 * 2**20,
+    seed=None,
+    copies: int = 1,
+) -> Dict[str, Any]:
+    """
+    Augment images (a stacked array or an iterator of same-shaped images)
+    copies times and write the results as shards of at most shard_size
+    samples (default: whatever fits memory_bytes). Shards go chunk by
+    chunk, each chunk's copies one after the other; every shard's entry in
+    the index gives the first source image ("start") and the copy number:
+
+        npz   shard_00000.npz with "images" and the per-sample parameters
+        npy   shard_00000.npy images, parameters in shard_00000_params.npz
+
+    plus index.json describing the run. Returns that index, which includes
+    the throughput in images per second.
+    """
+    if fmt not in SHARD_FORMATS:
+        raise ValueError(f"fmt must be one of {SHARD_FORMATS}, got {fmt!r}")
+    if copies < 1:
+        raise ValueError(f"copies must be >= 1, got {copies}")
+    first, images = _peek(images)
+    chunk = chunk_size(first.shape, first.dtype, memory_bytes)
+    if shard_size is not None:
+        if shard_size < 1:
+            raise ValueError(f"shard_size must be >= 1, got {shard_size}")
+        chunk = min(chunk, shard_size)
+
+    os.makedirs(out_dir, exist_ok=True)
+    aug = Augmenter(ops, seed)
+    shards: List[Dict[str, Any]] = []
+    total = 0
+    start = time.perf_counter()
+    offset = 0
+    for batch in iter_chunks(images, chunk):
+        # every copy of a chunk is made while it is in memory, so iterators
+        # are read once and never gathered whole
+        for copy in range(copies):
+            out, record = aug.apply(batch)
+            name = f"shard_{len(shards):05d}"
+            if fmt == "npz":
+                np.savez(os.path.join(out_dir, name + ".npz"), images=out, **record)
+                files = [name + ".npz"]
+            else:
+                np.save(os.path.join(out_dir, name + ".npy"), out)
+                np.savez(os.path.join(out_dir, name + "_params.npz"), **record)
+                files = [name + ".npy", name + "_params.npz"]
+            shards.append(
+                {"files": files, "count": int(out.shape[0]), "start": offset, "copy": copy}
+            )
+            total += out.shape[0]
+        offset += batch.shape[0]
+    elapsed = time.perf_counter() - start
+
+    index = {
+        "ops": [repr(op) for op in ops],
+        "seed": seed,
+        "sample_shape": list(first.shape),
+        "dtype": first.dtype.name,
+        "count": total,
+        "shards": shards,
+        "seconds": elapsed,
+        "images_per_s": total / elapsed if elapsed > 0 else None,
+    }
+    with open(os.path.join(out_dir, "index.json"), "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    return index
+
+
+__all__ = [
+    "Const",
+    "Uniform",
+    "LogUniform",
+    "Choice",
+    "parse_distribution",
+    "Op",
+    "parse_op",
+    "parse_ops",
+    "Augmenter",
+    "chunk_size",
+    "iter_chunks",
+    "augment_to_shards",
+]
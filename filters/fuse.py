@@ -0,0 +1,140 @@
+"""
+fuse.py
+
+Filter-chain planner that collapses consecutive linear filters into a single
+convolution, so e.g. Gaussian -> Mean -> Gaussian costs one pass over the
+image instead of three.
+
+Exports:
+    - plan_chain(steps) -> List[callable]   # steps with linear runs fused
+    - FusedStep                             # one pre-composed convolution
+
+A step is fusable when it is a bound Step (see filters/chain.py) or a bare
+filter function whose registry entry declares a kernel (see
+filters/registry.py) for the step's params. Kernels are
+composed by convolving them with each other; if every kernel in a run is
+separable the result is applied with cv2.sepFilter2D, otherwise with
+cv2.filter2D. Anything else (median, min/max, Sobel, Prewitt, noise, user
+lambdas) runs on its own as before.
+
+Only convex kernels (non-negative weights, e.g. blurs) are chained freely:
+their output never leaves 0..255, so skipping the intermediate uint8
+rounding does not change what later steps see. A kernel with negative
+weights (Laplacian sharpening) clips, so it may only close a run.
+Results match the unfused chain up to rounding, and up to the border
+reflection of the composed kernel in a band of kernel-radius pixels.
+"""
+
+from __future__ import annotations
+from typing import Callable, List, Optional, Sequence, Tuple
+import numpy as np
+import cv2
+
+from filters.chain import Step
+from filters.registry import Kernel, spec_for
+
+ArrayLike = np.ndarray
+FilterFunc = Callable[[ArrayLike], ArrayLike]
+
+
+def _step_kernel(step: FilterFunc) -> Optional[Kernel]:
+    """Kernel of a step, or None if the step is not a known linear filter."""
+    if isinstance(step, Step):
+        func, params = step.func, step.params
+    else:
+        func, params = step, {}
+    spec = spec_for(func)
+    if spec is None:
+        return None
+    return spec.linear_kernel(**params)
+
+
+def _is_convex(kernel: Kernel) -> bool:
+    kx, ky = kernel
+    if ky is None:
+        return bool((kx >= 0).all())
+    return bool((kx >= 0).all() and (ky >= 0).all())
+
+
+# -------------------- Kernel composition --------------------
+def _conv2d_full(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Full 2D convolution of two small kernels."""
+    out = np.zeros((a.shape[0] + b.shape[0] - 1, a.shape[1] + b.shape[1] - 1))
+    for (i, j), w in np.ndenumerate(b):
+        if w:
+            out[i : i + a.shape[0], j : j + a.shape[1]] += w * a
+    return out
+
+
+def _as_2d(kernel: Kernel) -> np.ndarray:
+    kx, ky = kernel
+    return kx if ky is None else np.outer(ky, kx)
+
+
+def compose_kernels(kernels: Sequence[Kernel]) -> Kernel:
+    """Compose kernels applied in sequence into one equivalent kernel."""
+    if all(ky is not None for _, ky in kernels):
+        kx, ky = kernels[0]
+        for nx, ny in kernels[1:]:
+            kx = np.convolve(kx, nx)
+            ky = np.convolve(ky, ny)
+        return kx, ky
+    k2 = _as_2d(kernels[0])
+    for k in kernels[1:]:
+        k2 = _conv2d_full(k2, _as_2d(k))
+    return k2, None
+
+
+class FusedStep:
+    """Several linear steps pre-composed into one convolution."""
+
+    def __init__(self, steps: Sequence[FilterFunc], kernel: Kernel):
+        self.steps = list(steps)
+        kx, ky = kernel
+        self.kx = np.ascontiguousarray(kx, dtype=np.float32)
+        self.ky = None if ky is None else np.ascontiguousarray(ky, dtype=np.float32)
+
+    @property
+    def separable(self) -> bool:
+        return self.ky is not None
+
+    def __call__(self, img: ArrayLike) -> ArrayLike:
+        if self.ky is not None:
+            return cv2.sepFilter2D(img, -1, self.kx, self.ky)
+        return cv2.filter2D(img, -1, self.kx)
+
+    def __repr__(self) -> str:
+        kind = "sep" if self.separable else "2d"
+        return f"FusedStep({kind}, {self.steps!r})"
+
+
+# -------------------- Planner --------------------
+def plan_chain(steps: Sequence[FilterFunc]) -> List[FilterFunc]:
+    """
+    Return an equivalent list of callables where every run of two or more
+    consecutive linear steps is replaced by a single FusedStep.
+    """
+    plan: List[FilterFunc] = []
+    run: List[Tuple[FilterFunc, Kernel]] = []
+
+    def flush():
+        if len(run) >= 2:
+            plan.append(FusedStep([s for s, _ in run], compose_kernels([k for _, k in run])))
+        else:
+            plan.extend(s for s, _ in run)
+        run.clear()
+
+    for step in steps:
+        kernel = _step_kernel(step)
+        if kernel is None:
+            flush()
+            plan.append(step)
+            continue
+        run.append((step, kernel))
+        if not _is_convex(kernel):
+            flush()
+    flush()
+    return plan
+
+
+__all__ = ["FusedStep", "compose_kernels", "plan_chain"]
@@ -0,0 +1,143 @@
+"""
+metrics.py
+
+Full-reference image quality: PSNR and SSIM of filtered images against a
+clean reference, vectorized over a stack of candidates so scoring every
+configuration of a sweep (filters/sweep.py) costs a few whole-stack passes.
+
+PSNR is 10 * log10(data_range^2 / MSE), computed for a whole stack with
+one subtraction and one reduction.
+
+SSIM follows Wang et al. (2004): Gaussian-weighted local means, variances
+and covariance (11 x 11 window, sigma 1.5, K1 = 0.01, K2 = 0.03), averaged
+over the image with a half-window border left out as in scikit-image, and
+over channels. The reference's local statistics are computed once per
+SSIM object and shared by every candidate; candidates are blurred together
+as the channels of one array (up to 128 channels per cv2 call).
+
+data_range defaults to the white level of the reference's dtype (255 for
+uint8, 65535 for uint16, 1.0 for floats; see filters/precision.py).
+
+Exports:
+    - mse(ref, imgs) -> float or array     # imgs: one image or a stack
+    - psnr(ref, imgs, data_range=None) -> float or array
+    - SSIM(ref, data_range=None)           # .score(img), .scores(stack)
+    - ssim(ref, img, data_range=None) -> float
+"""
+
+from __future__ import annotations
+from typing import Optional, Union
+import numpy as np
+import cv2
+
+from filters.precision import white_level
+
+ArrayLike = np.ndarray
+
+SSIM_WINDOW = 11
+SSIM_SIGMA = 1.5
+SSIM_K1 = 0.01
+SSIM_K2 = 0.03
+# channels per cv2.GaussianBlur call (larger counts are rejected)
+_MAX_CHANNELS = 128
+
+
+def _stacked(ref: ArrayLike, imgs: ArrayLike) -> bool:
+    if imgs.shape == ref.shape:
+        return False
+    if imgs.shape[1:] == ref.shape:
+        return True
+    raise ValueError(f"shape {imgs.shape} does not match the reference {ref.shape}")
+
+
+def mse(ref: ArrayLike, imgs: ArrayLike) -> Union[float, ArrayLike]:
+    """Mean squared error of one image, or of every image in a stack."""
+    stacked = _stacked(ref, imgs)
+    diff = np.subtract(imgs, ref, dtype=np.float32)
+    np.square(diff, out=diff)
+    if not stacked:
+        return float(diff.mean(dtype=np.float64))
+    return diff.reshape(len(diff), -1).mean(axis=1, dtype=np.float64)
+
+
+def psnr(
+    ref: ArrayLike, imgs: ArrayLike, data_range: Optional[float] = None
+) -> Union[float, ArrayLike]:
+    """PSNR in dB of one image or of every image in a stack (inf when identical)."""
+    peak = white_level(ref.dtype) if data_range is None else data_range
+    err = np.asarray(mse(ref, imgs))
+    with np.errstate(divide="ignore"):
+        out = 10.0 * np.log10(peak * peak / err)
+    return float(out) if out.ndim == 0 else out
+
+
+class SSIM:
+    """SSIM against a fixed reference; its local statistics are computed once."""
+
+    __slots__ = ("shape", "c1", "c2", "_ref", "_mu", "_var", "_crop")
+
+    def __init__(self, ref: ArrayLike, data_range: Optional[float] = None):
+        peak = white_level(ref.dtype) if data_range is None else data_range
+        self.shape = ref.shape
+        self.c1 = (SSIM_K1 * peak) ** 2
+        self.c2 = (SSIM_K2 * peak) ** 2
+        x = _channels_last(ref.astype(np.float32))
+        self._ref = x
+        self._mu = _blur(x)
+        self._var = _blur(x * x) - self._mu * self._mu
+        pad = SSIM_WINDOW // 2
+        h, w = ref.shape[:2]
+        self._crop = (slice(pad, h - pad), slice(pad, w - pad)) if min(h, w) > 2 * pad else (slice(None),) * 2
+
+    def score(self, img: ArrayLike) -> float:
+        return float(self.scores(img[None])[0])
+
+    def scores(self, imgs: ArrayLike) -> ArrayLike:
+        """SSIM of every image in a stack shaped (N,) + ref.shape."""
+        if imgs.shape[1:] != self.shape:
+            raise ValueError(f"shape {imgs.shape} does not match the reference {self.shape}")
+        channels = self._ref.shape[2]
+        per_call = max(1, _MAX_CHANNELS // channels)
+        return np.concatenate(
+            [self._scores(imgs[i : i + per_call]) for i in range(0, len(imgs), per_call)]
+        )
+
+    def _scores(self, imgs: ArrayLike) -> ArrayLike:
+        n = len(imgs)
+        h, w, c = self._ref.shape
+        # candidates side by side as channels: (H, W, C * N), one blur each;
+        # the reference statistics broadcast over the trailing N axis
+        y = np.moveaxis(imgs.astype(np.float32).reshape((n, h, w, c)), 0, -1)
+        y = np.ascontiguousarray(y)
+        flat = (h, w, c * n)
+        mu_y = _blur(y.reshape(flat)).reshape(y.shape)
+        var_y = _blur((y * y).reshape(flat)).reshape(y.shape) - mu_y * mu_y
+        x, mu_x, var_x = self._ref[..., None], self._mu[..., None], self._var[..., None]
+        cov = _blur((x * y).reshape(flat)).reshape(y.shape) - mu_x * mu_y
+        num = (2 * mu_x * mu_y + self.c1) * (2 * cov + self.c2)
+        den = (mu_x * mu_x + mu_y * mu_y + self.c1) * (var_x + var_y + self.c2)
+        smap = (num / den)[self._crop]
+        # mean over pixels and over each candidate's channels
+        return smap.reshape(-1, n).mean(axis=0, dtype=np.float64)
+
+
+def _channels_last(img: ArrayLike) -> ArrayLike:
+    return img[:, :, None] if img.ndim == 2 else img
+
+
+def _blur(img: ArrayLike) -> ArrayLike:
+    out = cv2.GaussianBlur(img, (SSIM_WINDOW, SSIM_WINDOW), SSIM_SIGMA)
+    return _channels_last(out)
+
+
+def ssim(ref: ArrayLike, img: ArrayLike, data_range: Optional[float] = None) -> float:
+    """Mean SSIM of img against ref."""
+    return SSIM(ref, data_range).score(img)
+
+
+__all__ = [
+    "mse",
+    "psnr",
+    "SSIM",
+    "ssim",
+]
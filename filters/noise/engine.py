@@ -0,0 +1,241 @@
+"""
+engine.py
+
+Seedable noise generators built on numpy.random.Generator.
+
+Impulse (salt / pepper) noise never materialises a full-size random mask:
+corrupted sites are found by drawing the gaps between them from a geometric
+distribution, which is exactly a Bernoulli(prob) trial per site but costs
+about prob * N draws instead of N. Additive models (gaussian, speckle,
+poisson) draw float32 noise in row bands, so temporaries stay small.
+
+Every generator takes ``seed`` (int, for reproducible output) or ``rng`` (a
+Generator to share across calls), and ``per_channel``:
+    - per_channel=False  one draw per pixel, applied to all channels
+                         (true black/white impulses, grey-level noise)
+    - per_channel=True   independent draws per channel (coloured noise)
+
+Exports:
+    - make_rng(seed=None)
+    - sample_sites(n, prob, rng)
+    - impulse(image, salt_prob, pepper_prob, ...)
+    - gaussian(image, sigma, mean=0.0, ...)
+    - speckle(image, sigma, ...)
+    - poisson(image, scale=1.0, ...)
+"""
+
+from __future__ import annotations
+from typing import Callable, Optional
+import numpy as np
+
+from filters.params import check_prob
+
+ArrayLike = np.ndarray
+
+# float32 elements per band for the additive models (~4 MB of noise)
+_BAND_ELEMS = 1 << 20
+
+
+def make_rng(seed=None) -> np.random.Generator:
+    """Fast generator (SFC64); seed=None draws fresh entropy."""
+    return np.random.Generator(np.random.SFC64(seed))
+
+
+def _resolve_rng(seed, rng) -> np.random.Generator:
+    if rng is not None and seed is not None:
+        raise ValueError("pass either seed or rng, not both")
+    return rng if rng is not None else make_rng(seed)
+
+
+def _value_range(dtype):
+    if np.issubdtype(dtype, np.integer):
+        info = np.iinfo(dtype)
+        return info.min, info.max
+    return 0.0, 1.0
+
+
+def _sites(image: ArrayLike, per_channel: bool) -> ArrayLike:
+    """2D view (sites, values-per-site) that noise writes through."""
+    if image.ndim == 2 or per_channel:
+        return image.reshape(-1, 1)
+    return image.reshape(-1, image.shape[-1])
+
+
+def sample_sites(n: int, prob: float, rng: np.random.Generator) -> ArrayLike:
+    """
+    Sorted indices in [0, n) where independent Bernoulli(prob) trials hit,
+    drawn as cumulative geometric gaps (O(prob * n) work and memory).
+    """
+    if prob <= 0.0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if prob >= 1.0:
+        return np.arange(n, dtype=np.int64)
+    parts = []
+    pos = -1
+    while True:
+        remaining = n - 1 - pos
+        expect = remaining * prob
+        count = int(expect + 6.0 * np.sqrt(expect) + 16)
+        idx = np.cumsum(rng.geometric(prob, size=count)) + pos
+        if idx[-1] >= n:
+            parts.append(idx[idx < n])
+            break
+        parts.append(idx)
+        pos = int(idx[-1])
+    return np.concatenate(parts) if len(parts) > 1 else parts[0]
+
+
+# -------------------- Impulse noise --------------------
+def impulse(
+    image: ArrayLike,
+    salt_prob: float = 0.0,
+    pepper_prob: float = 0.0,
+    *,
+    per_channel: bool = False,
+    seed=None,
+    rng: Optional[np.random.Generator] = None,
+    out: Optional[ArrayLike] = None,
+) -> ArrayLike:
+    """
+    Salt-and-pepper noise. Each site independently becomes salt with
+    salt_prob and pepper with pepper_prob (pepper wins when both hit).
+    out may be the input itself for in-place operation.
+    """
+    salt_prob = check_prob(salt_prob, "salt_prob")
+    pepper_prob = check_prob(pepper_prob, "pepper_prob")
+    rng = _resolve_rng(seed, rng)
+    if out is None:
+        out = np.array(image, copy=True, order="C")
+    else:
+        if not out.flags.c_contiguous:
+            raise ValueError("out must be C-contiguous")
+        if out is not image:
+            np.copyto(out, image)
+    lo, hi = _value_range(out.dtype)
+
+    sites = _sites(out, per_channel)
+    # any hit at all, then split the hits between pepper and salt
+    hit = 1.0 - (1.0 - salt_prob) * (1.0 - pepper_prob)
+    idx = sample_sites(sites.shape[0], hit, rng)
+    if idx.size:
+        is_pepper = rng.random(idx.size, dtype=np.float32) < (pepper_prob / hit)
+        sites[idx[~is_pepper]] = hi
+        sites[idx[is_pepper]] = lo
+    return out
+
+
+# -------------------- Additive noise --------------------
+def _banded(
+    image: ArrayLike,
+    per_channel: bool,
+    rng: np.random.Generator,
+    combine: Callable[[ArrayLike, ArrayLike], ArrayLike],
+    draw: Callable[[np.random.Generator, tuple], ArrayLike],
+) -> ArrayLike:
+    """
+    Apply combine(pixels_f32, noise_f32) band by band and saturate into a
+    new array of the input dtype.
+    """
+    out = np.empty_like(image)
+    lo, hi = _value_range(image.dtype)
+    h = image.shape[0]
+    row = int(np.prod(image.shape[1:], dtype=np.int64)) or 1
+    band = max(1, _BAND_ELEMS // row)
+    for y0 in range(0, h, band):
+        src = image[y0 : y0 + band].astype(np.float32)
+        if per_channel or src.ndim == 2:
+            shape = src.shape
+        else:
+            shape = src.shape[:-1] + (1,)
+        res = combine(src, draw(rng, shape))
+        np.clip(res, lo, hi, out=res)
+        if np.issubdtype(out.dtype, np.integer):
+            np.rint(res, out=res)
+        out[y0 : y0 + band] = res
+    return out
+
+
+def gaussian(
+    image: ArrayLike,
+    sigma: float = 10.0,
+    mean: float = 0.0,
+    *,
+    per_channel: bool = False,
+    seed=None,
+    rng: Optional[np.random.Generator] = None,
+) -> ArrayLike:
+    """Additive Gaussian noise with the given mean and sigma (in pixel units)."""
+    if sigma < 0:
+        raise ValueError(f"sigma must be >= 0, got {sigma}")
+    rng = _resolve_rng(seed, rng)
+
+    def draw(g, shape):
+        n = g.standard_normal(shape, dtype=np.float32)
+        n *= sigma
+        n += mean
+        return n
+
+    return _banded(image, per_channel, rng, lambda px, n: np.add(px, n, out=px), draw)
+
+
+def speckle(
+    image: ArrayLike,
+    sigma: float = 0.1,
+    *,
+    per_channel: bool = False,
+    seed=None,
+    rng: Optional[np.random.Generator] = None,
+) -> ArrayLike:
+    """Multiplicative noise: pixel * (1 + N(0, sigma))."""
+    if sigma < 0:
+        raise ValueError(f"sigma must be >= 0, got {sigma}")
+    rng = _resolve_rng(seed, rng)
+
+    def draw(g, shape):
+        n = g.standard_normal(shape, dtype=np.float32)
+        n *= sigma
+        n += 1.0
+        return n
+
+    return _banded(image, per_channel, rng, lambda px, n: np.multiply(px, n, out=px), draw)
+
+
+def poisson(
+    image: ArrayLike,
+    scale: float = 1.0,
+    *,
+    seed=None,
+    rng: Optional[np.random.Generator] = None,
+) -> ArrayLike:
+    """
+    Shot noise: each value is replaced by Poisson(value * scale) / scale.
+    Larger scale means more photons per level, i.e. less noise.
+    Always independent per channel, since it depends on each value.
+    """
+    if scale <= 0:
+        raise ValueError(f"scale must be > 0, got {scale}")
+    rng = _resolve_rng(seed, rng)
+    out = np.empty_like(image)
+    lo, hi = _value_range(image.dtype)
+    row = int(np.prod(image.shape[1:], dtype=np.int64)) or 1
+    band = max(1, _BAND_ELEMS // row)
+    for y0 in range(0, image.shape[0], band):
+        lam = image[y0 : y0 + band].astype(np.float32)
+        lam *= scale
+        res = rng.poisson(lam).astype(np.float32)
+        res /= scale
+        np.clip(res, lo, hi, out=res)
+        if np.issubdtype(out.dtype, np.integer):
+            np.rint(res, out=res)
+        out[y0 : y0 + band] = res
+    return out
+
+
+__all__ = [
+    "make_rng",
+    "sample_sites",
+    "impulse",
+    "gaussian",
+    "speckle",
+    "poisson",
+]
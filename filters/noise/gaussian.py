@@ -0,0 +1,4 @@
+from filters.noise import engine
+
+def Gaussian_Noise(image, sigma=10.0, per_channel=False, seed=None):
+    return engine.gaussian(image, sigma, per_channel=per_channel, seed=seed)
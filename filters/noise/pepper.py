@@ -1,8 +1,4 @@
-import cv2
-import numpy as np
+from filters.noise import engine
 
-def Pepper(image ,pepper_prob = 0.01 ):
-    noisy_image = image.copy()
-    pepper_mask = np.random.random(image.shape) < pepper_prob
-    noisy_image[pepper_mask] = 0
-    return noisy_image
\ No newline at end of file
+def Pepper(image ,pepper_prob = 0.01, per_channel=False, seed=None):
+    return engine.impulse(image, pepper_prob=pepper_prob, per_channel=per_channel, seed=seed)
@@ -0,0 +1,4 @@
+from filters.noise import engine
+
+def Poisson(image, scale=1.0, seed=None):
+    return engine.poisson(image, scale, seed=seed)
@@ -1,8 +1,4 @@
-import cv2
-import numpy as np
+from filters.noise import engine
 
-def Salt(image ,salt_prob = 0.01):
-    noisy_image = image.copy()
-    salt_mask = np.random.random(image.shape) < salt_prob
-    noisy_image[salt_mask] = 255
-    return noisy_image
\ No newline at end of file
+def Salt(image ,salt_prob = 0.01, per_channel=False, seed=None):
+    return engine.impulse(image, salt_prob=salt_prob, per_channel=per_channel, seed=seed)
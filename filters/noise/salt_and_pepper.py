@@ -1,10 +1,6 @@
-import cv2
-import numpy as np
+from filters.noise import engine
 
-def Salt_and_Pepper(image, salt_prob=0.01, pepper_prob=0.01):
-    noisy_image = image.copy()
-    salt_mask = np.random.random(image.shape) < salt_prob
-    noisy_image[salt_mask] = 255
-    pepper_mask = np.random.random(image.shape) < pepper_prob
-    noisy_image[pepper_mask] = 0
-    return noisy_image
+def Salt_and_Pepper(image, salt_prob=0.01, pepper_prob=0.01, per_channel=False, seed=None):
+    return engine.impulse(
+        image, salt_prob, pepper_prob, per_channel=per_channel, seed=seed
+    )
@@ -0,0 +1,4 @@
+from filters.noise import engine
+
+def Speckle(image, sigma=0.1, per_channel=False, seed=None):
+    return engine.speckle(image, sigma, per_channel=per_channel, seed=seed)
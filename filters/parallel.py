@@ -0,0 +1,248 @@
+"""
+parallel.py
+
+Band-parallel execution of filter steps on a thread pool, so one large image
+can use every core instead of one. OpenCV and NumPy release the GIL inside
+their kernels, so threads scale without the copies a process pool needs.
+
+The image is cut into horizontal bands; each band is read with a halo of the
+step's kernel radius (declared in filters/registry.py) and its centre rows
+are written straight into one preallocated output array, so no band results
+are concatenated. Results match a whole-image call. Seeded noise steps are
+never split: their draws would depend on the band count, which changes with
+the worker count and the image height, so they run on the whole image and
+give the same output for any number of workers.
+
+Steps without a known radius (plain lambdas) simply run on the whole image.
+
+The registry's metadata drives scheduling: a step is only split when its
+estimated work (pixels times the declared cost) is large enough to pay for
+the threads, and a step that runs on one thread and works in place (Sobel,
+Prewitt) writes straight into the chain's scratch buffer instead of
+allocating a new result.
+
+Workers is an int, or "auto": the first time a filter runs on an image of a
+given dtype and width, a slab of the image is timed with 1, 2, 4, ... up to
+os.cpu_count() threads and the fastest count (the smallest one within 5% of
+the best) is remembered, so filters that OpenCV already threads, or that are
+memory bound, are not oversubscribed. The count is remembered per filter and
+cost class (the registry cost rounded to a power of two), not per exact
+parameters, so dragging a kernel-size slider does not re-time every value.
+
+Exports:
+    - run_step_banded(img, step, workers="auto", out=None)
+    - run_chain_parallel(img, steps, workers="auto")
+    - auto_workers(step, img)
+"""
+
+from __future__ import annotations
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Tuple, Union
+import numpy as np
+
+from filters import trace
+from filters.chain import Step
+from filters.fuse import FusedStep
+from filters.registry import spec_for
+from filters.tiled import step_radius
+
+ArrayLike = np.ndarray
+FilterFunc = Callable[[ArrayLike], ArrayLike]
+Workers = Union[int, str]
+
+# bands per worker, so a slow band does not leave the other threads idle
+_BANDS_PER_WORKER = 2
+_MIN_BAND_ROWS = 32
+# steps with less work than this (elements x registry cost) are never split
+_MIN_PARALLEL_WORK = 1 << 20
+# elements of the slab timed by auto_workers
+_SAMPLE_ELEMS = 1 << 22
+
+_pools: Dict[int, ThreadPoolExecutor] = {}
+_auto: Dict[Hashable, int] = {}
+_lock = threading.Lock()
+
+
+def _pool(workers: int) -> ThreadPoolExecutor:
+    """Shared pool per worker count, created on first use."""
+    with _lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="filter-band"
+            )
+        return pool
+
+
+def _check_workers(workers: Workers) -> Workers:
+    if workers == "auto":
+        return workers
+    if isinstance(workers, bool) or not isinstance(workers, int) or workers < 1:
+        raise ValueError(f"workers must be an int >= 1 or 'auto', got {workers!r}")
+    return workers
+
+
+def _band_edges(h: int, bands: int, radius: int) -> List[int]:
+    # halos are re-read by both neighbours; keep bands well above the radius
+    min_rows = max(_MIN_BAND_ROWS, 4 * radius)
+    bands = max(1, min(bands, h // min_rows))
+    return [h * i // bands for i in range(bands + 1)]
+
+
+def _step_identity(step: FilterFunc) -> Hashable:
+    """Calibration key: the filter and its cost class, not its exact params."""
+    if isinstance(step, (Step, FusedStep)):
+        try:
+            bucket = round(math.log2(max(_step_cost(step), 1e-3)))
+        except (TypeError, ValueError):
+            bucket = None  # params the cost model does not understand
+        if isinstance(step, FusedStep):
+            return "fused", step.separable, bucket
+        if bucket is not None:
+            return step.func, bucket
+        return step.func, tuple(sorted(step.params.items()))
+    return step
+
+
+def _step_cost(step: FilterFunc) -> float:
+    """Registry cost per pixel, in 3x3 box filter passes (1 when unknown)."""
+    if isinstance(step, FusedStep):
+        return sum(_step_cost(s) for s in step.steps)
+    if not isinstance(step, Step):
+        return 1.0
+    spec = spec_for(step.func)
+    return 1.0 if spec is None else spec.cost(**step.params)
+
+
+def _seeded(step: FilterFunc) -> bool:
+    return isinstance(step, Step) and step.params.get("seed") is not None
+
+
+def _inplace(step: FilterFunc) -> bool:
+    if not isinstance(step, Step):
+        return False
+    spec = spec_for(step.func)
+    return spec is not None and spec.inplace
+
+
+# -------------------- Banded execution --------------------
+def run_step_banded(
+    img: ArrayLike,
+    step: FilterFunc,
+    workers: Workers = "auto",
+    out: Optional[ArrayLike] = None,
+) -> ArrayLike:
+    """
+    Apply one step to img band by band on `workers` threads. out, if given,
+    must be shaped and typed like img and must not overlap it.
+    """
+    workers = _check_workers(workers)
+    if workers == "auto":
+        workers = auto_workers(step, img)
+    if out is not None and (out.shape != img.shape or out.dtype != img.dtype):
+        raise ValueError("out must have the shape and dtype of img")
+    try:
+        radius = step_radius(step)
+    except ValueError:
+        radius = None  # unknown footprint: cannot split
+    h = img.shape[0]
+    if radius is None or workers == 1 or _seeded(step):
+        edges = [0, h]
+    else:
+        edges = _band_edges(h, workers * _BANDS_PER_WORKER, radius)
+
+    if len(edges) == 2:
+        res = step(img)
+        if out is None:
+            return res
+        np.copyto(out, res)
+        return out
+
+    if out is None:
+        out = np.empty_like(img)
+
+    def band(y0: int, y1: int):
+        r0, r1 = max(0, y0 - radius), min(h, y1 + radius)
+        res = step(img[r0:r1])
+        if res.shape[1:] != img.shape[1:] or res.shape[0] != r1 - r0:
+            raise ValueError(f"{step!r} changes the image shape; it cannot run in bands")
+        out[y0:y1] = res[y0 - r0 : y1 - r0]
+
+    pool = _pool(workers)
+    futures = [pool.submit(band, y0, y1) for y0, y1 in zip(edges, edges[1:])]
+    for fut in futures:
+        fut.result()
+    return out
+
+
+def run_chain_parallel(
+    img: ArrayLike, steps: Sequence[FilterFunc], workers: Workers = "auto"
+) -> ArrayLike:
+    """
+    Apply each step band-parallel. Split steps write into two preallocated
+    buffers used in turn; img itself is never written.
+    """
+    workers = _check_workers(workers)
+    bufs: List[Optional[ArrayLike]] = [None, None]
+    out = img
+    with trace.chain_span(steps, img) as chain:
+        for i, step in enumerate(steps):
+            n = auto_workers(step, out) if workers == "auto" else workers
+            if n == 1:
+                if _inplace(step) and any(out is b for b in bufs):
+                    # our own scratch buffer: overwrite it instead of allocating
+                    out = trace.call(step, out, run=lambda st, im: st.func(im, out=im, **st.params))
+                else:
+                    out = trace.call(step, out)
+                continue
+            dst = bufs[i % 2]
+            if dst is None or dst.shape != out.shape or dst.dtype != out.dtype:
+                dst = bufs[i % 2] = np.empty_like(out)
+            out = trace.call(step, out, run=lambda st, im: run_step_banded(im, st, n, out=dst))
+        return chain.done(out)
+
+
+# -------------------- Worker count calibration --------------------
+def auto_workers(step: FilterFunc, img: ArrayLike) -> int:
+    """Fastest thread count for step on images like img (measured once)."""
+    cpus = os.cpu_count() or 1
+    if cpus == 1 or _seeded(step):
+        return 1
+    try:
+        if img.size * _step_cost(step) < _MIN_PARALLEL_WORK:
+            return 1
+    except (TypeError, ValueError):
+        pass  # params the cost model does not understand: time it
+    try:
+        key = (_step_identity(step), img.dtype.str, img.shape[1:])
+        hash(key)
+    except TypeError:
+        return 1  # unhashable params: not worth guessing
+    with _lock:
+        if key in _auto:
+            return _auto[key]
+
+    row = max(1, img.size // img.shape[0])
+    sample = img[: max(1, min(img.shape[0], _SAMPLE_ELEMS // row))]
+    buf = np.empty_like(sample)
+    candidates = sorted({min(cpus, 2**i) for i in range(cpus.bit_length() + 1)})
+    times: List[Tuple[float, int]] = []
+    for n in candidates:
+        best = float("inf")
+        for _ in range(2):
+            t0 = time.perf_counter()
+            run_step_banded(sample, step, n, out=buf)
+            best = min(best, time.perf_counter() - t0)
+        times.append((best, n))
+    fastest = min(t for t, _ in times)
+    choice = min(n for t, n in times if t <= fastest * 1.05)
+    with _lock:
+        _auto[key] = choice
+    return choice
+
+
+__all__ = ["run_step_banded", "run_chain_parallel", "auto_workers"]
@@ -0,0 +1,41 @@
+"""
+params.py
+
+Up-front validation of filter parameters, shared by every filter module so
+bad values fail with a clear ValueError before any pixels are touched.
+"""
+
+from numbers import Integral, Real
+
+
+def check_ksize(ksize, maxvalue=None):
+    """Validate a kernel length and round even lengths up to the next odd one."""
+    if isinstance(ksize, bool) or not isinstance(ksize, Integral):
+        raise ValueError(f"ksize must be an integer, got {ksize!r}")
+    ksize = int(ksize)
+    if ksize < 1:
+        raise ValueError(f"ksize must be >= 1, got {ksize}")
+    ksize += ksize & 1 ^ 1
+    if maxvalue is not None and ksize > maxvalue:
+        raise ValueError(f"ksize must be <= {maxvalue}, got {ksize}")
+    return ksize
+
+
+def check_prob(prob, name="prob"):
+    """Validate a probability in [0, 1]."""
+    if isinstance(prob, bool) or not isinstance(prob, Real):
+        raise ValueError(f"{name} must be a number, got {prob!r}")
+    prob = float(prob)
+    if not 0.0 <= prob <= 1.0:
+        raise ValueError(f"{name} must be within [0, 1], got {prob}")
+    return prob
+
+
+def check_strength(strength, name="strength"):
+    """Validate a non-negative sharpening strength."""
+    if isinstance(strength, bool) or not isinstance(strength, Real):
+        raise ValueError(f"{name} must be a number, got {strength!r}")
+    strength = float(strength)
+    if not strength >= 0.0:
+        raise ValueError(f"{name} must be >= 0, got {strength}")
+    return strength
@@ -0,0 +1,151 @@
+"""
+precision.py
+
+Float32 execution of filter chains: the image is converted to float32 once,
+every step works on float32 and hands its result to the next one as is, and
+the result is quantized once at the end. Run natively, a uint8 chain rounds
+and saturates after every step, and 16-bit data has to be squeezed into 8
+bits first; in float32 only the final output is rounded.
+
+Float images use the 0..1 range the noise engine already assumes for floats
+(filters/noise/engine.py), so uint8 is divided by 255 and uint16 by 65535 on
+the way in. Parameters measured in grey levels of the input (Gaussian noise
+sigma, Poisson photons per level; Param.levels in filters/registry.py) are
+rescaled to match, so a chain means the same thing in both modes.
+Intermediate values are not clipped: an overshoot from sharpening can still
+be pulled back by a later step, and only the final quantize() saturates.
+
+Precisions (PRECISIONS):
+    - "native"   every step runs on the input dtype (uint8 rounds each time)
+    - "float32"  convert once, run in float32, quantize once
+
+Exports:
+    - PRECISIONS, check_precision(precision)
+    - white_level(dtype) -> 255, 65535, ... or 1.0 for floats
+    - to_float(img) -> float32 copy in 0..1
+    - quantize(img, dtype) -> img rounded and saturated to dtype
+    - float_step(step, white) / float_chain(steps, white)
+    - run_chain_float(img, steps, out_dtype=None, run=run_chain)
+"""
+
+from __future__ import annotations
+from typing import Callable, List, Sequence
+import numpy as np
+import cv2
+
+from filters.chain import Step, run_chain
+from filters.registry import spec_for
+
+ArrayLike = np.ndarray
+FilterFunc = Callable[[ArrayLike], ArrayLike]
+
+PRECISIONS = ("native", "float32")
+# output depths cv2.addWeighted can round and saturate into in one pass
+_CV_DEPTHS = {
+    np.dtype(np.uint8): cv2.CV_8U,
+    np.dtype(np.int8): cv2.CV_8S,
+    np.dtype(np.uint16): cv2.CV_16U,
+    np.dtype(np.int16): cv2.CV_16S,
+    np.dtype(np.int32): cv2.CV_32S,
+}
+
+
+def check_precision(precision: str) -> str:
+    if precision not in PRECISIONS:
+        raise ValueError(f"precision must be one of {PRECISIONS}, got {precision!r}")
+    return precision
+
+
+def white_level(dtype) -> float:
+    """Value of full white for dtype: its maximum for integers, 1.0 for floats."""
+    dtype = np.dtype(dtype)
+    if np.issubdtype(dtype, np.integer):
+        return float(np.iinfo(dtype).max)
+    if np.issubdtype(dtype, np.floating):
+        return 1.0
+    raise ValueError(f"unsupported image dtype {dtype}")
+
+
+def to_float(img: ArrayLike) -> ArrayLike:
+    """float32 copy of img scaled to 0..1 (floats are assumed to be in 0..1 already)."""
+    white = white_level(img.dtype)
+    if white == 1.0:
+        return np.array(img, dtype=np.float32, copy=True)
+    return np.multiply(img, np.float32(1.0 / white), dtype=np.float32)
+
+
+def quantize(img: ArrayLike, dtype) -> ArrayLike:
+    """
+    img in dtype. Floats (0..1) are scaled to dtype's range, rounded and
+    saturated in one pass; integers are rescaled between bit depths (uint16
+    to uint8 divides by 257 instead of wrapping). Float targets keep their
+    values unclipped.
+    """
+    dtype = np.dtype(dtype)
+    if img.dtype == dtype:
+        return img
+    if np.issubdtype(dtype, np.floating):
+        if np.issubdtype(img.dtype, np.floating):
+            return img.astype(dtype)
+        return to_float(img).astype(dtype, copy=False)
+    scale = white_level(dtype) / white_level(img.dtype)
+    depth = _CV_DEPTHS.get(dtype)
+    if depth is not None and img.ndim <= 3:
+        try:
+            return cv2.addWeighted(img, scale, img, 0.0, 0.0, dtype=depth)
+        except cv2.error:
+            pass  # depth or channel count cv2 does not handle
+    res = np.multiply(img, scale, dtype=np.float64)
+    info = np.iinfo(dtype)
+    np.clip(res, info.min, info.max, out=res)
+    return np.rint(res, out=res).astype(dtype)
+
+
+# -------------------- Steps --------------------
+def float_step(step: FilterFunc, white: float) -> FilterFunc:
+    """
+    Step with its grey-level parameters rescaled from an image whose white
+    is `white` to 0..1 floats. Bare callables are returned unchanged.
+    """
+    if white == 1.0 or not isinstance(step, Step):
+        return step
+    spec = spec_for(step.func)
+    if spec is None or not any(p.levels for p in spec.params):
+        return step
+    params = dict(spec.defaults(), **step.params)
+    for p in spec.params:
+        if p.levels and params.get(p.name) is not None:
+            params[p.name] = params[p.name] * white ** -p.levels
+    return Step(step.name, step.func, params)
+
+
+def float_chain(steps: Sequence[FilterFunc], white: float) -> List[FilterFunc]:
+    return [float_step(s, white) for s in steps]
+
+
+def run_chain_float(
+    img: ArrayLike,
+    steps: Sequence[FilterFunc],
+    out_dtype=None,
+    run: Callable[[ArrayLike, Sequence[FilterFunc]], ArrayLike] = run_chain,
+) -> ArrayLike:
+    """
+    Run steps on img in float32 and quantize once to out_dtype (default:
+    img's dtype). run(img, steps) executes the chain, e.g. a band-parallel
+    runner; steps are rescaled for the 0..1 range first (float_chain).
+    """
+    white = white_level(img.dtype)
+    out = run(to_float(img), float_chain(steps, white))
+    return quantize(out, img.dtype if out_dtype is None else out_dtype)
+
+
+__all__ = [
+    "PRECISIONS",
+    "check_precision",
+    "white_level",
+    "to_float",
+    "quantize",
+    "float_step",
+    "float_chain",
+    "run_chain_float",
+]
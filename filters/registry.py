@@ -0,0 +1,376 @@
+"""
+registry.py
+
+Single source of truth about the filters: every filter is registered once
+with its parameter schema and execution metadata, and the chain parser,
+fuser, tiler and GUI pages read that instead of keeping their own tables.
+
+Per filter:
+    - params     ordered Param schema (string converter, default, GUI hints,
+                 whether the value is a length in pixels)
+    - radius     pixels read beyond each output pixel, from the params
+                 (None: unknown, the filter cannot be tiled)
+    - kernel     linear filters only: builds the convolution kernel from the
+                 params, as (kx, ky) when separable or (kernel2d, None);
+                 returns None for params where the filter is not linear
+    - inplace    the function accepts out= and out may be the input itself
+                 (run_chain_parallel reuses its scratch buffer)
+    - cost       rough work per pixel from the params, in units of one
+                 3x3 box filter pass (run_chain_parallel only splits steps
+                 whose work pays for the threads)
+
+Exports:
+    - Param, FilterSpec
+    - REGISTRY                       # name -> FilterSpec, in registration order
+    - register(spec) -> spec
+    - lookup(name) -> FilterSpec     # by chain name
+    - spec_for(func) -> FilterSpec or None
+    - by_category(category) -> List[FilterSpec]
+"""
+
+from __future__ import annotations
+import inspect
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import cv2
+
+from filters.smooth import gauss, mean, median
+from filters.smooth import min as min_, max as max_
+from filters.smooth.rank import EXTREME_METHODS, MEDIAN_METHODS, VHGW_MIN_KSIZE
+from filters.sharp import laplace, sobel, prewitt
+from filters.sharp.gradient import NORMS
+from filters.noise import salt, pepper, salt_and_pepper, gaussian, speckle, poisson
+from filters.params import check_ksize, check_prob, check_strength
+
+ArrayLike = np.ndarray
+# (kx, ky) for a separable kernel, or (kernel2d, None)
+Kernel = Tuple[np.ndarray, Optional[np.ndarray]]
+
+CATEGORIES = ("smooth", "sharp", "noise")
+
+
+# -------------------- Parameter schema --------------------
+def _ksize(raw: str) -> int:
+    return check_ksize(int(raw))
+
+
+def _sobel_ksize(raw: str) -> int:
+    return check_ksize(int(raw), maxvalue=31)
+
+
+def _prob(raw: str) -> float:
+    return check_prob(float(raw))
+
+
+def _strength(raw: str) -> float:
+    return check_strength(float(raw))
+
+
+def _bool(raw: str) -> bool:
+    value = raw.lower()
+    if value in ("1", "true", "yes", "y", "on"):
+        return True
+    if value in ("0", "false", "no", "n", "off"):
+        return False
+    raise ValueError("expected a boolean (1/0, true/false)")
+
+
+def _choice(choices: Tuple[str, ...]) -> Callable[[str], str]:
+    def conv(raw: str) -> str:
+        if raw not in choices:
+            raise ValueError(f"expected one of {', '.join(choices)}")
+        return raw
+
+    return conv
+
+
+class Param:
+    """
+    One filter parameter.
+
+    kind is "int", "float", "bool" or "choice" and tells the GUI how to ask
+    for it (within minvalue..maxvalue, or among choices); soft_max is the
+    end of GUI sliders when maxvalue is open, and ask=False keeps the
+    default in the GUI. spatial marks lengths in pixels (kernel sizes),
+    which previews on a downscaled image shrink accordingly. levels=1 marks
+    values in grey levels of the image's dtype and levels=-1 values per grey
+    level; float32 chains (filters/precision.py) rescale them for 0..1 data.
+    """
+
+    __slots__ = (
+        "name", "convert", "kind", "spatial", "choices",
+        "minvalue", "maxvalue", "soft_max", "ask", "prompt", "levels", "default",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        convert: Callable[[str], Any],
+        kind: str = "int",
+        *,
+        spatial: bool = False,
+        choices: Optional[Tuple[str, ...]] = None,
+        minvalue=None,
+        maxvalue=None,
+        soft_max=None,
+        ask: bool = True,
+        prompt: Optional[str] = None,
+        levels: int = 0,
+    ):
+        self.name = name
+        self.convert = convert
+        self.kind = kind
+        self.spatial = spatial
+        self.choices = choices
+        self.minvalue = minvalue
+        self.maxvalue = maxvalue
+        self.soft_max = maxvalue if soft_max is None else soft_max
+        self.ask = ask
+        self.prompt = prompt or name.replace("_", " ").capitalize()
+        self.levels = levels
+        self.default: Any = None  # filled from the function signature
+
+    def __repr__(self) -> str:
+        return f"Param({self.name!r}, {self.kind}, default={self.default!r})"
+
+
+def _ksize_param(maxvalue=None) -> Param:
+    conv = _sobel_ksize if maxvalue == 31 else _ksize
+    return Param(
+        "ksize", conv, spatial=True, minvalue=1, maxvalue=maxvalue, soft_max=maxvalue or 51,
+        prompt="Kernel length",
+    )
+
+
+def _prob_param(name: str) -> Param:
+    prompt = name.split("_")[0].capitalize() + " probability"
+    return Param(name, _prob, "float", minvalue=0.0, maxvalue=1.0, prompt=prompt)
+
+
+def _method_param(choices: Tuple[str, ...]) -> Param:
+    return Param("method", _choice(choices), "choice", choices=choices, ask=False)
+
+
+def _seed_param() -> Param:
+    # GUI previews stay random; chains pass a seed for reproducible output
+    return Param("seed", int, ask=False)
+
+
+def _norm_param() -> Param:
+    return Param("norm", _choice(NORMS), "choice", choices=NORMS, ask=False)
+
+
+# -------------------- Filter spec --------------------
+class FilterSpec:
+    """A registered filter: its function plus everything planners need to know."""
+
+    __slots__ = ("name", "func", "params", "category", "label", "radius", "kernel", "inplace", "cost")
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[..., ArrayLike],
+        params: Sequence[Param] = (),
+        *,
+        category: str,
+        label: Optional[str] = None,
+        radius: Optional[Callable[..., int]] = None,
+        kernel: Optional[Callable[..., Optional[Kernel]]] = None,
+        inplace: bool = False,
+        cost: Optional[Callable[..., float]] = None,
+    ):
+        signature = inspect.signature(func).parameters
+        for p in params:
+            if p.name not in signature:
+                raise ValueError(f"'{name}' has no parameter '{p.name}'")
+            default = signature[p.name].default
+            p.default = None if default is inspect.Parameter.empty else default
+        self.name = name
+        self.func = func
+        self.params: Tuple[Param, ...] = tuple(params)
+        self.category = category
+        self.label = label or name
+        self.radius = radius
+        self.kernel = kernel
+        self.inplace = inplace
+        self.cost = cost or (lambda **_params: 1.0)
+
+    def defaults(self) -> Dict[str, Any]:
+        return {p.name: p.default for p in self.params}
+
+    def linear_kernel(self, **params) -> Optional[Kernel]:
+        """Kernel for these params, or None when the filter is not linear."""
+        return None if self.kernel is None else self.kernel(**params)
+
+    def __repr__(self) -> str:
+        return f"FilterSpec({self.name!r}, {self.func.__module__}.{self.func.__qualname__})"
+
+
+REGISTRY: Dict[str, FilterSpec] = {}
+_BY_FUNC: Dict[Callable[..., ArrayLike], FilterSpec] = {}
+
+
+def register(spec: FilterSpec) -> FilterSpec:
+    """Add a filter; names and functions must be unique."""
+    if spec.name in REGISTRY:
+        raise ValueError(f"filter '{spec.name}' is already registered")
+    if spec.func in _BY_FUNC:
+        raise ValueError(f"{spec.func.__qualname__} is already registered as '{_BY_FUNC[spec.func].name}'")
+    if spec.category not in CATEGORIES:
+        raise ValueError(f"category must be one of {CATEGORIES}, got {spec.category!r}")
+    REGISTRY[spec.name] = spec
+    _BY_FUNC[spec.func] = spec
+    return spec
+
+
+def lookup(name: str) -> FilterSpec:
+    spec = REGISTRY.get(name)
+    if spec is None:
+        raise ValueError(f"Unknown filter '{name}' (expected one of: {', '.join(REGISTRY)})")
+    return spec
+
+
+def spec_for(func: Callable) -> Optional[FilterSpec]:
+    return _BY_FUNC.get(func)
+
+
+def by_category(category: str) -> List[FilterSpec]:
+    return [s for s in REGISTRY.values() if s.category == category]
+
+
+# -------------------- Kernels, radii and costs --------------------
+def _gaussian_kernel(ksize=3) -> Kernel:
+    k = cv2.getGaussianKernel(check_ksize(ksize), 0).ravel()
+    return k, k
+
+
+def _mean_kernel(ksize=3) -> Kernel:
+    ksize = check_ksize(ksize)
+    k = np.full(ksize, 1.0 / ksize)
+    return k, k
+
+
+def _laplacian_kernel(strength=1.0, luminance=False) -> Optional[Kernel]:
+    # Laplacian() subtracts strength * cv2.Laplacian (ksize=1): identity - s*lap
+    # validated here too: a fused step never calls Laplacian() itself
+    s = check_strength(strength)
+    if luminance:
+        return None  # mixes channels through YCrCb; not a per-channel kernel
+    k = np.array([[0, -s, 0], [-s, 1 + 4 * s, -s], [0, -s, 0]], dtype=np.float64)
+    return k, None
+
+
+def _ksize_radius(ksize=3, **_params) -> int:
+    return check_ksize(ksize) // 2
+
+
+def _sobel_radius(ksize=3, **_params) -> int:
+    # ksize=1 still uses a 3-tap derivative
+    return max(1, check_ksize(ksize, maxvalue=31) // 2)
+
+
+def _unit_radius(**_params) -> int:
+    return 1
+
+
+def _no_radius(**_params) -> int:
+    return 0
+
+
+def _median_cost(ksize=3, **_params) -> float:
+    # sorting networks up to 5, then OpenCV's constant-time histogram median
+    return {1: 0.1, 3: 1.0, 5: 4.0}.get(check_ksize(ksize), 60.0)
+
+
+def _extreme_cost(ksize=3, method="auto", **_params) -> float:
+    ksize = check_ksize(ksize)
+    if method == "vhgw" or (method == "auto" and ksize >= VHGW_MIN_KSIZE):
+        return 12.0
+    return 0.1 * ksize
+
+
+def _impulse_cost(salt_prob=0.0, pepper_prob=0.0, **_params) -> float:
+    return 0.2 + 4.0 * (salt_prob + pepper_prob)
+
+
+# -------------------- Built-in filters --------------------
+for _spec in (
+    FilterSpec(
+        "gauss", gauss.Gaussian, (_ksize_param(),), category="smooth",
+        label="Gaussian Blur (HQ)", radius=_ksize_radius, kernel=_gaussian_kernel,
+        cost=lambda ksize=3, **_: 0.2 * check_ksize(ksize),
+    ),
+    FilterSpec(
+        "mean", mean.Mean, (_ksize_param(),), category="smooth",
+        label="Mean Filter", radius=_ksize_radius, kernel=_mean_kernel,
+        cost=lambda **_: 1.0,
+    ),
+    FilterSpec(
+        "median", median.Median, (_ksize_param(), _method_param(MEDIAN_METHODS)), category="smooth",
+        label="Median Filter", radius=_ksize_radius, cost=_median_cost,
+    ),
+    FilterSpec(
+        "min", min_.Min, (_ksize_param(), _method_param(EXTREME_METHODS)), category="smooth",
+        label="Min Filter", radius=_ksize_radius, cost=_extreme_cost,
+    ),
+    FilterSpec(
+        "max", max_.Max, (_ksize_param(), _method_param(EXTREME_METHODS)), category="smooth",
+        label="Max Filter", radius=_ksize_radius, cost=_extreme_cost,
+    ),
+    FilterSpec(
+        "laplace", laplace.Laplacian,
+        (Param("strength", _strength, "float", minvalue=0.0, soft_max=5.0), Param("luminance", _bool, "bool", prompt="Sharpen luminance only")),
+        category="sharp", label="Laplacian", radius=_unit_radius, kernel=_laplacian_kernel,
+        cost=lambda **_: 1.0,
+    ),
+    FilterSpec(
+        "sobel", sobel.Sobel, (_ksize_param(maxvalue=31), _norm_param()), category="sharp",
+        label="Sobel", radius=_sobel_radius, inplace=True,
+        cost=lambda ksize=3, **_: 2.0 + 0.2 * check_ksize(ksize, maxvalue=31),
+    ),
+    FilterSpec(
+        "prewitt", prewitt.Prewitt, (_norm_param(),), category="sharp",
+        label="Prewitt", radius=_unit_radius, inplace=True, cost=lambda **_: 2.5,
+    ),
+    FilterSpec(
+        "salt", salt.Salt, (_prob_param("salt_prob"), _seed_param()), category="noise",
+        label="Salt Noise", radius=_no_radius, cost=_impulse_cost,
+    ),
+    FilterSpec(
+        "pepper", pepper.Pepper, (_prob_param("pepper_prob"), _seed_param()), category="noise",
+        label="Pepper Noise", radius=_no_radius, cost=_impulse_cost,
+    ),
+    FilterSpec(
+        "salt_and_pepper", salt_and_pepper.Salt_and_Pepper,
+        (_prob_param("salt_prob"), _prob_param("pepper_prob"), _seed_param()),
+        category="noise", label="Salt and Pepper Noise", radius=_no_radius, cost=_impulse_cost,
+    ),
+    FilterSpec(
+        "gaussian_noise", gaussian.Gaussian_Noise,
+        (Param("sigma", float, "float", minvalue=0.0, soft_max=100.0, levels=1), _seed_param()),
+        category="noise", label="Gaussian Noise", radius=_no_radius, cost=lambda **_: 3.0,
+    ),
+    FilterSpec(
+        "speckle", speckle.Speckle, (Param("sigma", float, "float", minvalue=0.0, soft_max=1.0), _seed_param()),
+        category="noise", label="Speckle Noise", radius=_no_radius, cost=lambda **_: 3.0,
+    ),
+    FilterSpec(
+        "poisson", poisson.Poisson, (Param("scale", float, "float", minvalue=1e-6, soft_max=10.0, levels=-1), _seed_param()),
+        category="noise", label="Poisson Noise", radius=_no_radius, cost=lambda **_: 8.0,
+    ),
+):
+    register(_spec)
+del _spec
+
+
+__all__ = [
+    "CATEGORIES",
+    "Kernel",
+    "Param",
+    "FilterSpec",
+    "REGISTRY",
+    "register",
+    "lookup",
+    "spec_for",
+    "by_category",
+]
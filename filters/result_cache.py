@@ -0,0 +1,285 @@
+"""
+result_cache.py
+
+Persistent, content-addressed cache of filter-chain results, so re-running a
+chain on an image it has already processed is a file read.
+
+An entry's key is a digest of the source pixels (shape, dtype and bytes) and
+of the normalized chain: every step as its registered filter plus all of its
+parameters, defaults filled in, so "gauss" and "gauss:3" share an entry.
+Chains that cannot be named reproducibly (plain callables, noise steps
+without a seed) get no key and are never cached.
+
+Entries are lossless PNGs for 8/16-bit gray, BGR or BGRA images and
+compressed .npz files otherwise, stored as <root>/<key[:2]>/<key>.<ext>.
+Files are written to a temporary name and renamed, so readers (other batch
+processes included) never see partial entries. A hit refreshes the entry's
+mtime; once the directory grows past max_bytes the least recently used
+entries are deleted until it is back under 90% of the budget. Results that
+took less time to compute than they would take to decode are not stored.
+
+Exports:
+    - DiskCache(root=None, max_bytes=2 GiB, fmt="auto")
+    - DiskCache.default()                       # shared instance at default_root()
+    - DiskCache.key(source, steps, precision="native") -> Optional[str]
+                                                # source: image or image_digest()
+    - image_digest(img) -> str
+    - default_root() -> str                     # $IMAGE_FILTER_CACHE or ~/.cache/...
+    - chain_signature(steps) -> Optional[str]
+"""
+
+from __future__ import annotations
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import warnings
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+import numpy as np
+import cv2
+
+from filters.chain import Step
+from filters.registry import spec_for
+
+ArrayLike = np.ndarray
+
+# bump when the meaning of cached results changes
+_VERSION = b"result-cache-1"
+FORMATS = ("auto", "png", "npz")
+_EXTS = (".png", ".npz")
+_PNG_DTYPES = (np.uint8, np.uint16)
+# fraction of max_bytes kept after an eviction pass
+_LOW_WATER = 0.9
+# rough decode speed of an entry (pixel bytes per second); results that were
+# computed faster than they could be read back are not worth storing
+READ_RATE = 100 * 2**20
+
+
+def default_root() -> str:
+    """$IMAGE_FILTER_CACHE, else the user's cache directory."""
+    root = os.environ.get("IMAGE_FILTER_CACHE")
+    if root:
+        return root
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "image-processing-filters")
+
+
+def image_digest(img: ArrayLike) -> str:
+    """Digest of an image's shape, dtype and pixels."""
+    h = hashlib.blake2b(_VERSION, digest_size=20)
+    h.update(f"{img.shape}{img.dtype.str}".encode())
+    h.update(np.ascontiguousarray(img).data)
+    return h.hexdigest()
+
+
+def _step_signature(step: Callable) -> Optional[str]:
+    if not isinstance(step, Step):
+        return None
+    spec = spec_for(step.func)
+    if spec is None:
+        return None
+    params = dict(spec.defaults(), **step.params)
+    if any(p.name == "seed" for p in spec.params) and params.get("seed") is None:
+        return None  # fresh noise every run
+    values = ",".join(f"{name}={params[name]!r}" for name in sorted(params))
+    return f"{spec.name}({values})"
+
+
+def chain_signature(steps: Sequence[Callable]) -> Optional[str]:
+    """Normalized text form of a chain, or None if it cannot be cached."""
+    parts = [_step_signature(s) for s in steps]
+    if not parts or any(p is None for p in parts):
+        return None
+    return "|".join(parts)
+
+
+class DiskCache:
+    """On-disk LRU of chain results; safe to share between threads and processes."""
+
+    _default: Optional["DiskCache"] = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, root: Optional[str] = None, max_bytes: int = 2 * 2**30, fmt: str = "auto"):
+        if fmt not in FORMATS:
+            raise ValueError(f"fmt must be one of {FORMATS}, got {fmt!r}")
+        if max_bytes < 0:
+            raise ValueError(f"max_bytes must be >= 0, got {max_bytes}")
+        self.root = root or default_root()
+        self.max_bytes = max_bytes
+        self.fmt = fmt
+        self.hits = 0
+        self.misses = 0
+        self._nbytes: Optional[int] = None  # estimate, refreshed by _evict
+        self._lock = threading.Lock()
+
+    @classmethod
+    def default(cls) -> "DiskCache":
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    # ---- keys ----
+    @staticmethod
+    def key(
+        source: Union[ArrayLike, str], steps: Sequence[Callable], precision: str = "native"
+    ) -> Optional[str]:
+        """
+        Key of the chain applied to source (an image, or its image_digest()
+        when the same source is looked up repeatedly) at the given precision
+        (filters/precision.py), or None when the chain is not cacheable.
+        """
+        signature = chain_signature(steps)
+        if signature is None:
+            return None
+        if precision != "native":
+            signature += f"@{precision}"
+        digest = source if isinstance(source, str) else image_digest(source)
+        h = hashlib.blake2b(_VERSION, digest_size=20)
+        h.update(digest.encode() + b"\0" + signature.encode())
+        return h.hexdigest()
+
+    def _path(self, key: str, ext: str) -> str:
+        return os.path.join(self.root, key[:2], key + ext)
+
+    # ---- lookup ----
+    def get(self, key: Optional[str]) -> Optional[ArrayLike]:
+        """Cached result for key (None is always a miss)."""
+        if key is not None:
+            for ext in _EXTS:
+                path = self._path(key, ext)
+                try:
+                    img = self._read(path, ext)
+                except FileNotFoundError:
+                    continue
+                except Exception:
+                    _remove(path)  # unreadable entry: drop it
+                    continue
+                if img is not None:
+                    try:
+                        os.utime(path)
+                    except OSError:
+                        pass
+                    self.hits += 1
+                    return img
+        self.misses += 1
+        return None
+
+    @staticmethod
+    def _read(path: str, ext: str) -> Optional[ArrayLike]:
+        if ext == ".npz":
+            with np.load(path, allow_pickle=False) as data:
+                return data["image"]
+        data = np.fromfile(path, dtype=np.uint8)
+        img = cv2.imdecode(data, cv2.IMREAD_UNCHANGED)
+        if img is None:
+            raise ValueError(f"could not decode {path}")
+        return img
+
+    # ---- store ----
+    def put(self, key: Optional[str], img: ArrayLike, compute_s: Optional[float] = None):
+        """
+        Store img under key (no-op for None), evicting old entries if needed.
+        compute_s, the seconds img took to compute, skips results that are
+        cheaper to recompute than to read back (see READ_RATE).
+        """
+        if key is None or self.max_bytes == 0:
+            return
+        if compute_s is not None and compute_s < img.nbytes / READ_RATE:
+            return
+        png = self.fmt == "png" or (
+            self.fmt == "auto"
+            and img.dtype in _PNG_DTYPES
+            and (img.ndim == 2 or (img.ndim == 3 and img.shape[2] in (3, 4)))
+        )
+        ext = ".png" if png else ".npz"
+        path = self._path(key, ext)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path))
+        except OSError as e:
+            warnings.warn(f"Result cache not writable: {e}", RuntimeWarning)
+            return
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if png:
+                    ok, buf = cv2.imencode(".png", img, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+                    if not ok:
+                        raise ValueError(f"could not encode a {img.dtype} {img.shape} image as PNG")
+                    f.write(buf.tobytes())
+                else:
+                    np.savez_compressed(f, image=img)
+            size = os.path.getsize(tmp)
+            if size > self.max_bytes:
+                _remove(tmp)  # would evict everything, itself included
+                return
+            os.replace(tmp, path)
+        except OSError as e:
+            # a full or read-only disk only costs the cache entry
+            _remove(tmp)
+            warnings.warn(f"Could not store cache entry: {e}", RuntimeWarning)
+            return
+        except BaseException:
+            _remove(tmp)
+            raise
+        with self._lock:
+            if self._nbytes is not None:
+                self._nbytes += size
+            over = self._nbytes is None or self._nbytes > self.max_bytes
+        if over:
+            self._evict()
+
+    # ---- size bound ----
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        entries = []
+        for dirpath, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if name.endswith(".tmp"):
+                    # left behind by a killed writer; give live ones an hour
+                    if st.st_mtime < time.time() - 3600:
+                        _remove(path)
+                    continue
+                if name.endswith(_EXTS):
+                    entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _evict(self):
+        """Rescan the directory and delete the oldest entries if over budget."""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total > self.max_bytes:
+            target = self.max_bytes * _LOW_WATER
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                _remove(path)
+                total -= size
+        with self._lock:
+            self._nbytes = total
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes currently stored (rescans the directory)."""
+        return sum(size for _, size, _ in self._entries())
+
+    def clear(self):
+        for _, _, path in self._entries():
+            _remove(path)
+        with self._lock:
+            self._nbytes = 0
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+__all__ = ["DiskCache", "default_root", "image_digest", "chain_signature"]
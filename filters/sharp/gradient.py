@@ -0,0 +1,170 @@
+"""
+gradient.py
+
+Gradient engine behind Sobel and Prewitt sharpening.
+
+Both derivatives go into int16 scratch buffers (float32 when the aperture is
+large enough to overflow int16, or for the L2 norm; float64 for Sobel
+apertures of 17 and up, whose taps outgrow float32), the magnitude is
+saturated straight to uint8, and the sharpened image is one saturating add
+into the output. Scratch buffers are kept per thread and reused while the
+image size stays the same, so repeated calls (previews, batches, tiles)
+allocate nothing but the result - or nothing at all when out= is given.
+
+16-bit and float images keep their dtype: derivatives and magnitude are
+float32 (float64 for float64 input), saturated into uint16 but not clipped
+for floats, which a float32 chain quantizes at its end
+(filters/precision.py).
+
+Norms:
+    - "l1"   |gx| + |gy|
+    - "l2"   sqrt(gx^2 + gy^2)
+    - "max"  max(|gx|, |gy|)
+"""
+
+import threading
+import numpy as np
+import cv2
+from filters.params import check_ksize
+
+OPERATORS = ("sobel", "prewitt")
+NORMS = ("l1", "l2", "max")
+
+_PREWITT_X = np.array([[-1, 0, 1], [-1, 0, 1], [-1, 0, 1]], dtype=np.float32)
+_PREWITT_Y = np.array([[-1, -1, -1], [0, 0, 0], [1, 1, 1]], dtype=np.float32)
+# Sobel apertures computed in float64 (larger taps lose precision in float32)
+_SOBEL_F64_KSIZE = 17
+# BGR -> luma weights of cv2.COLOR_BGR2GRAY
+_GRAY_WEIGHTS = np.array([[0.114, 0.587, 0.299]])
+
+_local = threading.local()
+
+
+def _scratch(role, shape, dtype):
+    """Per-thread buffer reused across calls with the same shape and dtype."""
+    bufs = getattr(_local, "bufs", None)
+    if bufs is None:
+        bufs = _local.bufs = {}
+    buf = bufs.get(role)
+    if buf is None or buf.shape != shape or buf.dtype != dtype:
+        buf = bufs[role] = np.empty(shape, dtype)
+    return buf
+
+
+def Gradient_Magnitude(gray, op="sobel", ksize=3, norm="l1", out=None):
+    """Saturated uint8 gradient magnitude of a single-channel image."""
+    if op not in OPERATORS:
+        raise ValueError(f"op must be one of {OPERATORS}, got {op!r}")
+    if norm not in NORMS:
+        raise ValueError(f"norm must be one of {NORMS}, got {norm!r}")
+    if gray.ndim != 2:
+        raise ValueError(f"expected a single-channel image, got shape {gray.shape}")
+    ksize = check_ksize(ksize, maxvalue=31)
+    shape = gray.shape
+
+    # Sobel apertures above 5 can exceed the int16 range on uint8 input, and
+    # from 17 up the taps grow past float32's 24-bit mantissa
+    use_float = norm == "l2" or (op == "sobel" and ksize > 5)
+    if op == "sobel" and ksize >= _SOBEL_F64_KSIZE:
+        depth, dtype = cv2.CV_64F, np.float64
+    elif use_float:
+        depth, dtype = cv2.CV_32F, np.float32
+    else:
+        depth, dtype = cv2.CV_16S, np.int16
+    gx = _scratch("gx", shape, dtype)
+    gy = _scratch("gy", shape, dtype)
+    if op == "sobel":
+        cv2.Sobel(gray, depth, 1, 0, dst=gx, ksize=ksize)
+        cv2.Sobel(gray, depth, 0, 1, dst=gy, ksize=ksize)
+    else:
+        cv2.filter2D(gray, depth, _PREWITT_X, dst=gx)
+        cv2.filter2D(gray, depth, _PREWITT_Y, dst=gy)
+
+    if out is None:
+        out = np.empty(shape, np.uint8)
+    if norm == "l2":
+        cv2.magnitude(gx, gy, magnitude=gx)
+        np.minimum(gx, 255, out=gx)
+        cv2.convertScaleAbs(gx, dst=out)
+        return out
+    if use_float:
+        # large apertures exceed the int32 range convertScaleAbs goes
+        # through, and wrap to ~0; saturate to 255 in float first
+        for g in (gx, gy):
+            np.abs(g, out=g)
+            np.minimum(g, 255, out=g)
+    # convertScaleAbs saturates |g| to 0..255; cv2.add / max saturate too
+    ay = _scratch("ay", shape, np.uint8)
+    cv2.convertScaleAbs(gx, dst=out)
+    cv2.convertScaleAbs(gy, dst=ay)
+    if norm == "l1":
+        cv2.add(out, ay, dst=out)
+    else:
+        cv2.max(out, ay, dst=out)
+    return out
+
+
+def _float_magnitude(gray, op, ksize, norm):
+    """Unsaturated gradient magnitude of a 16-bit or float single-channel image."""
+    if op not in OPERATORS:
+        raise ValueError(f"op must be one of {OPERATORS}, got {op!r}")
+    if norm not in NORMS:
+        raise ValueError(f"norm must be one of {NORMS}, got {norm!r}")
+    ksize = check_ksize(ksize, maxvalue=31)
+    wide = op == "sobel" and ksize >= _SOBEL_F64_KSIZE
+    if gray.dtype == np.float64 or wide:
+        depth, dtype = cv2.CV_64F, np.float64
+    else:
+        depth, dtype = cv2.CV_32F, np.float32
+    gx = _scratch("fgx", gray.shape, dtype)
+    gy = _scratch("fgy", gray.shape, dtype)
+    if op == "sobel":
+        cv2.Sobel(gray, depth, 1, 0, dst=gx, ksize=ksize)
+        cv2.Sobel(gray, depth, 0, 1, dst=gy, ksize=ksize)
+    else:
+        cv2.filter2D(gray, depth, _PREWITT_X, dst=gx)
+        cv2.filter2D(gray, depth, _PREWITT_Y, dst=gy)
+    if norm == "l2":
+        return cv2.magnitude(gx, gy, magnitude=gx)
+    np.abs(gx, out=gx)
+    np.abs(gy, out=gy)
+    return cv2.add(gx, gy, dst=gx) if norm == "l1" else cv2.max(gx, gy, dst=gx)
+
+
+def _float_sharpen(img, op, ksize, norm, out):
+    if img.ndim == 2:
+        gray = img
+    elif img.dtype == np.float64:
+        gray = cv2.transform(img, _GRAY_WEIGHTS)  # cvtColor has no 64-bit path
+    else:
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    mag = _float_magnitude(gray, op, ksize, norm)
+    if np.issubdtype(img.dtype, np.integer):
+        np.clip(mag, 0, np.iinfo(img.dtype).max, out=mag)
+        mag = np.rint(mag, out=mag).astype(img.dtype)
+    elif mag.dtype != img.dtype:
+        mag = mag.astype(img.dtype)
+    if img.ndim == 3:
+        mag = cv2.merge([mag] * img.shape[2])
+    return cv2.add(img, mag, dst=out)
+
+
+def Gradient_Sharpen(img, op="sobel", ksize=3, norm="l1", out=None):
+    """
+    Add the gradient magnitude of img to every channel, saturating at 255
+    (at 65535 for uint16; floats are not clipped).
+    out may be a preallocated array shaped like img, or img itself.
+    """
+    if out is not None and (out.shape != img.shape or out.dtype != img.dtype):
+        raise ValueError("out must be an array shaped and typed like img")
+    if img.dtype != np.uint8:
+        return _float_sharpen(img, op, ksize, norm, out)
+    if img.ndim == 2:
+        gray = img
+    else:
+        gray = _scratch("gray", img.shape[:2], np.uint8)
+        cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, dst=gray)
+    mag = Gradient_Magnitude(gray, op, ksize, norm, out=_scratch("mag", gray.shape, np.uint8))
+    if img.ndim == 3:
+        mag = cv2.cvtColor(mag, cv2.COLOR_GRAY2BGR, dst=_scratch("mag3", img.shape, np.uint8))
+    return cv2.add(img, mag, dst=out)
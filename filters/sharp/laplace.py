@@ -1,15 +1,31 @@
 import cv2
 import numpy as np
+from filters.params import check_strength
 
-def Laplacian(image):
-    b, g, r = cv2.split(image)
-    lap_b = cv2.Laplacian(b, cv2.CV_64F)
-    lap_g = cv2.Laplacian(g, cv2.CV_64F)
-    lap_r = cv2.Laplacian(r, cv2.CV_64F)
+# output depth of the weighted add for inputs other than uint8
+_DEPTHS = {np.dtype(np.uint16): cv2.CV_16U, np.dtype(np.float32): cv2.CV_32F, np.dtype(np.float64): cv2.CV_64F}
 
-    sharp_b = np.clip(b + lap_b, 0, 255).astype(np.uint8)
-    sharp_g = np.clip(g + lap_g, 0, 255).astype(np.uint8)
-    sharp_r = np.clip(r + lap_r, 0, 255).astype(np.uint8)
 
-    sharpened = cv2.merge([sharp_b, sharp_g, sharp_r])
+def Laplacian(image, strength=1.0, luminance=False):
+    # image - strength * lap: cv2.Laplacian has a negative centre, so
+    # subtracting it sharpens (adding it would blur)
+    strength = check_strength(strength)
+    if luminance and image.ndim == 3:
+        ycrcb = cv2.cvtColor(image, cv2.COLOR_BGR2YCrCb)
+        ycrcb[:, :, 0] = Laplacian(ycrcb[:, :, 0], strength)
+        return cv2.cvtColor(ycrcb, cv2.COLOR_YCrCb2BGR)
+
+    if image.dtype != np.uint8:
+        # 16-bit and float keep their dtype: float accumulation, saturated
+        # for uint16 and left unclipped for floats (see filters/precision.py)
+        depth = _DEPTHS.get(image.dtype)
+        if depth is None:
+            raise ValueError(f"unsupported image dtype {image.dtype}")
+        lap = cv2.Laplacian(image, cv2.CV_64F if depth == cv2.CV_64F else cv2.CV_32F)
+        return cv2.addWeighted(image, 1.0, lap, -float(strength), 0, dtype=depth)
+
+    # one call on the interleaved image, int16 accumulation, and a single
+    # saturating weighted add back to uint8
+    lap = cv2.Laplacian(image, cv2.CV_16S)
+    sharpened = cv2.addWeighted(image, 1.0, lap, -float(strength), 0, dtype=cv2.CV_8U)
     return sharpened
@@ -1,11 +1,8 @@
 import cv2
-from tkinter import simpledialog
+from filters.params import check_ksize
 
 
-def Gaussian(img):
-    ksize = simpledialog.askinteger(
-        title="Kernel Size", prompt="Enter a Kernel length",initialvalue=3, minvalue=1, maxvalue=21
-    )
-    ksize += ksize & 1 ^ 1
+def Gaussian(img, ksize=3):
+    ksize = check_ksize(ksize)
     gauss = cv2.GaussianBlur(img, (ksize, ksize), 0)
     return gauss
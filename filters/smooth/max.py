@@ -1,13 +1,6 @@
-import numpy as np
-import cv2
-from tkinter import simpledialog
+from filters.smooth.rank import max_filter
 
 
-def Max(img):
-    ksize = simpledialog.askinteger(
-        title="Kernel Size", prompt="Enter a Kernel length",initialvalue=3, minvalue=1, maxvalue=21
-    )
-    ksize += ksize & 1 ^ 1
-    kernel = np.ones((ksize, ksize), np.uint8)
-    pepper = cv2.dilate(img, kernel)
-    return pepper
+def Max(img, ksize=3, method="auto"):
+    # method: "auto", "opencv" (cv2.dilate) or "vhgw" (constant time in ksize)
+    return max_filter(img, ksize, method)
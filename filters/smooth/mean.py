@@ -1,11 +1,9 @@
 import numpy as np
 import cv2
-from tkinter import simpledialog
+from filters.params import check_ksize
 
 
-def Mean(img):
-    ksize = simpledialog.askinteger(title="Kernel Size", prompt="Enter a Kernel length",initialvalue=3, minvalue=1,maxvalue=21)
-    ksize += ksize&1^1
-    kernel = ksize
+def Mean(img, ksize=3):
+    kernel = check_ksize(ksize)
     mean_filtered = cv2.blur(img, (kernel, kernel))
     return mean_filtered
@@ -1,10 +1,6 @@
-import numpy as np
-import cv2
-from tkinter import simpledialog
+from filters.smooth.rank import median_filter
 
-def Median(img):
-    ksize = simpledialog.askinteger(title="Kernel Size", prompt="Enter a Kernel length",initialvalue=3, minvalue=1,maxvalue=21)
-    ksize += ksize&1^1
-    kernel = ksize
-    img = cv2.medianBlur(img, kernel)
-    return img
\ No newline at end of file
+
+def Median(img, ksize=3, method="auto"):
+    # method: "auto", "opencv" (cv2.medianBlur) or "sort" (any dtype)
+    return median_filter(img, ksize, method)
@@ -0,0 +1,179 @@
+"""
+rank.py
+
+Rank-filter engine behind Median, Min and Max, with a cost per pixel that
+does not grow with the kernel size.
+
+Min / max use the van Herk / Gil-Werman algorithm: a k x k window is split
+into a vertical and a horizontal 1D pass, and each pass cuts the line into
+blocks of k samples, takes running extremes forwards and backwards inside
+every block, and combines one forward and one backward value per output.
+That is three comparisons per sample whatever k is. The passes work on whole
+rows at a time (numpy ufuncs over contiguous rows), so any dtype and channel
+count is supported. Borders behave like cv2.erode / cv2.dilate: samples
+outside the image are ignored.
+
+Median on uint8 runs cv2.medianBlur, which above ksize 5 already is the
+Perreault / Hebert constant-time sliding-histogram median (one column
+histogram per image column, updated by one add and one remove per row).
+Other dtypes and large kernels fall back to an exact sort over the window,
+done in row bands so memory stays bounded; it is O(k^2) per pixel and only
+meant for 16-bit / float inputs that medianBlur does not accept.
+
+Methods:
+    - "auto"      pick the fastest exact method for the dtype and ksize
+    - "opencv"    cv2.erode / cv2.dilate / cv2.medianBlur
+    - "vhgw"      van Herk / Gil-Werman min / max
+    - "sort"      banded window sort (median only)
+
+Exports:
+    - min_filter(img, ksize=3, method="auto")
+    - max_filter(img, ksize=3, method="auto")
+    - median_filter(img, ksize=3, method="auto")
+"""
+
+from __future__ import annotations
+import numpy as np
+import cv2
+
+from filters.params import check_ksize
+
+ArrayLike = np.ndarray
+
+EXTREME_METHODS = ("auto", "opencv", "vhgw")
+MEDIAN_METHODS = ("auto", "opencv", "sort")
+
+# cv2.erode/dilate with a rectangular kernel are SIMD row/column passes whose
+# cost still grows with k; on a 24 MP BGR image vHGW takes a flat ~0.4 s and
+# overtakes them a little above k = 101
+VHGW_MIN_KSIZE = 121
+
+# window elements per band for the sort-based median (~64 MB of uint8)
+_SORT_BAND_ELEMS = 1 << 26
+
+
+def _check_method(method, choices):
+    if method not in choices:
+        raise ValueError(f"method must be one of {choices}, got {method!r}")
+    return method
+
+
+def _identity(dtype, op):
+    """Value that never wins op (the border fill of erode / dilate)."""
+    if np.issubdtype(dtype, np.integer):
+        info = np.iinfo(dtype)
+        return info.max if op is np.minimum else info.min
+    return np.inf if op is np.minimum else -np.inf
+
+
+# -------------------- van Herk / Gil-Werman --------------------
+def _vhgw_rows(a: ArrayLike, ksize: int, op) -> ArrayLike:
+    """Running op over ksize rows of a 2D array, centred, borders ignored."""
+    n, cols = a.shape
+    r = ksize // 2
+    blocks = -(-(n + 2 * r) // ksize)
+    fill = _identity(a.dtype, op)
+
+    # g: forward running op inside each block, built in the padded copy
+    g = np.empty((blocks * ksize, cols), a.dtype)
+    g[:r] = fill
+    g[r : r + n] = a
+    g[r + n :] = fill
+    h = np.empty_like(g)
+    gb = g.reshape(blocks, ksize, cols)
+    hb = h.reshape(blocks, ksize, cols)
+
+    # h: backward running op, read from g before g is overwritten
+    hb[:, -1] = gb[:, -1]
+    for i in range(ksize - 2, -1, -1):
+        op(hb[:, i + 1], gb[:, i], out=hb[:, i])
+    for i in range(1, ksize):
+        op(gb[:, i - 1], gb[:, i], out=gb[:, i])
+
+    # window [j, j + k) of the padded line = op(h[j], g[j + k - 1])
+    return op(h[:n], g[ksize - 1 : ksize - 1 + n])
+
+
+def _transpose(img: ArrayLike) -> ArrayLike:
+    """Swap the two spatial axes into a new contiguous array."""
+    if img.ndim == 2 or img.shape[2] <= 4:
+        try:
+            return cv2.transpose(img)  # blocked, several times numpy's copy
+        except cv2.error:
+            pass  # depth cv2 does not handle (e.g. int64)
+    return np.ascontiguousarray(img.swapaxes(0, 1))
+
+
+def _vhgw(img: ArrayLike, ksize: int, op) -> ArrayLike:
+    if ksize == 1:
+        return img.copy()
+    h, w = img.shape[:2]
+    rest = img.shape[2:]
+    step = int(np.prod(rest, dtype=np.int64))
+    out = _vhgw_rows(np.ascontiguousarray(img).reshape(h, w * step), ksize, op)
+    # horizontal pass as a vertical pass over the transposed image
+    t = _transpose(out.reshape(img.shape))
+    t = _vhgw_rows(t.reshape(w, h * step), ksize, op)
+    return _transpose(t.reshape((w, h) + rest))
+
+
+def _extreme(img, ksize, method, op, morph):
+    ksize = check_ksize(ksize)
+    method = _check_method(method, EXTREME_METHODS)
+    if method == "auto":
+        method = "vhgw" if ksize >= VHGW_MIN_KSIZE else "opencv"
+    if method == "vhgw":
+        return _vhgw(img, ksize, op)
+    return morph(img, cv2.getStructuringElement(cv2.MORPH_RECT, (ksize, ksize)))
+
+
+def min_filter(img: ArrayLike, ksize: int = 3, method: str = "auto") -> ArrayLike:
+    """Minimum over a ksize x ksize window (grey erosion)."""
+    return _extreme(img, ksize, method, np.minimum, cv2.erode)
+
+
+def max_filter(img: ArrayLike, ksize: int = 3, method: str = "auto") -> ArrayLike:
+    """Maximum over a ksize x ksize window (grey dilation)."""
+    return _extreme(img, ksize, method, np.maximum, cv2.dilate)
+
+
+# -------------------- Median --------------------
+def _median_sort(img: ArrayLike, ksize: int) -> ArrayLike:
+    """Exact median of every window, in row bands; borders replicate."""
+    r = ksize // 2
+    pad = [(r, r), (r, r)] + [(0, 0)] * (img.ndim - 2)
+    src = np.pad(img, pad, mode="edge")
+    out = np.empty_like(img)
+    h, w = img.shape[:2]
+    row = w * ksize * ksize * int(np.prod(img.shape[2:], dtype=np.int64))
+    band = max(1, _SORT_BAND_ELEMS // row)
+    for y0 in range(0, h, band):
+        y1 = min(h, y0 + band)
+        win = np.lib.stride_tricks.sliding_window_view(src[y0 : y1 + 2 * r], (ksize, ksize), axis=(0, 1))
+        win = win.reshape(win.shape[: img.ndim] + (-1,))
+        mid = ksize * ksize // 2
+        out[y0:y1] = np.partition(win, mid, axis=-1)[..., mid]
+    return out
+
+
+def median_filter(img: ArrayLike, ksize: int = 3, method: str = "auto") -> ArrayLike:
+    """Median over a ksize x ksize window."""
+    ksize = check_ksize(ksize)
+    method = _check_method(method, MEDIAN_METHODS)
+    if method == "auto":
+        # medianBlur takes any ksize on uint8, but only 3 and 5 otherwise
+        opencv_ok = img.dtype == np.uint8 or (ksize <= 5 and img.dtype in (np.uint16, np.float32))
+        method = "opencv" if opencv_ok else "sort"
+    if method == "opencv":
+        return cv2.medianBlur(img, ksize)
+    return _median_sort(img, ksize)
+
+
+__all__ = [
+    "EXTREME_METHODS",
+    "MEDIAN_METHODS",
+    "VHGW_MIN_KSIZE",
+    "min_filter",
+    "max_filter",
+    "median_filter",
+]
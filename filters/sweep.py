@@ -0,0 +1,386 @@
+"""
+sweep.py
+
+Parameter sweep that scores denoising filters: every noise configuration is
+crossed with every smoother configuration over a set of clean images, and
+each result is scored against its clean image with PSNR and SSIM
+(filters/metrics.py), giving a ranked table per noise configuration.
+
+Configurations are grids in the chain syntax, with '|' separating the
+values to try for an argument (the cartesian product is taken):
+
+    "salt_and_pepper:0.01|0.05|0.1:0.01|0.05|0.1"    # 9 noise configurations
+    "gaussian_noise:5|15|30"
+    "median:3|5|7,gauss"                              # 3 + 1 smoothers
+
+Smoothers given without a kernel size use the ksizes grid.
+
+Work is split into one task per (image, noise configuration): the task
+applies the noise once and runs every smoother still in the race on that
+one noisy image, scoring them together against SSIM statistics of the
+clean image computed once per image. Noise is seeded per image from the
+sweep seed (filters.chain.reseed), so a sweep is reproducible. Tasks run
+on a process pool, or inline with workers=1.
+
+Images are processed in rounds. After each round, a smoother that trails
+the best one for the same noise by more than prune_db of mean PSNR and
+also has a lower mean SSIM is dominated: it is not run on the remaining
+images and is reported as pruned, with the images it was scored on. Every
+config left in the race has been scored on the same images.
+
+The noisy input itself is scored as the "(none)" smoother, so the table
+shows how much each filter actually helps.
+
+Exports:
+    - parse_grid(spec, ksizes=None) -> List[Step]
+    - Score                                # aggregated result of one config
+    - run_sweep(images, noises, smoothers, *, workers, seed, ...) -> List[Score]
+    - ranked(scores, metric="psnr") -> List[Score]
+    - format_table(scores, metric="psnr", top=None) -> str
+    - write_results(path, scores, metric="psnr")    # .csv or .json
+"""
+
+from __future__ import annotations
+import csv
+import itertools
+import json
+import math
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+import numpy as np
+import cv2
+
+from filters.chain import Step, reseed
+from filters.metrics import SSIM, psnr
+from filters.registry import lookup
+
+ArrayLike = np.ndarray
+# an image, or the path of one (decoded in the worker)
+ImageSource = Union[ArrayLike, str]
+# images, or the path of a stacked N x H x W [x C] .npy (memory-mapped in
+# every worker, so the set is never copied into the processes)
+ImageSet = Union[Sequence[ImageSource], str]
+
+METRICS = ("psnr", "ssim")
+NONE = "(none)"
+# smoothed candidates scored per SSIM call, bounding the float32 stack
+_SCORE_BATCH = 16
+
+
+# -------------------- Grids --------------------
+def _grid_step(text: str, ksizes: Optional[Sequence[int]]) -> List[Step]:
+    name, *args = [a.strip() for a in text.strip().split(":")]
+    spec = lookup(name)
+    if len(args) > len(spec.params):
+        raise ValueError(f"Filter '{name}' takes at most {len(spec.params)} argument(s), got {len(args)}")
+    axes: List[List[Tuple[str, Any]]] = []
+    for i, param in enumerate(spec.params):
+        raw = args[i] if i < len(args) else ""
+        if raw:
+            values = []
+            for v in raw.split("|"):
+                try:
+                    values.append(param.convert(v.strip()))
+                except ValueError as e:
+                    raise ValueError(f"Bad value {v!r} for '{name}' {param.name}: {e}") from None
+        elif param.name == "ksize" and ksizes:
+            values = [param.convert(str(k)) for k in ksizes]
+        else:
+            continue
+        # "4|5" rounds both to 5: keep each value once, in order
+        axes.append([(param.name, v) for v in dict.fromkeys(values)])
+    return [Step(name, spec.func, dict(combo)) for combo in itertools.product(*axes)]
+
+
+def parse_grid(spec: str, ksizes: Optional[Sequence[int]] = None) -> List[Step]:
+    """Every configuration of a comma-separated grid spec (module docstring)."""
+    steps = [s for part in spec.split(",") if part.strip() for s in _grid_step(part, ksizes)]
+    if not steps:
+        raise ValueError("grid is empty")
+    return steps
+
+
+def _label(step: Optional[Step]) -> str:
+    return NONE if step is None else step.spec()
+
+
+# -------------------- Results --------------------
+class Score:
+    """Mean PSNR / SSIM of one smoother on one noise configuration."""
+
+    __slots__ = ("noise", "smoother", "images", "psnr_sum", "ssim_sum", "seconds", "pruned")
+
+    def __init__(self, noise: str, smoother: str):
+        self.noise = noise
+        self.smoother = smoother
+        self.images = 0
+        self.psnr_sum = 0.0
+        self.ssim_sum = 0.0
+        self.seconds = 0.0  # smoothing time, summed over images
+        self.pruned = False
+
+    def add(self, psnr_db: float, ssim_value: float, seconds: float):
+        # identical images score inf dB; cap so means stay finite
+        self.psnr_sum += min(psnr_db, 100.0)
+        self.ssim_sum += ssim_value
+        self.seconds += seconds
+        self.images += 1
+
+    @property
+    def psnr(self) -> float:
+        return self.psnr_sum / self.images if self.images else float("nan")
+
+    @property
+    def ssim(self) -> float:
+        return self.ssim_sum / self.images if self.images else float("nan")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "noise": self.noise,
+            "smoother": self.smoother,
+            "psnr": self.psnr,
+            "ssim": self.ssim,
+            "images": self.images,
+            "ms_per_image": 1e3 * self.seconds / self.images if self.images else None,
+            "pruned": self.pruned,
+        }
+
+    def __repr__(self) -> str:
+        return f"Score({self.noise} -> {self.smoother}: {self.psnr:.2f} dB, SSIM {self.ssim:.4f})"
+
+
+# -------------------- Worker side --------------------
+_images: Union[Sequence[ImageSource], ArrayLike] = ()
+_loaded: Dict[int, Tuple[ArrayLike, SSIM]] = {}
+# decoded images (with their SSIM statistics) kept per process
+_MAX_LOADED = 4
+
+
+def _open_images(images: ImageSet) -> Union[Sequence[ImageSource], ArrayLike]:
+    """images itself, or the stacked .npy at that path memory-mapped."""
+    if isinstance(images, str):
+        stack = np.load(images, mmap_mode="r")
+        if stack.ndim not in (3, 4):
+            raise ValueError(f"expected an N x H x W [x C] stack in {images}, got shape {stack.shape}")
+        return stack
+    return list(images)
+
+
+def _set_images(images: ImageSet):
+    global _images
+    _images = _open_images(images)
+    _loaded.clear()
+
+
+def _init_worker(images: ImageSet):
+    _set_images(images)
+    cv2.setNumThreads(1)  # one process per core already
+
+
+def _clean(index: int) -> Tuple[ArrayLike, SSIM]:
+    entry = _loaded.get(index)
+    if entry is None:
+        img = _images[index]
+        if isinstance(img, str):
+            path = img
+            img = cv2.imread(path, cv2.IMREAD_COLOR)
+            if img is None:
+                raise ValueError(f"could not decode image {path}")
+        # frames of a memory-mapped stack are read here, one at a time
+        img = np.array(img) if isinstance(img, np.memmap) else np.asarray(img)
+        if len(_loaded) >= _MAX_LOADED:
+            _loaded.pop(next(iter(_loaded)))
+        entry = _loaded[index] = (img, SSIM(img))
+    return entry
+
+
+def _evaluate(
+    index: int, noise: Step, smoothers: Sequence[Tuple[int, Optional[Step]]], seed: int
+) -> List[Tuple[int, float, float, float]]:
+    """
+    Noise image `index` once and score every smoother on it.
+    Returns (smoother id, PSNR, SSIM, seconds) per smoother.
+    """
+    clean, ref = _clean(index)
+    if any(p.name == "seed" for p in lookup(noise.name).params):
+        # the same stream for every noise config: differences come from the params
+        base = noise.params.get("seed")
+        noise = Step(noise.name, noise.func, dict(noise.params, seed=seed if base is None else base))
+        noise = reseed(noise, index)
+    noisy = noise(clean)
+    rows = []
+    for start in range(0, len(smoothers), _SCORE_BATCH):
+        group = smoothers[start : start + _SCORE_BATCH]
+        outs, times = [], []
+        for _, smoother in group:
+            t0 = time.perf_counter()
+            outs.append(noisy if smoother is None else smoother(noisy))
+            times.append(time.perf_counter() - t0)
+        stack = np.stack(outs)
+        for (sid, _), p, s, t in zip(group, psnr(clean, stack), ref.scores(stack), times):
+            rows.append((sid, float(p), float(s), t))
+    return rows
+
+
+# -------------------- Driver --------------------
+def _run_inline(fn, *args) -> Future:
+    fut: Future = Future()
+    fut.set_result(fn(*args))
+    return fut
+
+
+def _prune(scores: Dict[int, Score], active: List[int], prune_db: float) -> List[int]:
+    """Configs of `active` still in the race after dropping dominated ones."""
+    racing = [sid for sid in active if scores[sid].smoother != NONE]
+    if not racing:
+        return active
+    best = max(racing, key=lambda sid: scores[sid].psnr)
+    top_psnr, top_ssim = scores[best].psnr, scores[best].ssim
+    keep = []
+    for sid in active:
+        s = scores[sid]
+        if s.smoother != NONE and top_psnr - s.psnr > prune_db and s.ssim < top_ssim:
+            s.pruned = True
+        else:
+            keep.append(sid)
+    return keep
+
+
+def run_sweep(
+    images: ImageSet,
+    noises: Sequence[Step],
+    smoothers: Sequence[Step],
+    *,
+    workers: Optional[int] = None,
+    seed: int = 0,
+    round_size: Optional[int] = None,
+    prune_db: Optional[float] = 2.0,
+    min_images: int = 2,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> List[Score]:
+    """
+    Score every smoother on every noise configuration over images (arrays
+    or paths, or the path of a stacked .npy, which each worker memory-maps
+    instead of receiving a copy). workers=1 runs inline, None uses
+    one process per core. round_size images are evaluated between pruning
+    passes (default: max(workers, 2)); prune_db=None never prunes, and
+    nothing is pruned before min_images images. progress(done, total) is
+    called after every round with image counts.
+    """
+    if not isinstance(images, str):
+        images = list(images)
+    count = len(_open_images(images))
+    if not count:
+        raise ValueError("no images to sweep")
+    if not noises or not smoothers:
+        raise ValueError("need at least one noise and one smoother configuration")
+    if workers is not None and workers < 1:
+        raise ValueError(f"workers must be >= 1, got {workers}")
+    if min_images < 1:
+        raise ValueError(f"min_images must be >= 1, got {min_images}")
+    configs: List[Optional[Step]] = [None, *smoothers]
+    scores: Dict[int, Dict[int, Score]] = {}
+    active: Dict[int, List[int]] = {}
+    for ni, noise in enumerate(noises):
+        scores[ni] = {sid: Score(noise.spec(), _label(s)) for sid, s in enumerate(configs)}
+        active[ni] = list(range(len(configs)))
+    if round_size is None:
+        round_size = max(workers or 1, 2)
+
+    pool = None
+    if workers != 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(images,))
+        submit = pool.submit
+    else:
+        _set_images(images)
+        submit = _run_inline
+    try:
+        for r0 in range(0, count, round_size):
+            jobs = []
+            for index in range(r0, min(r0 + round_size, count)):
+                for ni, noise in enumerate(noises):
+                    todo = [(sid, configs[sid]) for sid in active[ni]]
+                    jobs.append((ni, submit(_evaluate, index, noise, todo, seed)))
+            for ni, job in jobs:
+                for sid, p, s, t in job.result():
+                    scores[ni][sid].add(p, s, t)
+            done = min(r0 + round_size, count)
+            if prune_db is not None and done >= min_images and done < count:
+                for ni in active:
+                    active[ni] = _prune(scores[ni], active[ni], prune_db)
+            if progress is not None:
+                progress(done, count)
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True)
+        else:
+            _set_images(())
+    return [s for per_noise in scores.values() for s in per_noise.values()]
+
+
+# -------------------- Reporting --------------------
+def ranked(scores: Sequence[Score], metric: str = "psnr") -> List[Score]:
+    """Grouped by noise configuration (in sweep order), best first within each."""
+    if metric not in METRICS:
+        raise ValueError(f"metric must be one of {METRICS}, got {metric!r}")
+    order = {noise: i for i, noise in enumerate(dict.fromkeys(s.noise for s in scores))}
+
+    def key(s: Score):
+        value = getattr(s, metric)
+        return (order[s.noise], s.pruned, -value if not math.isnan(value) else math.inf)
+
+    return sorted(scores, key=key)
+
+
+def format_table(scores: Sequence[Score], metric: str = "psnr", top: Optional[int] = None) -> str:
+    """Ranked plain-text table; top limits the rows per noise configuration."""
+    lines: List[str] = []
+    header = f"{'rank':>4}  {'smoother':<28} {'PSNR dB':>8} {'SSIM':>7} {'images':>6} {'ms/img':>8}"
+    noise = None
+    rank = 0
+    for s in ranked(scores, metric):
+        if s.noise != noise:
+            noise, rank = s.noise, 0
+            if lines:
+                lines.append("")
+            lines += [f"noise {noise}", header]
+        rank += 1
+        if top is not None and rank > top:
+            continue
+        ms = f"{1e3 * s.seconds / s.images:8.2f}" if s.images else f"{'-':>8}"
+        note = "  pruned" if s.pruned else ""
+        lines.append(
+            f"{rank:>4}  {s.smoother:<28} {s.psnr:8.2f} {s.ssim:7.4f} {s.images:>6} {ms}{note}"
+        )
+    return "\n".join(lines)
+
+
+def write_results(path: str, scores: Sequence[Score], metric: str = "psnr"):
+    """Ranked results as CSV, or as JSON when path ends in .json."""
+    rows = []
+    noise, rank = None, 0
+    for s in ranked(scores, metric):
+        if s.noise != noise:
+            noise, rank = s.noise, 0
+        rank += 1
+        rows.append(dict(rank=rank, **s.to_dict()))
+    if path.endswith(".json"):
+        with open(path, "w") as f:
+            json.dump({"metric": metric, "results": rows}, f, indent=1)
+        return
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ["rank"])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+__all__ = [
+    "METRICS",
+    "parse_grid",
+    "Score",
+    "run_sweep",
+    "ranked",
+    "format_table",
+    "write_results",
+]
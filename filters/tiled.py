@@ -0,0 +1,179 @@
+"""
+tiled.py
+
+Tiled, memory-bounded execution of filter chains on images too large to hold
+in RAM. The source is memory-mapped, processed in overlapping tiles and the
+result is written straight into a memory-mapped output, so peak RSS depends
+on the tile size rather than the image size.
+
+Each tile is read with a halo equal to the chain's total kernel radius (the
+sum of the radii the filters declare in filters/registry.py), so
+tiles stitch together like a whole-image run (up to float rounding inside
+fused convolutions). Seeded noise steps get an independent seed per tile,
+derived from the step's seed and the tile's index (filters.chain.reseed), so
+tiles do not repeat one pattern; the output is reproducible for a given tile
+size, and a single-tile run matches the whole-image result.
+
+Supported containers:
+    - .npy            via numpy.load(mmap_mode="r") / open_memmap
+    - .raw            headerless pixels; needs shape= (and dtype=, default uint8)
+    - .tif / .tiff    via tifffile.memmap (optional dependency; uncompressed
+                      TIFFs only)
+
+Exports:
+    - step_radius(step) / chain_radius(steps)
+    - open_image(path, shape=None, dtype=np.uint8)
+    - run_tiled(src, steps, make_output, tile=1024, precision="native")
+    - process_file(src_path, dst_path, steps, tile=1024, ...)
+
+With precision="float32" each tile runs in float32 and is quantized once
+to the source dtype (filters/precision.py), so 16-bit scans keep 16 bits.
+"""
+
+from __future__ import annotations
+from pathlib import Path
+from typing import Callable, Optional, Sequence, Tuple, Any
+import numpy as np
+
+from filters.chain import Step, reseed, run_chain
+from filters.fuse import FusedStep, plan_chain
+from filters.precision import check_precision, run_chain_float
+from filters.registry import spec_for
+
+ArrayLike = np.ndarray
+FilterFunc = Callable[[ArrayLike], ArrayLike]
+
+
+# -------------------- Kernel footprints --------------------
+def step_radius(step: FilterFunc) -> int:
+    """Number of pixels a step reads beyond each output pixel."""
+    if isinstance(step, FusedStep):
+        sizes = step.kx.shape + (() if step.ky is None else step.ky.shape)
+        return max(sizes) // 2
+    if isinstance(step, Step):
+        func, params = step.func, step.params
+    else:
+        func, params = step, {}
+    spec = spec_for(func)
+    if spec is None or spec.radius is None:
+        raise ValueError(f"Unknown kernel footprint for {step!r}; cannot tile it")
+    return spec.radius(**params)
+
+
+def chain_radius(steps: Sequence[FilterFunc]) -> int:
+    """Halo needed so a tile's centre matches the whole-image result."""
+    return sum(step_radius(s) for s in steps)
+
+
+# -------------------- Memory-mapped containers --------------------
+def _tifffile(action: str):
+    """The optional tifffile module, imported on the first TIFF access."""
+    try:
+        import tifffile
+    except ImportError:  # pragma: no cover - depends on environment
+        raise ImportError(f"{action} TIFF tiles requires the 'tifffile' package") from None
+    return tifffile
+
+
+def open_image(path, shape: Optional[Tuple[int, ...]] = None, dtype=np.uint8) -> ArrayLike:
+    """Memory-map an image for reading (.npy, .raw or .tif/.tiff)."""
+    path = Path(path)
+    ext = path.suffix.lower()
+    if ext == ".npy":
+        return np.load(path, mmap_mode="r")
+    if ext == ".raw":
+        if shape is None:
+            raise ValueError("raw input needs an explicit shape")
+        return np.memmap(path, dtype=dtype, mode="r", shape=tuple(shape))
+    if ext in (".tif", ".tiff"):
+        return _tifffile("reading").memmap(path, mode="r")
+    raise ValueError(f"Cannot memory-map '{ext}' files (use .npy, .raw or .tif)")
+
+
+def create_image(path, shape: Tuple[int, ...], dtype) -> ArrayLike:
+    """Create a writable memory-mapped output of the given shape and dtype."""
+    path = Path(path)
+    ext = path.suffix.lower()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if ext == ".npy":
+        return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+    if ext == ".raw":
+        return np.memmap(path, dtype=dtype, mode="w+", shape=shape)
+    if ext in (".tif", ".tiff"):
+        return _tifffile("writing").memmap(path, shape=shape, dtype=dtype)
+    raise ValueError(f"Cannot memory-map '{ext}' files (use .npy, .raw or .tif)")
+
+
+# -------------------- Tiled execution --------------------
+def run_tiled(
+    src: ArrayLike,
+    steps: Sequence[FilterFunc],
+    make_output: Callable[[Tuple[int, ...], Any], ArrayLike],
+    *,
+    tile: int = 1024,
+    precision: str = "native",
+) -> ArrayLike:
+    """
+    Run steps over src tile by tile, at the given precision.
+
+    make_output(shape, dtype) is called once, after the first tile, with the
+    shape/dtype of the full result, and must return a writable array (usually
+    a memmap from create_image). Returns that array.
+    """
+    if tile < 1:
+        raise ValueError(f"tile must be >= 1, got {tile}")
+    check_precision(precision)
+    plan = plan_chain(steps)
+    halo = chain_radius(plan)
+    h, w = src.shape[:2]
+    cols = -(-w // tile)
+    single = h <= tile and w <= tile
+    dst = None
+
+    for y0 in range(0, h, tile):
+        y1 = min(y0 + tile, h)
+        ry0, ry1 = max(0, y0 - halo), min(h, y1 + halo)
+        for x0 in range(0, w, tile):
+            x1 = min(x0 + tile, w)
+            rx0, rx1 = max(0, x0 - halo), min(w, x1 + halo)
+            # copy the (haloed) tile out of the map so filters see a plain array
+            region = np.array(src[ry0:ry1, rx0:rx1])
+            index = (y0 // tile) * cols + x0 // tile
+            steps = plan if single else [reseed(s, index) for s in plan]
+            out = run_chain(region, steps) if precision == "native" else run_chain_float(region, steps)
+            if dst is None:
+                dst = make_output((h, w) + out.shape[2:], out.dtype)
+            dst[y0:y1, x0:x1] = out[y0 - ry0 : y1 - ry0, x0 - rx0 : x1 - rx0]
+        if hasattr(dst, "flush"):
+            dst.flush()  # hand finished rows back to the OS
+    return dst
+
+
+def process_file(
+    src_path,
+    dst_path,
+    steps: Sequence[FilterFunc],
+    *,
+    tile: int = 1024,
+    shape: Optional[Tuple[int, ...]] = None,
+    dtype=np.uint8,
+    precision: str = "native",
+) -> None:
+    """Tile a memory-mapped file through steps into a memory-mapped output file."""
+    src = open_image(src_path, shape=shape, dtype=dtype)
+    dst = run_tiled(
+        src, steps, lambda shp, dt: create_image(dst_path, shp, dt), tile=tile, precision=precision
+    )
+    if hasattr(dst, "flush"):
+        dst.flush()
+    del dst, src
+
+
+__all__ = [
+    "step_radius",
+    "chain_radius",
+    "open_image",
+    "create_image",
+    "run_tiled",
+    "process_file",
+]
@@ -0,0 +1,375 @@
+"""
+trace.py
+
+Instrumentation of filter calls and chains. Every filter the chain runners
+(filters/chain.py, filters/parallel.py, the GUI session) execute goes
+through call(); whole chains are wrapped in span(). Each becomes an Event
+with wall time, CPU time, bytes allocated, input/output shape and dtype and
+the error if it raised, handed to every installed sink:
+
+    JsonlSink(path)        one JSON object per line (append; safe to share
+                           between the processes of a batch run)
+    ChromeTraceSink(path)  Chrome trace-event file for chrome://tracing or
+                           https://ui.perfetto.dev
+    StatsSink()            per-filter totals in memory (the GUI stats panel)
+
+With no sink installed, call() is a plain function call.
+
+cpu_s is process CPU time over the span, so it includes the band threads
+and OpenCV's own pool (and anything else running at the same time).
+alloc_bytes is only measured after enable_memory(), which starts
+tracemalloc (NumPy reports its buffers to it); it is the peak traced memory
+above the level at the start of the span, and slows execution.
+
+Setting IMAGE_FILTER_TRACE=path.jsonl (or path.json for a Chrome trace)
+installs a sink for the whole process, e.g. for a production session.
+
+Usage:
+    python -m filters.trace run.jsonl run.json   # JSON lines -> Chrome trace
+
+Exports:
+    - Event
+    - call(step, img, kind="filter", run=None) -> output of step(img)
+    - span(name, img=None, kind="chain")     # context manager; .done(out)
+    - chain_span(steps, img=None)            # span named after a chain
+    - step_name(step) -> str
+    - add_sink(sink), remove_sink(sink), enable_memory(on=True)
+    - JsonlSink(path), ChromeTraceSink(path), StatsSink()
+    - jsonl_to_chrome(src, dst)
+"""
+
+from __future__ import annotations
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+import numpy as np
+
+ArrayLike = np.ndarray
+
+_sinks: List[Any] = []
+_sinks_lock = threading.Lock()
+_memory = False
+_local = threading.local()
+
+
+class Event:
+    """One timed filter call or chain."""
+
+    __slots__ = (
+        "name",
+        "kind",
+        "ts",
+        "wall_s",
+        "cpu_s",
+        "alloc_bytes",
+        "in_shape",
+        "in_dtype",
+        "out_shape",
+        "out_dtype",
+        "error",
+        "pid",
+        "tid",
+        "depth",
+    )
+
+    def __init__(self, name: str, kind: str, img: Optional[ArrayLike]):
+        self.name = name
+        self.kind = kind
+        self.ts = time.time()
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self.alloc_bytes: Optional[int] = None
+        self.in_shape, self.in_dtype = _describe(img)
+        self.out_shape: Optional[tuple] = None
+        self.out_dtype: Optional[str] = None
+        self.error: Optional[str] = None
+        self.pid = os.getpid()
+        self.tid = threading.get_ident()
+        self.depth = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"Event({self.kind} {self.name!r}, {self.wall_s * 1e3:.2f} ms)"
+
+
+def _describe(img) -> tuple:
+    if isinstance(img, np.ndarray):
+        return tuple(img.shape), img.dtype.name
+    return None, None
+
+
+def step_name(step: Callable) -> str:
+    """Readable name of a step: chain spec, fused members or function name."""
+    spec = getattr(step, "spec", None)
+    if callable(spec):
+        return spec()
+    members = getattr(step, "steps", None)
+    if members is not None:
+        return "fused(" + "+".join(step_name(s) for s in members) + ")"
+    return getattr(step, "__name__", None) or type(step).__name__
+
+
+# -------------------- Recording --------------------
+class span:
+    """
+    Time the enclosed block as one Event; call done(out) with its result to
+    record the output shape. Exceptions are recorded and re-raised.
+    """
+
+    __slots__ = ("event", "_t0", "_c0", "_m0", "_peak", "_parent")
+
+    def __init__(self, name: str, img: Optional[ArrayLike] = None, kind: str = "chain"):
+        self.event = Event(name, kind, img) if _sinks else None
+
+    def __enter__(self) -> "span":
+        if self.event is None:
+            return self
+        stack = _stack()
+        self._parent = stack[-1] if stack else None
+        self.event.depth = len(stack)
+        stack.append(self)
+        self._peak = 0
+        if _memory and tracemalloc.is_tracing():
+            self._m0 = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        else:
+            self._m0 = None
+        self._c0 = time.process_time()
+        self._t0 = time.perf_counter()
+        return self
+
+    def done(self, out) -> Any:
+        if self.event is not None:
+            self.event.out_shape, self.event.out_dtype = _describe(out)
+        return out
+
+    def __exit__(self, exc_type, exc, tb):
+        ev = self.event
+        if ev is None:
+            return False
+        ev.wall_s = time.perf_counter() - self._t0
+        ev.cpu_s = time.process_time() - self._c0
+        if self._m0 is not None:
+            # peaks of nested spans were reset by them; take the largest
+            peak = max(self._peak, tracemalloc.get_traced_memory()[1])
+            ev.alloc_bytes = max(0, peak - self._m0)
+            if self._parent is not None:
+                self._parent._peak = max(self._parent._peak, peak)
+        if exc is not None:
+            ev.error = f"{exc_type.__name__}: {exc}"
+        _stack().pop()
+        _emit(ev)
+        return False
+
+
+def chain_span(steps: Sequence[Callable], img: Optional[ArrayLike] = None) -> span:
+    """span() named after the steps of a chain ("median:5,sobel:3")."""
+    name = ",".join(step_name(s) for s in steps) if _sinks else ""
+    return span(name, img, "chain")
+
+
+def _stack() -> list:
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def call(
+    step: Callable[[ArrayLike], ArrayLike],
+    img: ArrayLike,
+    kind: str = "filter",
+    run: Optional[Callable[[Callable, ArrayLike], ArrayLike]] = None,
+):
+    """
+    step(img), or run(step, img) (e.g. a band-parallel runner), recorded as
+    an Event when a sink is installed.
+    """
+    if not _sinks:
+        return step(img) if run is None else run(step, img)
+    with span(step_name(step), img, kind) as s:
+        return s.done(step(img) if run is None else run(step, img))
+
+
+def _emit(event: Event):
+    for sink in list(_sinks):
+        try:
+            sink.record(event)
+        except Exception as e:  # a broken sink must not break filtering
+            print(f"trace sink {sink!r} failed: {e}", file=sys.stderr)
+
+
+def add_sink(sink):
+    """Start sending events to sink (any object with record(event))."""
+    with _sinks_lock:
+        if sink not in _sinks:
+            _sinks.append(sink)
+
+
+def remove_sink(sink):
+    with _sinks_lock:
+        if sink in _sinks:
+            _sinks.remove(sink)
+
+
+def enable_memory(on: bool = True):
+    """Measure alloc_bytes (starts or stops tracemalloc)."""
+    global _memory
+    _memory = on
+    if on and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not on and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+# -------------------- Sinks --------------------
+class JsonlSink:
+    """Append each event to path as one JSON line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", buffering=1, encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def record(self, event: Event):
+        line = json.dumps(event.to_dict()) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+_CHROME_ARGS = ("cpu_s", "alloc_bytes", "in_shape", "in_dtype", "out_shape", "out_dtype", "error")
+
+
+def _chrome_event(ev: Dict[str, Any]) -> Dict[str, Any]:
+    args = {k: ev[k] for k in _CHROME_ARGS}
+    return {
+        "name": ev["name"],
+        "cat": ev["kind"],
+        "ph": "X",
+        "ts": ev["ts"] * 1e6,
+        "dur": ev["wall_s"] * 1e6,
+        "pid": ev["pid"],
+        "tid": ev["tid"],
+        "args": {k: v for k, v in args.items() if v is not None},
+    }
+
+
+class ChromeTraceSink:
+    """Collect events and write them as a Chrome trace on close()."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def record(self, event: Event):
+        with self._lock:
+            self._events.append(_chrome_event(event.to_dict()))
+
+    def close(self):
+        with self._lock:
+            events, self._events = self._events, []
+        _write_chrome(self.path, events)
+
+
+def _write_chrome(path: str, events: List[Dict[str, Any]]):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+class StatsSink:
+    """Per-name totals of recorded events, e.g. for a stats panel."""
+
+    FIELDS = ("calls", "errors", "wall_s", "cpu_s", "max_s")
+
+    def __init__(self, kinds: Iterable[str] = ("filter", "chain")):
+        self.kinds = set(kinds)
+        self._stats: "OrderedDict[tuple, Dict[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, event: Event):
+        if event.kind not in self.kinds:
+            return
+        with self._lock:
+            s = self._stats.get((event.kind, event.name))
+            if s is None:
+                s = self._stats[event.kind, event.name] = dict.fromkeys(self.FIELDS, 0)
+            s["calls"] += 1
+            s["errors"] += event.error is not None
+            s["wall_s"] += event.wall_s
+            s["cpu_s"] += event.cpu_s
+            s["max_s"] = max(s["max_s"], event.wall_s)
+
+    def rows(self) -> List[tuple]:
+        """(kind, name, stats) sorted by total wall time, largest first."""
+        with self._lock:
+            items = [(k, n, dict(s)) for (k, n), s in self._stats.items()]
+        return sorted(items, key=lambda r: r[2]["wall_s"], reverse=True)
+
+    def clear(self):
+        with self._lock:
+            self._stats.clear()
+
+
+def jsonl_to_chrome(src: str, dst: str) -> int:
+    """Convert a JsonlSink file to a Chrome trace. Returns the event count."""
+    with open(src, encoding="utf-8") as f:
+        events = [_chrome_event(json.loads(line)) for line in f if line.strip()]
+    _write_chrome(dst, events)
+    return len(events)
+
+
+def _install_from_env():
+    path = os.environ.get("IMAGE_FILTER_TRACE")
+    if not path:
+        return
+    sink = ChromeTraceSink(path) if path.endswith(".json") else JsonlSink(path)
+    add_sink(sink)
+    atexit.register(sink.close)
+
+
+_install_from_env()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert a JSON-lines trace to a Chrome trace.")
+    parser.add_argument("source", help="trace written by JsonlSink / --trace")
+    parser.add_argument("output", help="Chrome trace-event .json file")
+    args = parser.parse_args(argv)
+    count = jsonl_to_chrome(args.source, args.output)
+    print(f"Wrote {count} event(s) to {args.output}")
+    return 0
+
+
+__all__ = [
+    "Event",
+    "call",
+    "span",
+    "chain_span",
+    "step_name",
+    "add_sink",
+    "remove_sink",
+    "enable_memory",
+    "JsonlSink",
+    "ChromeTraceSink",
+    "StatsSink",
+    "jsonl_to_chrome",
+]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
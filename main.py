@@ -1,180 +1,266 @@
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+from tkinter import ttk, filedialog, messagebox, simpledialog
 import os
-import cv2
-from PIL import Image, ImageTk
+import threading
 
-from pages.Smooth import Smooth
-from pages.Sharp import Sharp
-from pages.Noise import Noise
+# Only tkinter is imported up front so the window appears at once; OpenCV,
+# NumPy, PIL and the filter pages load on first use (pages.load_page) or in
+# the background once the window is up (see benchmarks/bench_startup.py).
+from pages import PAGES, load_page
 
-img_path = None
-out = None
-org = None
+# the open image, its thumbnail and history; None when nothing is loaded
+doc = None
+# PhotoView of img_label, created when the first image is shown
+img_view = None
+# size of the grey placeholder shown when no image is loaded
+BLANK_SIZE = (400, 300)
+
+
+def show_image(img):
+    global img_view
+    if img_view is None:
+        from pages.assets.display import PhotoView
+
+        img_view = PhotoView(img_label)
+    img_view.show(img)
+
+
+def show_blank():
+    global img_view
+    # a plain Tk image: needs neither NumPy nor PIL
+    w, h = BLANK_SIZE
+    blank = tk.PhotoImage(width=w, height=h)
+    blank.put("#808080", to=(0, 0, w, h))
+    img_label.configure(image=blank)
+    img_label.image = blank  # keep a reference against GC
+    img_view = None  # the next image gets a fresh PhotoImage
+
+
+def preload():
+    """Import the pages (and with them OpenCV, NumPy, PIL) in the background."""
+
+    def run():
+        for name in PAGES:
+            try:
+                load_page(name)
+            except Exception:
+                pass  # reported when the page is actually opened
+
+    threading.Thread(target=run, name="preload", daemon=True).start()
 
 
 def read_image():
-    global img_path, img_label, img_tk
-    if img_path:
-        img_pil = Image.open(img_path)
-        img_pil.thumbnail((400, 300))
-        img_tk = ImageTk.PhotoImage(img_pil)
-        img_label.config(image=img_tk)
-        img_label.image = img_tk
+    if doc:
+        show_image(doc.thumbnail)
 
 
 def reset_image():
-    global img_path, img_label, img_tk, org
-    if org:
-        img_path = org
+    if doc:
+        doc.reset()
         read_image()
         messagebox.showinfo("Reset", "Image reset to original")
 
 
 def clear_image():
-    global img_path, img_label, img_tk, org
-    img_def = Image.new("RGB", (400, 300), color="gray")
-    img_tk = ImageTk.PhotoImage(img_def)
-    img_label.config(image=img_tk)
-    img_label.image = img_tk
+    global doc
+    doc = None
+    show_blank()
     messagebox.showinfo("Image Cleared", "Image Cleared Successfully")
 
 
 def select_image():
-    global img_path, img_label, img_tk, org
+    global doc
     img_path = filedialog.askopenfilename(
         title="Select Image", filetypes=[("Image Files", "*.png;*.jpg;*.jpeg;*.bmp")]
     )
-    org = img_path
     if img_path:
-        img_pil = Image.open(img_path)
-        img_pil.thumbnail((400, 300))
-        img_tk = ImageTk.PhotoImage(img_pil)
-        img_label.config(image=img_tk)
-        img_label.image = img_tk
+        from pages.assets.document import Document
+
+        try:
+            # only the thumbnail is decoded now; the full image on first use
+            doc = Document.open(img_path, thumb_size=(400, 300))
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Open Image", str(e))
+            return
+        read_image()
         messagebox.showinfo(
             "Image Selected", f"Selected image: {os.path.basename(img_path)}"
         )
 
 
+def save_image():
+    if not doc:
+        messagebox.showinfo("Save Image", "Select an image first")
+        return
+    img_path = filedialog.asksaveasfilename(
+        title="Save Image",
+        defaultextension=".png",
+        filetypes=[
+            ("PNG", "*.png"),
+            ("JPEG", "*.jpg;*.jpeg"),
+            ("WebP", "*.webp"),
+            ("BMP", "*.bmp"),
+            ("TIFF", "*.tif;*.tiff"),
+        ],
+    )
+    if not img_path:
+        return
+    from pages.assets.document import SAVE_FORMATS
+
+    ext = os.path.splitext(img_path)[1].lower()
+    if ext not in SAVE_FORMATS:
+        messagebox.showerror("Save Image", f"Unsupported format: {ext or '(none)'}")
+        return
+    label, flag, (lo, hi), default = SAVE_FORMATS[ext]
+    level = None
+    if flag is not None:
+        level = simpledialog.askinteger(
+            title=label,
+            prompt=f"{label} ({lo}-{hi})",
+            initialvalue=default,
+            minvalue=lo,
+            maxvalue=hi,
+        )
+        if level is None:
+            return
+    try:
+        doc.save(img_path, level=level)
+    except (OSError, ValueError) as e:
+        messagebox.showerror("Save Image", str(e))
+        return
+    messagebox.showinfo("Image Saved", f"Saved image: {os.path.basename(img_path)}")
+
+
 def cv2_run():
-    im2 = cv2.imread(img_path)
-    cv2.imshow("Original Image", im2)
+    import cv2
+
+    cv2.imshow("Original Image", doc.image)
     cv2.waitKey(0)
     cv2.destroyAllWindows()
 
 
+def run_page(root, page):
+    # pages edit the document in memory and push the result onto its history
+    if not doc:
+        messagebox.showinfo("No Image", "Select an image first")
+        return
+    if load_page(page)(root, doc) is not None:
+        read_image()
+
+
 def Smooth_run(root):
-    global out, img_path
-    out = Smooth(root, cv2.imread(img_path))
-    cv2.imwrite("output.png", out)
-    img_path = "output.png"
-    read_image()
+    run_page(root, "Smooth")
 
 
 def Sharp_run(root):
-    global out, img_path
-    out = Sharp(root, cv2.imread(img_path))
-    cv2.imwrite("output.png", out)
-    img_path = "output.png"
-    read_image()
+    run_page(root, "Sharp")
 
 
 def Noise_run(root):
-    global out, img_path
-    out = Noise(root, cv2.imread(img_path))
-    cv2.imwrite("output.png", out)
-    img_path = "output.png"
-    read_image()
-
-
-root = tk.Tk()
-root.title("Image Processing Application")
-root.geometry("800x600")
-root.resizable(False, False)
-root.config(bg="#303031")
-
-
-root.grid_rowconfigure(0, weight=1)
-root.grid_columnconfigure(0, weight=1)
-root.grid_columnconfigure(1, weight=1)
-root.grid_columnconfigure(2, weight=1)
-
-img_pil = Image.new("RGB", (400, 300), color="gray")
-img_def = Image.new("RGB", (400, 300), color="gray")
-img_tk = ImageTk.PhotoImage(img_pil)
-img_label = tk.Label(root, image=img_tk)
-img_label.image = img_tk
-img_label.grid(row=0, column=0, columnspan=3, pady=20)
-
-img_btn = tk.Button(
-    root,
-    text="Select Image",
-    command=select_image,
-    font=("Arial", 10, "bold"),
-    border=2,
-    bg="#1F5579",
-    fg="white",
-)
-img_btn.grid(row=1, column=0, pady=10, padx=5)
-
-run_btn = tk.Button(
-    root,
-    text="Reset Image",
-    command=reset_image,
-    font=("Arial", 10, "bold"),
-    border=2,
-    bg="#000000",
-    fg="white",
-)
-run_btn.grid(row=1, column=1, pady=10, padx=5)
-
-clr_btn = tk.Button(
-    root,
-    text="Clear Image",
-    command=clear_image,
-    font=("Arial", 10, "bold"),
-    border=2,
-    bg="#992525",
-    fg="white",
-)
-clr_btn.grid(row=1, column=2, pady=10, padx=5)
-
-filter_lbl = tk.Label(
-    root, text="Select Filter:", font=("Arial", 20, "bold"), bg="#303031", fg="white"
-)
-filter_lbl.grid(row=2, column=0, pady=10, padx=5, columnspan=3)
-
-smooth_btn = tk.Button(
-    root,
-    text="Smooth",
-    command=lambda: Smooth_run(root),
-    font=("Arial", 10, "bold"),
-    border=2,
-    bg="#00AE17",
-    fg="white",
-)
-smooth_btn.grid(row=3, column=0, pady=10, padx=1)
-
-sharp_btn = tk.Button(
-    root,
-    text="Sharp",
-    command=lambda: Sharp_run(root),
-    font=("Arial", 10, "bold"),
-    border=2,
-    bg="#00AE17",
-    fg="white",
-)
-sharp_btn.grid(row=3, column=1, pady=10, padx=1)
-
-noise_btn = tk.Button(
-    root,
-    text="Noise",
-    command=lambda: Noise_run(root),
-    font=("Arial", 10, "bold"),
-    border=2,
-    bg="#00AE17",
-    fg="white",
-)
-noise_btn.grid(row=3, column=2, pady=10, padx=1)
-root.mainloop()
+    run_page(root, "Noise")
+
+
+def main():
+    global img_label
+    root = tk.Tk()
+    root.title("Image Processing Application")
+    root.geometry("800x600")
+    root.resizable(False, False)
+    root.config(bg="#303031")
+
+    root.grid_rowconfigure(0, weight=1)
+    root.grid_columnconfigure(0, weight=1)
+    root.grid_columnconfigure(1, weight=1)
+    root.grid_columnconfigure(2, weight=1)
+
+    img_label = tk.Label(root)
+    show_blank()
+    img_label.grid(row=0, column=0, columnspan=3, pady=20)
+
+    img_btn = tk.Button(
+        root,
+        text="Select Image",
+        command=select_image,
+        font=("Arial", 10, "bold"),
+        border=2,
+        bg="#1F5579",
+        fg="white",
+    )
+    img_btn.grid(row=1, column=0, pady=10, padx=5)
+
+    run_btn = tk.Button(
+        root,
+        text="Reset Image",
+        command=reset_image,
+        font=("Arial", 10, "bold"),
+        border=2,
+        bg="#000000",
+        fg="white",
+    )
+    run_btn.grid(row=1, column=1, pady=10, padx=5)
+
+    clr_btn = tk.Button(
+        root,
+        text="Clear Image",
+        command=clear_image,
+        font=("Arial", 10, "bold"),
+        border=2,
+        bg="#992525",
+        fg="white",
+    )
+    clr_btn.grid(row=1, column=2, pady=10, padx=5)
+
+    filter_lbl = tk.Label(
+        root, text="Select Filter:", font=("Arial", 20, "bold"), bg="#303031", fg="white"
+    )
+    filter_lbl.grid(row=2, column=0, pady=10, padx=5, columnspan=3)
+
+    smooth_btn = tk.Button(
+        root,
+        text="Smooth",
+        command=lambda: Smooth_run(root),
+        font=("Arial", 10, "bold"),
+        border=2,
+        bg="#00AE17",
+        fg="white",
+    )
+    smooth_btn.grid(row=3, column=0, pady=10, padx=1)
+
+    sharp_btn = tk.Button(
+        root,
+        text="Sharp",
+        command=lambda: Sharp_run(root),
+        font=("Arial", 10, "bold"),
+        border=2,
+        bg="#00AE17",
+        fg="white",
+    )
+    sharp_btn.grid(row=3, column=1, pady=10, padx=1)
+
+    noise_btn = tk.Button(
+        root,
+        text="Noise",
+        command=lambda: Noise_run(root),
+        font=("Arial", 10, "bold"),
+        border=2,
+        bg="#00AE17",
+        fg="white",
+    )
+    noise_btn.grid(row=3, column=2, pady=10, padx=1)
+
+    save_btn = tk.Button(
+        root,
+        text="Save Image",
+        command=save_image,
+        font=("Arial", 10, "bold"),
+        border=2,
+        bg="#1F5579",
+        fg="white",
+    )
+    save_btn.grid(row=4, column=0, pady=10, padx=5, columnspan=3)
+    root.after(100, preload)
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
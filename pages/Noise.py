@@ -5,46 +5,34 @@ Minimal example that imports filter_toolkit and uses show_filter_session.
 Run this with a Tk-capable environment (on WSL make sure python3-tk is installed).
 """
 
-import cv2
-from .assets.filter_toolkit import show_filter_session
-from filters.noise import salt, pepper, salt_and_pepper
+from .assets.filter_toolkit import show_filter_session, registry_filters
 
 
 # ---------- Define filters ----------
+# Every registered noise filter gets a button; its parameters are asked once per
+# click from the schema in filters/registry.py.
+FILTERS = registry_filters("noise")
 
-def Salt():
-    return lambda img: salt.Salt(img,0.15)
-def Pepper():
-    return lambda img: pepper.Pepper(img,0.15)
-def Salt_and_Pepper():
-    return lambda img: salt_and_pepper.Salt_and_Pepper(img,0.15)
 
-FILTERS = [
-    ("Salt Noise", Salt()),
-    ("Pepper Noise", Pepper()),
-    ("Salt and Pepper Noise", Salt_and_Pepper()),
-]
-
-
-def Noise(parent, image_bgr):
+def Noise(parent, doc):
     """
     Entry point for the smoothing genre.
     The main UI should call ONLY this function.
 
     Parameters:
         parent     : tk root or tk window
-        image_bgr  : OpenCV image (BGR)
+        doc        : Document (or a plain OpenCV BGR image)
 
     Returns:
-        np.ndarray (BGR) if user applied filters
+        the Document, with the filtered image pushed onto its history
+        (or the filtered np.ndarray when given an array)
         None if user cancelled
     """
-    image_bgr = cv2.resize(image_bgr, (500, 500))
     return show_filter_session(
         parent,
-        image_bgr,
+        doc,
         FILTERS,
-        title="Sharpening Filters",
+        title="Noise Filters",
         display_max_size=(800, 600),
         cumulative=True,
     )
@@ -5,50 +5,32 @@ Minimal example that imports filter_toolkit and uses show_filter_session.
 Run this with a Tk-capable environment (on WSL make sure python3-tk is installed).
 """
 
-import cv2
-from .assets.filter_toolkit import show_filter_session
-from filters.sharp import laplace, sobel, prewitt
+from .assets.filter_toolkit import show_filter_session, registry_filters
 
 
 # ---------- Define filters ----------
+# Every registered sharp filter gets a button; its parameters are asked once per
+# click from the schema in filters/registry.py.
+FILTERS = registry_filters("sharp")
 
 
-def Laplacian():
-    return lambda img: laplace.Laplacian(img)
-
-
-def Sobel():
-    return lambda img: sobel.Sobel(img)
-
-
-def Prewitt():
-    return lambda img: prewitt.Prewitt(img)
-
-
-FILTERS = [
-    ("Laplacian", Laplacian()),
-    ("Sobel", Sobel()),
-    ("Prewitt", Prewitt()),
-]
-
-
-def Sharp(parent, image_bgr):
+def Sharp(parent, doc):
     """
     Entry point for the smoothing genre.
     The main UI should call ONLY this function.
 
     Parameters:
         parent     : tk root or tk window
-        image_bgr  : OpenCV image (BGR)
+        doc        : Document (or a plain OpenCV BGR image)
 
     Returns:
-        np.ndarray (BGR) if user applied filters
+        the Document, with the filtered image pushed onto its history
+        (or the filtered np.ndarray when given an array)
         None if user cancelled
     """
-    image_bgr = cv2.resize(image_bgr, (500, 500))
     return show_filter_session(
         parent,
-        image_bgr,
+        doc,
         FILTERS,
         title="Sharpening Filters",
         display_max_size=(800, 600),
@@ -0,0 +1,39 @@
+"""
+Filter pages of the main window, imported the first time they are opened.
+
+A page module pulls in the filter registry, OpenCV, NumPy and PIL; keeping
+them out of main.py's imports lets the window appear before any of that is
+loaded (see benchmarks/bench_startup.py).
+
+Exports:
+    - PAGES                      # button label -> "module:function"
+    - load_page(name) -> page function(parent, doc)
+"""
+
+import importlib
+from typing import Callable, Dict
+
+PAGES = {
+    "Smooth": "pages.Smooth:Smooth",
+    "Sharp": "pages.Sharp:Sharp",
+    "Noise": "pages.Noise:Noise",
+}
+_loaded: Dict[str, Callable] = {}
+
+
+def load_page(name: str) -> Callable:
+    """Page entry point registered as name, importing its module on first use."""
+    page = _loaded.get(name)
+    if page is None:
+        target = PAGES.get(name)
+        if target is None:
+            raise ValueError(f"Unknown page '{name}' (expected one of: {', '.join(PAGES)})")
+        module, _, attr = target.partition(":")
+        page = _loaded[name] = getattr(importlib.import_module(module), attr)
+    return page
+
+
+__all__ = [
+    "PAGES",
+    "load_page",
+]
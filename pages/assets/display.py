@@ -0,0 +1,60 @@
+"""
+display.py
+
+Fast path from OpenCV arrays to Tk labels.
+
+A uint8 gray/BGR/BGRA array is handed to PIL as a raw buffer with a "BGR"
+(or "BGRA") raw mode, so PIL swaps the channels while unpacking it: one copy
+and no cv2.cvtColor. Each label keeps a single PhotoImage that new frames are
+paste()d into; it is only rebuilt when the frame size changes, so repeated
+previews (sliders, progressive renders) allocate no new Tk images.
+
+Exports:
+    - to_pil(img) -> PIL.Image.Image
+    - PhotoView(label)       # .show(img)
+"""
+
+from __future__ import annotations
+from typing import Optional, Tuple
+import numpy as np
+from PIL import Image, ImageTk
+
+ArrayLike = np.ndarray
+
+# channels -> (PIL mode, raw mode of the OpenCV layout)
+_MODES = {1: ("L", "L"), 3: ("RGB", "BGR"), 4: ("RGBA", "BGRA")}
+
+
+def to_pil(img: ArrayLike) -> Image.Image:
+    """PIL image of a uint8 gray, BGR or BGRA array, channels swapped by PIL."""
+    if img.dtype != np.uint8:
+        raise ValueError(f"expected a uint8 image, got {img.dtype}")
+    channels = 1 if img.ndim == 2 else img.shape[2]
+    if img.ndim not in (2, 3) or channels not in _MODES:
+        raise ValueError(f"Unsupported image shape: {img.shape}")
+    mode, rawmode = _MODES[channels]
+    h, w = img.shape[:2]
+    data = np.ascontiguousarray(img)  # no copy for the usual contiguous frame
+    return Image.frombuffer(mode, (w, h), data, "raw", rawmode, 0, 1)
+
+
+class PhotoView:
+    """One label's PhotoImage, updated in place while the size stays the same."""
+
+    def __init__(self, label):
+        self.label = label
+        self.photo: Optional[ImageTk.PhotoImage] = None
+        self._size: Optional[Tuple[int, int]] = None
+
+    def show(self, img: ArrayLike):
+        pil = to_pil(img)
+        if self.photo is not None and pil.size == self._size:
+            self.photo.paste(pil)
+            return
+        self.photo = ImageTk.PhotoImage(pil)
+        self._size = pil.size
+        self.label.configure(image=self.photo)
+        self.label.image = self.photo  # keep a reference against GC
+
+
+__all__ = ["to_pil", "PhotoView"]
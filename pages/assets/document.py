@@ -0,0 +1,245 @@
+"""
+document.py
+
+In-memory document shared by the main window and the filter pages: the
+current image, a cached thumbnail and an undo/redo history. Images are
+handed over as arrays; nothing touches the disk until save() is called.
+
+A document opened with Document.open() decodes only what is shown: the
+thumbnail and previews come from reduced-resolution decodes (see
+loader.py) and the full image is decoded the first time it is needed,
+typically when a filter is applied.
+
+Exports:
+    - Document(image_bgr, path=None, thumb_size=(400, 300), history_bytes=1 GiB)
+    - Document.load(path)            # decode now
+    - Document.open(path)            # decode on first use
+    - SAVE_FORMATS   # extension -> (name, cv2 quality/compression flag, range, default)
+"""
+
+from __future__ import annotations
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import cv2
+
+from pages.assets.loader import image_size, load_reduced, load_thumbnail
+
+ArrayLike = np.ndarray
+
+# extension -> (label, imencode flag, (lo, hi), default); flag None: no setting
+SAVE_FORMATS: Dict[str, Tuple[str, Optional[int], Tuple[int, int], int]] = {
+    ".png": ("PNG compression", cv2.IMWRITE_PNG_COMPRESSION, (0, 9), 3),
+    ".jpg": ("JPEG quality", cv2.IMWRITE_JPEG_QUALITY, (0, 100), 95),
+    ".jpeg": ("JPEG quality", cv2.IMWRITE_JPEG_QUALITY, (0, 100), 95),
+    ".webp": ("WebP quality", cv2.IMWRITE_WEBP_QUALITY, (1, 100), 90),
+    ".bmp": ("BMP", None, (0, 0), 0),
+    ".tif": ("TIFF", None, (0, 0), 0),
+    ".tiff": ("TIFF", None, (0, 0), 0),
+}
+
+
+class Document:
+    """
+    One open image and its edit history.
+
+    The original image is always kept; older undo states are dropped once
+    the history holds more than history_bytes of pixels. Images are shared,
+    not copied: treat them as read-only.
+
+    image_bgr may be None when path is given: the file is then decoded on
+    first access to image / original (see Document.open).
+    """
+
+    def __init__(
+        self,
+        image_bgr: Optional[ArrayLike],
+        path: Optional[str] = None,
+        thumb_size: Tuple[int, int] = (400, 300),
+        history_bytes: int = 2**30,
+    ):
+        if image_bgr is None and path is None:
+            raise ValueError("image is None")
+        self.path = path
+        self.thumb_size = thumb_size
+        self.history_bytes = history_bytes
+        self._original = image_bgr
+        self._image = image_bgr
+        self._undo: List[Tuple[str, ArrayLike]] = []
+        self._redo: List[Tuple[str, ArrayLike]] = []
+        self._thumb: Optional[ArrayLike] = None
+        self._size: Optional[Tuple[int, int]] = None
+        self._previews: Dict[Tuple[int, int], ArrayLike] = {}
+        self._load_lock = threading.Lock()
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "Document":
+        """Decode an image file (unicode paths included) into a Document."""
+        return cls(_decode(path), path=path, **kwargs)
+
+    @classmethod
+    def open(cls, path: str, **kwargs) -> "Document":
+        """
+        Document for path that reads only the file header now; the full image
+        is decoded on first use. Raises ValueError if path is not an image.
+        """
+        doc = cls(None, path=path, **kwargs)
+        doc._size = image_size(path)
+        return doc
+
+    # ---- current image ----
+    @property
+    def loaded(self) -> bool:
+        """Whether the full-resolution image has been decoded."""
+        return self._image is not None
+
+    def _ensure_loaded(self):
+        with self._load_lock:
+            if self._image is None:
+                self._original = self._image = _decode(self.path)
+                self._previews.clear()
+
+    @property
+    def image(self) -> ArrayLike:
+        if self._image is None:
+            self._ensure_loaded()
+        return self._image
+
+    @property
+    def original(self) -> ArrayLike:
+        if self._original is None:
+            self._ensure_loaded()
+        return self._original
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """(width, height) of the current image, without decoding it."""
+        if self._image is not None:
+            return self._image.shape[1], self._image.shape[0]
+        return self._size
+
+    def preview(self, max_size: Tuple[int, int]) -> ArrayLike:
+        """
+        The current image, or while it is not decoded yet, a reduced decode
+        that still covers max_size (to build previews from).
+        """
+        if self._image is not None:
+            return self._image
+        img = self._previews.get(max_size)
+        if img is None:
+            img = self._previews[max_size] = load_reduced(self.path, max_size)
+        return img
+
+    @property
+    def thumbnail(self) -> ArrayLike:
+        """Current image fitted inside thumb_size, computed once per change."""
+        if self._thumb is None and self._image is None:
+            # untouched file: reduced decode, shared by reopenings of the file
+            self._thumb = load_thumbnail(self.path, self.thumb_size)
+        if self._thumb is None:
+            h, w = self._image.shape[:2]
+            max_w, max_h = self.thumb_size
+            scale = min(max_w / w, max_h / h, 1.0)
+            if scale < 1.0:
+                size = (max(1, int(w * scale)), max(1, int(h * scale)))
+                self._thumb = cv2.resize(self._image, size, interpolation=cv2.INTER_AREA)
+            else:
+                self._thumb = self._image
+        return self._thumb
+
+    def _set(self, image: ArrayLike):
+        self._image = image
+        self._thumb = None
+        self.dirty = True
+
+    # ---- history ----
+    def push(self, image: ArrayLike, label: str = "Edit"):
+        """Make image the current one; the previous one goes on the undo stack."""
+        if image is None:
+            raise ValueError("image is None")
+        self._undo.append((label, self.image))
+        self._redo.clear()
+        self._set(image)
+        self._trim()
+
+    def _trim(self):
+        total = sum(img.nbytes for _, img in self._undo)
+        while self._undo and total > self.history_bytes:
+            _, dropped = self._undo.pop(0)
+            total -= dropped.nbytes
+
+    @property
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    @property
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def undo(self) -> bool:
+        if not self._undo:
+            return False
+        label, image = self._undo.pop()
+        self._redo.append((label, self._image))
+        self._set(image)
+        return True
+
+    def redo(self) -> bool:
+        if not self._redo:
+            return False
+        label, image = self._redo.pop()
+        self._undo.append((label, self._image))
+        self._set(image)
+        return True
+
+    def reset(self):
+        """Go back to the original image (itself undoable)."""
+        if self._image is not self._original:
+            self.push(self._original, "Reset")
+
+    def history(self) -> List[str]:
+        """Labels of the undoable steps, oldest first."""
+        return [label for label, _ in self._undo]
+
+    # ---- saving ----
+    def save(self, path: str, fmt: Optional[str] = None, level: Optional[int] = None) -> str:
+        """
+        Encode the current image and write it to path.
+        fmt is an extension such as ".png" (default: taken from path); level
+        is the format's compression / quality setting (see SAVE_FORMATS).
+        Returns the path written.
+        """
+        ext = (fmt or Path(path).suffix).lower()
+        if not ext.startswith("."):
+            ext = "." + ext
+        if ext not in SAVE_FORMATS:
+            raise ValueError(
+                f"unsupported format {ext!r} (expected one of: {', '.join(SAVE_FORMATS)})"
+            )
+        _, flag, (lo, hi), default = SAVE_FORMATS[ext]
+        params: List[int] = []
+        if flag is not None:
+            level = default if level is None else int(level)
+            if not lo <= level <= hi:
+                raise ValueError(f"level for {ext} must be within [{lo}, {hi}], got {level}")
+            params = [flag, level]
+        ok, buf = cv2.imencode(ext, self.image, params)
+        if not ok:
+            raise ValueError(f"could not encode image as {ext}")
+        buf.tofile(path)
+        self.path = path
+        self.dirty = False
+        return path
+
+
+def _decode(path: str) -> ArrayLike:
+    data = np.fromfile(path, dtype=np.uint8)
+    img = cv2.imdecode(data, cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError(f"could not decode image {path!r}")
+    return img
+
+
+__all__ = ["Document", "SAVE_FORMATS"]
@@ -5,27 +5,81 @@ Reusable module that shows a modal filter popup (Tkinter) for OpenCV images.
 
 Exports:
     - FilterSession(parent, filters, image_bgr, **kwargs)
-    - show_filter_session(parent, image_bgr, filters, **kwargs)
+    - show_filter_session(parent, image_bgr_or_document, filters, **kwargs)
+    - ask_ksize(title="Kernel Size")  # ready-made "params" collector
+    - ask_params(spec)                # "params" collector for a registered filter
+    - registry_filters(category)      # descriptors for every registered filter
 
 Filters descriptors accepted:
     - ("Name", func)                 # func used for both preview and full
     - ("Name", full_func, preview_func)
-    - {"name": "Name", "full": full_func, "preview": preview_func}
+    - {"name": "Name", "full": full_func, "preview": preview_func, "params": ask}
 
 All filter functions must accept and return a BGR numpy array (OpenCV convention).
+When a dict descriptor has "params", ask() is called once per button click and
+must return a dict of keyword arguments (or None to cancel); the filter is then
+bound to those arguments for both the preview and the full-resolution replay,
+so the filters themselves never prompt.
+
+Filters run on a background worker thread, so the popup stays responsive on
+large kernels; results are handed back to the Tk thread via after() polling.
+A click that arrives while a preview is still rendering supersedes it.
+
+Every intermediate image is memoized by chain prefix (see prefix_cache.py),
+so appending a step, Undo/Redo and Reset only compute what is new, and the
+full-resolution chain is pre-rendered in the background while the user is
+idle so Apply can start from the longest finished prefix. With full_image,
+the full resolution is not decoded until Apply, and nothing is pre-rendered
+before that.
+
+Clicking a registered filter (see filters/registry.py) adds it with its
+default parameters and shows a slider / checkbox per parameter for it.
+Dragging re-renders at once on a coarse pyramid level (coarse_levels below
+the preview level) and, once input pauses for debounce_ms, refines at
+display resolution; each render supersedes the previous one, so stale
+renders are dropped between steps. With live_params=False, or for filters
+that are not registered, parameters are asked with dialogs instead.
+
+The session keeps the image at its original size. Previews run on the level
+of a cached image pyramid (see pyramid.py) that just covers the preview
+widget, with the kernel sizes of parameterized steps scaled down to that
+level so the preview looks like the final result; Apply always runs the
+unscaled chain once at native resolution.
+
+With stats_panel=True the popup lists the time spent in each filter and
+chain (see filters/trace.py, which also writes JSON-lines / Chrome traces).
+
+Apply results are also kept in the persistent result cache (see
+filters/result_cache.py, result_cache=), so applying a chain of registered
+filters to an image it already ran on is a file read.
 """
 
 from __future__ import annotations
 import tkinter as tk
-from tkinter import ttk
+from concurrent.futures import Future, ThreadPoolExecutor
+from tkinter import ttk, simpledialog, messagebox
 from typing import Sequence, Tuple, Callable, Optional, Union, Dict, Any, List
+import threading
+import time
 import numpy as np
-from PIL import Image, ImageTk
 import cv2
 import warnings
 
+from filters import trace
+from filters.chain import Step
+from filters.fuse import plan_chain
+from filters.parallel import run_step_banded
+from filters.precision import quantize
+from filters.registry import FilterSpec, Param, by_category, spec_for
+from filters.result_cache import DiskCache, image_digest
+from .prefix_cache import PrefixCache, chain_keys
+from .pyramid import ImagePyramid, scale_step
+from .document import Document
+from .display import PhotoView
+
 ArrayLike = np.ndarray
 FilterFunc = Callable[[ArrayLike], ArrayLike]
+ParamsFunc = Callable[[], Optional[Dict[str, Any]]]
 FilterDescriptor = Union[
     Tuple[str, FilterFunc], Tuple[str, FilterFunc, FilterFunc], Dict[str, Any]
 ]
@@ -37,11 +91,12 @@ def _ensure_bgr_uint8(img: ArrayLike) -> ArrayLike:
     if img is None:
         raise ValueError("image is None")
     arr = np.asarray(img)
-    if np.issubdtype(arr.dtype, np.floating):
-        # assume in 0..1 range
-        arr = np.clip(arr * 255.0, 0, 255).astype(np.uint8)
-    else:
-        arr = arr.astype(np.uint8)
+    if arr.dtype == np.uint16 or np.issubdtype(arr.dtype, np.floating):
+        # 16-bit and 0..1 float data: rescale, round and saturate in one pass
+        arr = quantize(arr, np.uint8)
+    elif arr.dtype != np.uint8:
+        # other integers (e.g. arithmetic on uint8 pixels): saturate, don't wrap
+        arr = np.clip(arr, 0, 255).astype(np.uint8)
     if arr.ndim == 2:
         arr = cv2.cvtColor(arr, cv2.COLOR_GRAY2BGR)
     elif arr.ndim == 3 and arr.shape[2] == 1:
@@ -54,51 +109,113 @@ def _ensure_bgr_uint8(img: ArrayLike) -> ArrayLike:
 
 
 def _fit_image_bgr(img_bgr: ArrayLike, max_size=(640, 480)) -> ArrayLike:
-    """Resize image to fit inside max_size keeping aspect ratio."""
+    """
+    Resize image to fit inside max_size keeping aspect ratio. An image that
+    already fits is returned as is (images are treated as read-only).
+    """
     h, w = img_bgr.shape[:2]
     max_w, max_h = max_size
     scale = min(max_w / w, max_h / h, 1.0)
     if scale < 1.0:
-        new_w, new_h = int(w * scale), int(h * scale)
+        new_w, new_h = max(1, int(w * scale)), max(1, int(h * scale))
         return cv2.resize(img_bgr, (new_w, new_h), interpolation=cv2.INTER_AREA)
-    return img_bgr.copy()
+    return img_bgr
 
 
-def _bgr_to_photoimage(img_bgr: ArrayLike) -> ImageTk.PhotoImage:
-    """Convert BGR numpy image to Tk PhotoImage (via PIL)."""
-    img = _ensure_bgr_uint8(img_bgr)
-    rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-    pil = Image.fromarray(rgb)
-    return ImageTk.PhotoImage(pil)
+def ask_ksize(title: str = "Kernel Size") -> Optional[Dict[str, Any]]:
+    """Ask for a kernel length; returns {"ksize": k} or None if cancelled."""
+    ksize = simpledialog.askinteger(
+        title=title, prompt="Enter a Kernel length", initialvalue=3, minvalue=1, maxvalue=21
+    )
+    if ksize is None:
+        return None
+    return {"ksize": ksize}
 
 
-def _normalize_descriptor(desc: FilterDescriptor) -> Tuple[str, FilterFunc, FilterFunc]:
+def ask_params(spec: FilterSpec) -> ParamsFunc:
+    """
+    Collector asking for each of spec's GUI parameters in turn (others keep
+    their defaults); returns a dict of keyword arguments or None if cancelled.
     """
-    Normalize a filter descriptor to (name, full_func, preview_func).
+
+    def ask() -> Optional[Dict[str, Any]]:
+        values: Dict[str, Any] = {}
+        for p in spec.params:
+            if not p.ask:
+                continue
+            if p.kind == "bool":
+                value = messagebox.askyesnocancel(title=spec.label, message=f"{p.prompt}?")
+            elif p.kind in ("int", "float"):
+                askfn = simpledialog.askinteger if p.kind == "int" else simpledialog.askfloat
+                value = askfn(
+                    title=spec.label,
+                    prompt=p.prompt,
+                    initialvalue=p.default,
+                    minvalue=p.minvalue,
+                    maxvalue=p.maxvalue,
+                )
+            else:
+                value = simpledialog.askstring(
+                    title=spec.label,
+                    prompt=f"{p.prompt} ({', '.join(p.choices or ())})",
+                    initialvalue=p.default,
+                )
+            if value is None:
+                return None
+            try:
+                values[p.name] = p.convert(str(value))
+            except ValueError as e:
+                messagebox.showerror(spec.label, f"Bad value for {p.prompt}: {e}")
+                return None
+        return values
+
+    return ask
+
+
+def registry_filters(category: str) -> List[Dict[str, Any]]:
+    """Dict descriptors for every registered filter of a category."""
+    return [
+        {"name": spec.label, "full": spec.func, "params": ask_params(spec)}
+        for spec in by_category(category)
+    ]
+
+
+def _normalize_descriptor(
+    desc: FilterDescriptor,
+) -> Tuple[str, FilterFunc, FilterFunc, Optional[ParamsFunc]]:
+    """
+    Normalize a filter descriptor to (name, full_func, preview_func, params_func).
     Accepts:
       - (name, func)
       - (name, full_func, preview_func)
-      - {"name":..., "full":..., "preview":...}
+      - {"name":..., "full":..., "preview":..., "params":...}
     """
     if isinstance(desc, dict):
         name = desc.get("name")
         full = desc.get("full")
         preview = desc.get("preview", full)
+        params = desc.get("params")
         if name is None or full is None:
             raise ValueError("dict descriptor requires 'name' and 'full'")
-        return name, full, preview
+        if params is not None and not callable(params):
+            raise ValueError(f"'params' for '{name}' must be callable")
+        return name, full, preview, params
     if isinstance(desc, (tuple, list)):
         if len(desc) == 2:
             name, f = desc
-            return name, f, f
+            return name, f, f, None
         if len(desc) == 3:
             name, full, preview = desc
-            return name, full, preview
+            return name, full, preview, None
     raise ValueError(
         "Filter descriptor must be (name, func) or (name, full, preview) or dict"
     )
 
 
+class _Superseded(Exception):
+    """Raised inside a worker job once a newer request has replaced it."""
+
+
 # -------------------- Main combined class --------------------
 class FilterSession:
     """
@@ -113,7 +230,18 @@ class FilterSession:
                       cumulative=True,
                       title="Filters",
                       button_width=18,
-                      resizable=False)
+                      resizable=False,
+                      poll_ms=30,
+                      cache_bytes=256 MiB,
+                      prerender_full=True,
+                      threads="auto",
+                      live_params=True,
+                      debounce_ms=150,
+                      coarse_levels=2,
+                      result_cache=True,     # DiskCache, True (default one) or None
+                      stats_panel=False,
+                      full_image=None,       # image_bgr is a reduced copy; this
+                      full_size=None)        # returns the (w, h) original on demand
 
     Methods:
         run() -> Optional[np.ndarray]
@@ -131,6 +259,17 @@ class FilterSession:
         title: str = "Filters",
         button_width: int = 18,
         resizable: bool = False,
+        poll_ms: int = 30,
+        cache_bytes: int = 256 * 2**20,
+        prerender_full: bool = True,
+        threads: Union[int, str] = "auto",
+        live_params: bool = True,
+        debounce_ms: int = 150,
+        coarse_levels: int = 2,
+        result_cache: Union[DiskCache, bool, None] = True,
+        stats_panel: bool = False,
+        full_image: Optional[Callable[[], ArrayLike]] = None,
+        full_size: Optional[Tuple[int, int]] = None,
     ):
         self.parent = parent
         self.title = title
@@ -138,94 +277,595 @@ class FilterSession:
         self.cumulative = cumulative
         self.button_width = button_width
         self.resizable = resizable
+        self.poll_ms = poll_ms
+        self.prerender_full = prerender_full
+        # band-parallel threads per step (see filters/parallel.py)
+        self.threads = threads
+        self.live_params = live_params
+        self.debounce_ms = debounce_ms
+        self.stats_panel = stats_panel
 
         # Normalize filters
-        self._filters: List[Tuple[str, FilterFunc, FilterFunc]] = []
+        self._filters: List[
+            Tuple[str, FilterFunc, FilterFunc, Optional[ParamsFunc]]
+        ] = []
         for d in filters:
-            name, full, preview = _normalize_descriptor(d)
+            name, full, preview, params = _normalize_descriptor(d)
             if not callable(full) or not callable(preview):
                 raise ValueError(f"Filter functions for '{name}' must be callable")
-            self._filters.append((name, full, preview))
-
-        # images
-        self.base_full = _ensure_bgr_uint8(image_bgr)
+            self._filters.append((name, full, preview, params))
+
+        # images: previews run on base_preview, a pyramid level of base_full
+        # just large enough for the widget, and are fitted for display. With
+        # full_image, image_bgr is only a reduced decode to build previews
+        # from, and base_full is fetched on the worker by Apply
+        if full_image is not None and full_size is None:
+            raise ValueError("full_size is required with full_image")
+        self._full_image = full_image
+        self._base_full: Optional[ArrayLike] = None
+        self._full_lock = threading.Lock()
+        image_bgr = _ensure_bgr_uint8(image_bgr)
+        if full_image is None:
+            self._base_full = image_bgr
+            full_size = (image_bgr.shape[1], image_bgr.shape[0])
+        self._full_width = full_size[0]
+        self._pyramid = ImagePyramid(image_bgr)
+        self.preview_level = self._pyramid.level_for(self.display_max_size)
+        self.preview_scale = self._level_scale(self.preview_level)
+        self.base_preview = self._pyramid[self.preview_level]
         self.base_display = _fit_image_bgr(
-            self.base_full, max_size=self.display_max_size
+            self.base_preview, max_size=self.display_max_size
         )
-        self.preview_display = self.base_display.copy()
+        self.preview_display = self.base_display
+        # slider drags first render here, coarse_levels below the preview
+        self.coarse_level = self.preview_level + max(0, coarse_levels)
+        self.coarse_scale = self._level_scale(self.coarse_level)
 
         # chains for replay
         self._full_chain: List[FilterFunc] = []
         self._preview_chain: List[FilterFunc] = []
 
+        # intermediates by chain prefix, and (full, preview) chain snapshots
+        self._cache = PrefixCache(cache_bytes)
+        # Apply results across sessions (True: the shared default cache);
+        # base_full is hashed once, on the first Apply
+        if result_cache is True:
+            result_cache = DiskCache.default()
+        self._disk_cache: Optional[DiskCache] = result_cache or None
+        self._base_digest: Optional[str] = None
+        self._undo: List[Tuple[List[FilterFunc], List[FilterFunc]]] = []
+        self._redo: List[Tuple[List[FilterFunc], List[FilterFunc]]] = []
+
+        # background work: a single worker thread; every submit bumps
+        # _generation and older jobs notice and stop between steps
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Optional[Future] = None
+        self._generation = 0
+        self._progress = (0, 0)
+        self._busy = False
+        self._closed = False
+
         # result image after Apply
         self._result: Optional[ArrayLike] = None
 
-        # tkinter image refs to avoid GC
-        self._tk_base = None
-        self._tk_preview = None
+        # one PhotoImage per label, repainted in place (see display.py)
+        self._base_view: Optional[PhotoView] = None
+        self._preview_view: Optional[PhotoView] = None
 
-        # toplevel created on run()
+        # toplevel and busy-state widgets created on run()
         self.top: Optional[tk.Toplevel] = None
+        self._buttons: List[ttk.Button] = []
+        self._progressbar: Optional[ttk.Progressbar] = None
+        # per-filter timings shown while the popup is open (stats_panel)
+        self._stats: Optional[trace.StatsSink] = None
+        self._stats_tree: Optional[ttk.Treeview] = None
+
+        # live parameters: the chain step being tuned as (index, spec, name,
+        # full_func, preview_func, values), its widgets, last values per
+        # filter and the pending debounce timer
+        self._tuning: Optional[
+            Tuple[int, FilterSpec, str, FilterFunc, FilterFunc, Dict[str, Any]]
+        ] = None
+        self._param_frame: Optional[ttk.Frame] = None
+        self._param_widgets: List[Any] = []
+        self._param_controls: List[Tuple[Any, str]] = []
+        self._param_vars: List[tk.Variable] = []
+        self._last_values: Dict[str, Dict[str, Any]] = {}
+        self._debounce: Optional[str] = None
 
     # ---- internal UI helpers ----
     def _update_base_widget(self, label_widget: ttk.Label):
-        self._tk_base = _bgr_to_photoimage(self.base_display)
-        label_widget.configure(image=self._tk_base)
+        if self._base_view is None or self._base_view.label is not label_widget:
+            self._base_view = PhotoView(label_widget)
+        self._base_view.show(_ensure_bgr_uint8(self.base_display))
 
     def _update_preview_widget(self, label_widget: ttk.Label):
-        self._tk_preview = _bgr_to_photoimage(self.preview_display)
-        label_widget.configure(image=self._tk_preview)
+        if self._preview_view is None or self._preview_view.label is not label_widget:
+            self._preview_view = PhotoView(label_widget)
+        self._preview_view.show(_ensure_bgr_uint8(self.preview_display))
+
+    def _set_busy(self, busy: bool):
+        """Lock the controls (except Cancel) and show progress during Apply."""
+        self._busy = busy
+        for btn in self._buttons:
+            btn.state(["disabled"] if busy else ["!disabled"])
+        for widget, normal in self._param_controls:
+            widget.configure(state="disabled" if busy else normal)
+        if self._progressbar is not None:
+            if busy:
+                self._progressbar.configure(value=0)
+                self._progressbar.pack(fill="x", pady=(6, 0))
+            else:
+                self._progressbar.pack_forget()
+
+    def _update_progress(self):
+        done, total = self._progress
+        if self._progressbar is not None and total:
+            self._progressbar.configure(value=100.0 * done / total)
+
+    # ---- background work ----
+    def _supersede(self):
+        """Invalidate whatever is queued or running on the worker."""
+        self._generation += 1
+        if self._pending is not None:
+            self._pending.cancel()  # only succeeds if it has not started yet
+            self._pending = None
+
+    def _submit(self, fn, *args) -> Tuple[int, Future]:
+        """Run fn(generation, *args) on the worker, superseding older work."""
+        self._supersede()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="filter-session"
+            )
+        gen = self._generation
+        self._pending = self._executor.submit(fn, gen, *args)
+        return gen, self._pending
+
+    @property
+    def base_full(self) -> ArrayLike:
+        """The full-resolution input (decoded on first use with full_image)."""
+        with self._full_lock:
+            if self._base_full is None:
+                self._base_full = _ensure_bgr_uint8(self._full_image())
+            return self._base_full
+
+    def _level_scale(self, level: int) -> float:
+        """Pixel size of a pyramid level relative to the full-resolution image."""
+        return self._full_width / self._pyramid[level].shape[1]
+
+    def _run_steps(
+        self,
+        gen: int,
+        img: ArrayLike,
+        steps: Sequence[FilterFunc],
+        normalize_each: bool = False,
+        track: bool = False,
+        keys: Optional[Sequence[str]] = None,
+    ) -> ArrayLike:
+        """
+        Worker side: apply steps, bailing out early once superseded.
+        With keys, the image after steps[i] is cached under keys[i].
+        img None stands for a copy of base_full.
+        """
+        if img is None:
+            img = self.base_full.copy()
+        out = img
+        if track:
+            self._progress = (0, len(steps))
+        with trace.chain_span(steps, img) as chain:
+            for i, f in enumerate(steps):
+                if gen != self._generation:
+                    raise _Superseded()
+                out = trace.call(f, out, run=self._run_banded)
+                if normalize_each:
+                    out = _ensure_bgr_uint8(out)
+                if keys is not None:
+                    self._cache.put(keys[i], out)
+                if track:
+                    self._progress = (i + 1, len(steps))
+            return chain.done(_ensure_bgr_uint8(out))
+
+    def _run_banded(self, step: FilterFunc, img: ArrayLike) -> ArrayLike:
+        return run_step_banded(img, step, self.threads)
+
+    def _apply_full(
+        self,
+        gen: int,
+        start: Optional[ArrayLike],
+        plan: Sequence[FilterFunc],
+        chain: List[FilterFunc],
+    ) -> ArrayLike:
+        """Worker side of Apply: the result cache first, else run plan on start."""
+        cache = self._disk_cache
+        key = None
+        if cache is not None:
+            if self._base_digest is None:
+                self._base_digest = image_digest(self.base_full)
+            key = cache.key(self._base_digest, chain)
+            out = cache.get(key)
+            if out is not None:
+                return out
+        t0 = time.perf_counter()
+        out = self._run_steps(gen, start, plan, False, True)
+        if key is not None:
+            # encoding can take a while; don't hold up closing the popup
+            threading.Thread(
+                target=cache.put,
+                args=(key, out, time.perf_counter() - t0),
+                name="result-cache-put",
+                daemon=True,
+            ).start()
+        return out
+
+    def _watch(
+        self,
+        gen: int,
+        future: Future,
+        on_done: Callable[[ArrayLike], None],
+        on_error: Callable[[Exception], None],
+        on_tick: Optional[Callable[[], None]] = None,
+    ):
+        """Tk side: poll future via after() and deliver it unless superseded."""
+        if self._closed or self.top is None:
+            return
+        if not future.done():
+            if on_tick is not None:
+                on_tick()
+            self.top.after(
+                self.poll_ms, self._watch, gen, future, on_done, on_error, on_tick
+            )
+            return
+        self._refresh_stats()
+        if gen != self._generation or future.cancelled():
+            return
+        self._pending = None
+        try:
+            result = future.result()
+        except _Superseded:
+            return
+        except Exception as e:
+            on_error(e)
+            return
+        on_done(result)
 
+    # ---- event handlers ----
     def _on_filter_click(
         self,
         full_func: FilterFunc,
         preview_func: FilterFunc,
         name: str,
         preview_label: ttk.Label,
+        params_func: Optional[ParamsFunc] = None,
     ):
-        """Handle filter button click: update preview and store chain."""
-        try:
-            if self.cumulative:
-                new_preview = preview_func(self.preview_display.copy())
-                self.preview_display = _ensure_bgr_uint8(new_preview)
-                self._preview_chain.append(preview_func)
-                self._full_chain.append(full_func)
-            else:
-                new_preview = preview_func(self.base_display.copy())
-                self.preview_display = _ensure_bgr_uint8(new_preview)
-                self._preview_chain = [preview_func]
-                self._full_chain = [full_func]
+        """Handle filter button click: store chain and render preview in background."""
+        spec = spec_for(full_func) if self.live_params else None
+        live = spec is not None and any(p.ask for p in spec.params)
+        base_full, base_preview = full_func, preview_func
+        if live:
+            params = dict(self._last_values.get(spec.name) or self._live_defaults(spec))
+        elif params_func is not None:
+            params = params_func()
+            if params is None:
+                return
+        if live or params_func is not None:
+            full_func = Step(name, base_full, params)
+            preview_func = scale_step(Step(name, base_preview, params), self.preview_scale)
+        self._record()
+        if self.cumulative:
+            self._preview_chain.append(preview_func)
+            self._full_chain.append(full_func)
+        else:
+            self._preview_chain = [preview_func]
+            self._full_chain = [full_func]
+        if live:
+            index = len(self._full_chain) - 1
+            self._tuning = (index, spec, name, base_full, base_preview, params)
+            self._build_param_panel(preview_label)
+        else:
+            self._clear_param_panel()
+        self._render_preview(name, preview_label)
+
+    def _render_preview(self, name: str, preview_label: ttk.Label):
+        """Show the preview chain, computing only what the cache lacks."""
+        if self._busy:
+            return  # Apply owns the worker; a preview would supersede it
+        keys = chain_keys(self._preview_chain, "preview")
+        done, cached = self._cache.longest_prefix(keys)
+        start = self.base_preview if cached is None else cached
+        if done == len(self._preview_chain):
+            self._supersede()
+            self.preview_display = _fit_image_bgr(start, self.display_max_size)
             self._update_preview_widget(preview_label)
-        except Exception as e:
+            self._prerender()
+            return
+
+        gen, future = self._submit(
+            self._run_steps,
+            start.copy(),
+            self._preview_chain[done:],
+            True,
+            False,
+            keys[done + 1 :],
+        )
+
+        def on_done(img: ArrayLike):
+            self.preview_display = _fit_image_bgr(img, self.display_max_size)
+            self._update_preview_widget(preview_label)
+            self._prerender()
+
+        def on_error(e: Exception):
+            # drop the steps that never made it to the preview
+            del self._preview_chain[done:]
+            del self._full_chain[done:]
             warnings.warn(f"Preview filter '{name}' failed: {e}", RuntimeWarning)
             self._show_error(f"Preview of filter '{name}' failed:\n{e}")
 
+        self._watch(gen, future, on_done, on_error)
+
+    def _prerender(self):
+        """While idle, extend the cached full-resolution chain on the worker."""
+        if not self.prerender_full or not self._full_chain:
+            return
+        if self._base_full is None:
+            return  # not decoded yet: that waits for Apply
+        keys = chain_keys(self._full_chain, "full")
+        done, cached = self._cache.longest_prefix(keys)
+        if done == len(self._full_chain):
+            return
+        # fire-and-forget: the next click supersedes it, finished steps stay cached
+        self._submit(
+            self._run_steps,
+            None if cached is None else cached.copy(),
+            self._full_chain[done:],
+            False,
+            False,
+            keys[done + 1 :],
+        )
+
+    # ---- live parameters ----
+    @staticmethod
+    def _live_defaults(spec: FilterSpec) -> Dict[str, Any]:
+        return {p.name: p.default for p in spec.params if p.ask}
+
+    def _clear_param_panel(self):
+        self._tuning = None
+        self._cancel_debounce()
+        for widget in self._param_widgets:
+            widget.destroy()
+        self._param_widgets = []
+        self._param_controls = []
+        self._param_vars = []
+
+    def _cancel_debounce(self):
+        if self._debounce is not None and self.top is not None:
+            self.top.after_cancel(self._debounce)
+        self._debounce = None
+
+    def _build_param_panel(self, preview_label: ttk.Label):
+        """Controls for the step being tuned, replacing the previous ones."""
+        tuning = self._tuning
+        self._clear_param_panel()
+        self._tuning = tuning
+        if self._param_frame is None or tuning is None:
+            return
+        _, spec, name, _, _, values = tuning
+        title = ttk.Label(self._param_frame, text=name, font=("TkDefaultFont", 9, "bold"))
+        title.pack(anchor="w")
+        self._param_widgets.append(title)
+        for p in spec.params:
+            if p.ask:
+                widget, normal = self._param_control(p, values[p.name], preview_label)
+                self._param_widgets.append(widget)
+                self._param_controls.append((widget, normal))
+
+    def _param_control(self, p: Param, value, preview_label: ttk.Label):
+        frame = self._param_frame
+
+        def changed(*_args):
+            try:
+                raw = var.get()
+            except tk.TclError:  # half-typed value
+                return
+            self._on_param_change(p, raw, preview_label)
+
+        normal = "normal"
+        if p.kind == "bool":
+            var = tk.BooleanVar(frame, value=bool(value))
+            widget = ttk.Checkbutton(frame, text=p.prompt, variable=var, command=changed)
+        elif p.kind == "choice":
+            var = tk.StringVar(frame, value=str(value))
+            normal = "readonly"
+            widget = ttk.Combobox(frame, values=p.choices, textvariable=var, state=normal)
+            widget.bind("<<ComboboxSelected>>", changed)
+        else:
+            lo = p.minvalue if p.minvalue is not None else 0
+            hi = p.soft_max if p.soft_max is not None else max(1, 4 * (value or 1))
+            if p.kind == "int":
+                var = tk.IntVar(frame, value=value)
+                resolution = 1  # even kernel lengths round up to odd ones
+            else:
+                var = tk.DoubleVar(frame, value=value)
+                resolution = (hi - lo) / 200.0
+            widget = tk.Scale(
+                frame,
+                label=p.prompt,
+                from_=lo,
+                to=hi,
+                resolution=resolution,
+                orient="horizontal",
+                variable=var,
+                command=changed,
+                length=self.button_width * 8,
+            )
+        widget.pack(fill="x", pady=2)
+        self._param_vars.append(var)
+        return widget, normal
+
+    def _on_param_change(self, p: Param, raw, preview_label: ttk.Label):
+        """A control moved: swap in the re-bound step and render coarse now, fine later."""
+        if self._busy or self._tuning is None:
+            return
+        index, spec, name, base_full, base_preview, values = self._tuning
+        try:
+            value = p.convert(str(raw))
+        except ValueError:
+            return
+        if values.get(p.name) == value:
+            return
+        values = dict(values, **{p.name: value})
+        self._tuning = (index, spec, name, base_full, base_preview, values)
+        self._last_values[spec.name] = values
+        self._full_chain[index] = Step(name, base_full, values)
+        self._preview_chain[index] = scale_step(
+            Step(name, base_preview, values), self.preview_scale
+        )
+        self._render_coarse(preview_label)
+        self._cancel_debounce()
+        if self.top is not None:
+            self._debounce = self.top.after(self.debounce_ms, self._settle, name, preview_label)
+
+    def _settle(self, name: str, preview_label: ttk.Label):
+        """Input paused: refine the preview at display resolution."""
+        self._debounce = None
+        if self._busy:
+            return
+        self._render_preview(name, preview_label)
+
+    def _render_coarse(self, preview_label: ttk.Label):
+        """Quick render of the chain on the coarse level, upscaled for display."""
+        if self._busy or self.coarse_level == self.preview_level:
+            return
+        factor = self.coarse_scale / self.preview_scale
+        chain = [scale_step(s, factor) for s in self._preview_chain]
+        keys = chain_keys(chain, "coarse")
+        done, cached = self._cache.longest_prefix(keys)
+        start = self._pyramid[self.coarse_level] if cached is None else cached
+        h, w = self.base_display.shape[:2]
+
+        def on_done(img: ArrayLike):
+            self.preview_display = cv2.resize(img, (w, h), interpolation=cv2.INTER_LINEAR)
+            self._update_preview_widget(preview_label)
+
+        if done == len(chain):
+            self._supersede()
+            on_done(start)
+            return
+        gen, future = self._submit(
+            self._run_steps, start.copy(), chain[done:], True, False, keys[done + 1 :]
+        )
+        # errors surface from the display-resolution render that follows
+        self._watch(gen, future, on_done, lambda e: None)
+
+    # ---- history ----
+    def _snapshot(self) -> Tuple[List[FilterFunc], List[FilterFunc]]:
+        return list(self._full_chain), list(self._preview_chain)
+
+    def _record(self):
+        """Remember the current chains before a change; a change clears Redo."""
+        self._undo.append(self._snapshot())
+        self._redo.clear()
+
+    def _on_undo(self, preview_label: ttk.Label):
+        if self._busy or not self._undo:
+            return
+        self._redo.append(self._snapshot())
+        self._full_chain, self._preview_chain = self._undo.pop()
+        self._clear_param_panel()
+        self._render_preview("Undo", preview_label)
+
+    def _on_redo(self, preview_label: ttk.Label):
+        if self._busy or not self._redo:
+            return
+        self._undo.append(self._snapshot())
+        self._full_chain, self._preview_chain = self._redo.pop()
+        self._clear_param_panel()
+        self._render_preview("Redo", preview_label)
+
     def _on_reset(self, preview_label: ttk.Label):
+        if self._full_chain or self._preview_chain:
+            self._record()
         self._full_chain = []
         self._preview_chain = []
-        self.preview_display = self.base_display.copy()
-        self._update_preview_widget(preview_label)
+        self._clear_param_panel()
+        self._render_preview("Reset", preview_label)
 
     def _on_apply(self):
-        out = self.base_full.copy()
-        try:
-            for f in self._full_chain:
-                out = f(out)
-            out = _ensure_bgr_uint8(out)
-        except Exception as e:
+        # a refinement still pending from a slider drag would supersede Apply
+        self._cancel_debounce()
+        # start from the longest full-resolution prefix already computed, and
+        # run consecutive linear filters of the rest as one fused convolution
+        keys = chain_keys(self._full_chain, "full")
+        done, cached = self._cache.longest_prefix(keys)
+        plan = plan_chain(self._full_chain[done:])
+        gen, future = self._submit(
+            self._apply_full,
+            None if cached is None else cached.copy(),
+            plan,
+            list(self._full_chain),
+        )
+        self._set_busy(True)
+
+        def on_done(out: ArrayLike):
+            self._result = out
+            self._close()
+
+        def on_error(e: Exception):
+            self._set_busy(False)
             warnings.warn(f"Full apply failed: {e}", RuntimeWarning)
             self._show_error(f"Applying filters to full image failed:\n{e}")
-            return
-        self._result = out
-        if self.top:
-            self.top.destroy()
+
+        self._watch(gen, future, on_done, on_error, on_tick=self._update_progress)
 
     def _on_cancel(self):
         self._result = None
+        self._close()
+
+    def _close(self):
+        if self._closed:
+            return
+        self._supersede()
+        self._cancel_debounce()
+        self._closed = True
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._stats is not None:
+            trace.remove_sink(self._stats)
         if self.top:
             self.top.destroy()
 
+    # ---- stats panel ----
+    def _build_stats_panel(self, parent):
+        self._stats = trace.StatsSink()
+        trace.add_sink(self._stats)
+        ttk.Label(parent, text="Time per filter", font=("TkDefaultFont", 9, "bold")).pack(
+            anchor="w", pady=(8, 0)
+        )
+        tree = ttk.Treeview(parent, columns=("calls", "mean", "total"), height=8)
+        tree.heading("#0", text="Filter")
+        tree.heading("calls", text="Calls")
+        tree.heading("mean", text="Mean ms")
+        tree.heading("total", text="Total ms")
+        tree.column("#0", width=150)
+        for col in ("calls", "mean", "total"):
+            tree.column(col, width=60, anchor="e")
+        tree.pack(fill="x")
+        self._stats_tree = tree
+
+    def _refresh_stats(self):
+        tree = self._stats_tree
+        if tree is None or self._stats is None:
+            return
+        tree.delete(*tree.get_children())
+        for kind, name, s in self._stats.rows():
+            label = f"[{name}]" if kind == "chain" else name
+            if s["errors"]:
+                label += f" ({s['errors']} failed)"
+            mean = s["wall_s"] / s["calls"] * 1e3
+            total = s["wall_s"] * 1e3
+            tree.insert("", "end", text=label, values=(s["calls"], f"{mean:.1f}", f"{total:.0f}"))
+
     def _show_error(self, message: str):
         err = tk.Toplevel(self.top or self.parent)
         err.title("Error")
@@ -256,30 +896,60 @@ class FilterSession:
         ttk.Label(left, text="Filters", font=("TkDefaultFont", 10, "bold")).pack(
             pady=(0, 6)
         )
-        for name, full_f, preview_f in self._filters:
+        self._buttons = []
+        for name, full_f, preview_f, params_f in self._filters:
             btn = ttk.Button(
                 left,
                 text=name,
                 width=self.button_width,
-                command=lambda ff=full_f, pf=preview_f, nm=name: self._on_filter_click(
-                    ff, pf, nm, preview_label
+                command=lambda ff=full_f, pf=preview_f, nm=name, pr=params_f: self._on_filter_click(
+                    ff, pf, nm, preview_label, pr
                 ),
             )
             btn.pack(pady=2)
+            self._buttons.append(btn)
 
         ttk.Separator(left, orient="horizontal").pack(fill="x", pady=6)
-        ttk.Button(
+        reset_btn = ttk.Button(
             left,
             text="Reset",
             width=self.button_width,
             command=lambda: self._on_reset(preview_label),
-        ).pack(pady=3)
-        ttk.Button(
+        )
+        reset_btn.pack(pady=3)
+        undo_btn = ttk.Button(
+            left,
+            text="Undo",
+            width=self.button_width,
+            command=lambda: self._on_undo(preview_label),
+        )
+        undo_btn.pack(pady=3)
+        redo_btn = ttk.Button(
+            left,
+            text="Redo",
+            width=self.button_width,
+            command=lambda: self._on_redo(preview_label),
+        )
+        redo_btn.pack(pady=3)
+        apply_btn = ttk.Button(
             left, text="Apply", width=self.button_width, command=self._on_apply
-        ).pack(pady=3)
+        )
+        apply_btn.pack(pady=3)
         ttk.Button(
             left, text="Cancel", width=self.button_width, command=self._on_cancel
         ).pack(pady=3)
+        self._buttons += [reset_btn, undo_btn, redo_btn, apply_btn]
+
+        # controls of the filter being tuned (live_params)
+        self._param_frame = ttk.Frame(left)
+        self._param_frame.pack(fill="x", pady=(8, 0))
+        if self.stats_panel:
+            self._build_stats_panel(left)
+        self.top.bind("<Control-z>", lambda e: self._on_undo(preview_label))
+        self.top.bind("<Control-y>", lambda e: self._on_redo(preview_label))
+
+        # shown only while Apply runs
+        self._progressbar = ttk.Progressbar(left, mode="determinate", maximum=100)
 
         # Middle: base and preview
         mid = ttk.Frame(self.top)
@@ -304,24 +974,49 @@ class FilterSession:
         self._update_preview_widget(preview_label)
 
         # modal behavior
+        self.top.protocol("WM_DELETE_WINDOW", self._on_cancel)
         self.top.transient(self.parent)
         self.top.grab_set()
         self.parent.wait_window(self.top)
+        self._close()
 
         return self._result
 
 
 # -------------------- Convenience one-liner --------------------
 def show_filter_session(
-    parent, image_bgr: ArrayLike, filters: Sequence[FilterDescriptor], **kwargs
-) -> Optional[ArrayLike]:
+    parent,
+    image_bgr: Union[ArrayLike, Document],
+    filters: Sequence[FilterDescriptor],
+    **kwargs,
+) -> Union[ArrayLike, Document, None]:
     """
     Quick helper: show popup with given filters and image and return processed image.
+    Given a Document, the session edits its current image and the result is
+    pushed onto the document's history; the document itself is returned.
     kwargs forwarded to FilterSession constructor (display_max_size, cumulative, title, ...).
     """
-    sess = FilterSession(parent, filters, image_bgr, **kwargs)
-    return sess.run()
+    doc = image_bgr if isinstance(image_bgr, Document) else None
+    if doc is not None and not doc.loaded:
+        # preview from a reduced decode; the full image is decoded on Apply
+        max_size = kwargs.get("display_max_size", (640, 480))
+        kwargs.setdefault("full_image", lambda: doc.image)
+        kwargs.setdefault("full_size", doc.size)
+        sess = FilterSession(parent, filters, doc.preview(max_size), **kwargs)
+    else:
+        sess = FilterSession(parent, filters, doc.image if doc else image_bgr, **kwargs)
+    result = sess.run()
+    if doc is None or result is None:
+        return result
+    doc.push(result, kwargs.get("title", "Filters"))
+    return doc
 
 
 # Exports
-__all__ = ["FilterSession", "show_filter_session"]
+__all__ = [
+    "FilterSession",
+    "show_filter_session",
+    "ask_ksize",
+    "ask_params",
+    "registry_filters",
+]
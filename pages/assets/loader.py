@@ -0,0 +1,103 @@
+"""
+loader.py
+
+Reduced-resolution decoding for thumbnails and previews, so opening a large
+photo does not decode pixels that are immediately thrown away.
+
+JPEGs are decoded with OpenCV's IMREAD_REDUCED_* modes, which scale by 1/2,
+1/4 or 1/8 inside the DCT (libjpeg), picking the largest factor that still
+covers the requested size; other formats are decoded whole and shrunk.
+The image size comes from the file header (PIL reads only the header; EXIF
+rotation is taken into account, as OpenCV applies it while decoding).
+
+Thumbnails are kept in memory keyed by path, modification time and file
+size, so reopening an unchanged file does not decode it again.
+
+Exports:
+    - image_size(path) -> (w, h)
+    - reduced_factor(size, max_size) -> 1, 2, 4 or 8
+    - load_reduced(path, max_size) -> BGR array covering max_size
+    - load_thumbnail(path, max_size=(400, 300)) -> BGR array fitted inside max_size
+"""
+
+from __future__ import annotations
+import os
+from typing import Tuple
+import numpy as np
+import cv2
+from PIL import Image
+
+from pages.assets.prefix_cache import PrefixCache
+
+ArrayLike = np.ndarray
+
+_REDUCED = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+# EXIF orientations that swap width and height (OpenCV applies them on decode)
+_TRANSPOSED = {5, 6, 7, 8}
+# decoded thumbnails, least recently used dropped first
+_thumbs = PrefixCache(64 * 2**20)
+
+
+def image_size(path: str) -> Tuple[int, int]:
+    """(width, height) as decoded, read from the file header only."""
+    try:
+        with Image.open(path) as im:
+            w, h = im.size
+            if im.getexif().get(0x0112) in _TRANSPOSED:
+                w, h = h, w
+            return w, h
+    except OSError as e:
+        raise ValueError(f"could not read image header of {path!r}: {e}") from None
+
+
+def _fitted(size: Tuple[int, int], max_size: Tuple[int, int]) -> Tuple[int, int]:
+    w, h = size
+    max_w, max_h = max_size
+    scale = min(max_w / w, max_h / h, 1.0)
+    return max(1, int(w * scale)), max(1, int(h * scale))
+
+
+def reduced_factor(size: Tuple[int, int], max_size: Tuple[int, int]) -> int:
+    """Largest decode reduction whose result still covers size fitted in max_size."""
+    need_w, need_h = _fitted(size, max_size)
+    w, h = size
+    for factor in (8, 4, 2):
+        if -(-w // factor) >= need_w and -(-h // factor) >= need_h:
+            return factor
+    return 1
+
+
+def load_reduced(path: str, max_size: Tuple[int, int]) -> ArrayLike:
+    """
+    Decode path at the smallest DCT-reduced size that still covers the image
+    fitted inside max_size (full size for non-JPEG formats).
+    """
+    factor = reduced_factor(image_size(path), max_size)
+    data = np.fromfile(path, dtype=np.uint8)
+    img = cv2.imdecode(data, _REDUCED[factor])
+    if img is None:
+        raise ValueError(f"could not decode image {path!r}")
+    return img
+
+
+def load_thumbnail(path: str, max_size: Tuple[int, int] = (400, 300)) -> ArrayLike:
+    """Image fitted inside max_size, cached until the file changes. Treat as read-only."""
+    st = os.stat(path)
+    key = f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}|{max_size}"
+    thumb = _thumbs.get(key)
+    if thumb is None:
+        img = load_reduced(path, max_size)
+        size = _fitted((img.shape[1], img.shape[0]), max_size)
+        if size != (img.shape[1], img.shape[0]):
+            img = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+        thumb = img
+        _thumbs.put(key, thumb)
+    return thumb
+
+
+__all__ = ["image_size", "reduced_factor", "load_reduced", "load_thumbnail"]
@@ -0,0 +1,107 @@
+"""
+prefix_cache.py
+
+Memo of intermediate images keyed by the filter-chain prefix that produced
+them, bounded by a byte budget with least-recently-used eviction.
+
+A chain [f1, f2, f3] has prefix keys k0 (nothing applied), k1, k2, k3, where
+each key is a digest of the previous key plus the next step's identity
+(filter + params), so appending, undoing or re-adding the last step finds
+every earlier intermediate already computed.
+
+Exports:
+    - step_key(step) -> str
+    - chain_keys(steps, seed="") -> List[str]   # len(steps) + 1 keys
+    - PrefixCache(max_bytes)
+"""
+
+from __future__ import annotations
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional, Sequence, Tuple
+import numpy as np
+
+from filters.chain import Step
+
+ArrayLike = np.ndarray
+
+
+def step_key(step: Callable) -> str:
+    """Stable identity of a step: filter + params for Steps, object id otherwise."""
+    if isinstance(step, Step):
+        func = step.func
+        params = tuple(sorted(step.params.items()))
+        return f"{func.__module__}.{func.__qualname__}{params!r}"
+    # plain callables (lambdas from the pages) live as long as the session
+    return f"callable@{id(step):x}"
+
+
+def chain_keys(steps: Sequence[Callable], seed: str = "") -> List[str]:
+    """Keys for every prefix of steps; keys[i] identifies steps[:i]."""
+    h = hashlib.blake2b(seed.encode(), digest_size=16)
+    keys = [h.hexdigest()]
+    for step in steps:
+        h = h.copy()
+        h.update(b"\0" + step_key(step).encode())
+        keys.append(h.hexdigest())
+    return keys
+
+
+class PrefixCache:
+    """
+    Thread-safe LRU of prefix key -> image, holding at most max_bytes of
+    pixel data. Images are shared, not copied: treat them as read-only.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 2**20):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[str, ArrayLike]" = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: str) -> Optional[ArrayLike]:
+        with self._lock:
+            img = self._items.get(key)
+            if img is not None:
+                self._items.move_to_end(key)
+            return img
+
+    def put(self, key: str, img: ArrayLike):
+        if img.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._nbytes -= old.nbytes
+            self._items[key] = img
+            self._nbytes += img.nbytes
+            while self._nbytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._nbytes -= evicted.nbytes
+
+    def longest_prefix(self, keys: Sequence[str]) -> Tuple[int, Optional[ArrayLike]]:
+        """
+        Find the longest cached prefix among chain_keys() output.
+        Returns (number of steps already applied, image) or (0, None).
+        """
+        for n in range(len(keys) - 1, 0, -1):
+            img = self.get(keys[n])
+            if img is not None:
+                return n, img
+        return 0, None
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._nbytes = 0
+
+
+__all__ = ["step_key", "chain_keys", "PrefixCache"]
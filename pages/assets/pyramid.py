@@ -0,0 +1,94 @@
+"""
+pyramid.py
+
+Cached image pyramid for previews, so the popup can filter an image about
+the size of its widget while the original stays at full resolution.
+
+Level 0 is the original; level n is level n-1 halved with cv2.pyrDown
+(Gaussian-filtered, so no aliasing). Levels are built on first use and kept.
+
+A preview step running on level n sees every pixel distance shrunk by
+scale = 2**n, so spatial parameters are shrunk by the same factor
+(scale_step) to make the preview look like the full-resolution result
+scaled down. Which parameters are lengths comes from the filter registry
+(Param.spatial).
+
+Exports:
+    - ImagePyramid(base)
+    - scale_step(step, scale) -> step
+"""
+
+from __future__ import annotations
+import threading
+from typing import Callable, List, Tuple
+import numpy as np
+import cv2
+
+from filters.chain import Step
+from filters.params import check_ksize
+from filters.registry import spec_for
+
+ArrayLike = np.ndarray
+
+
+class ImagePyramid:
+    """Lazily built pyrDown levels of base; treat levels as read-only."""
+
+    def __init__(self, base: ArrayLike):
+        self._levels: List[ArrayLike] = [base]
+        self._lock = threading.Lock()
+
+    @property
+    def base(self) -> ArrayLike:
+        return self._levels[0]
+
+    def __getitem__(self, level: int) -> ArrayLike:
+        if level < 0:
+            raise ValueError(f"level must be >= 0, got {level}")
+        with self._lock:
+            while len(self._levels) <= level:
+                self._levels.append(cv2.pyrDown(self._levels[-1]))
+            return self._levels[level]
+
+    def scale(self, level: int) -> float:
+        """Pixel size of level relative to the base (2**level, measured)."""
+        return self.base.shape[1] / self[level].shape[1]
+
+    def level_for(self, max_size: Tuple[int, int]) -> int:
+        """
+        Coarsest level that still covers a max_size=(w, h) box at the
+        image's fitted size, i.e. the smallest level that needs no upscaling.
+        """
+        max_w, max_h = max_size
+        h, w = self.base.shape[:2]
+        fit = min(max_w / w, max_h / h, 1.0)
+        need_w, need_h = w * fit, h * fit
+        level = 0
+        while min(self[level].shape[:2]) > 1:
+            nh, nw = self[level + 1].shape[:2]
+            if nw < need_w or nh < need_h:
+                break
+            level += 1
+        return level
+
+
+def scale_step(step: Callable, scale: float) -> Callable:
+    """
+    Step with its spatial parameters divided by scale (kernel sizes stay odd
+    and >= 1). Bare callables carry no parameters and are returned unchanged.
+    """
+    if scale == 1.0 or not isinstance(step, Step):
+        return step
+    spec = spec_for(step.func)
+    if spec is None:
+        return step
+    params = dict(step.params)
+    for p in spec.params:
+        if p.spatial and params.get(p.name) is not None:
+            params[p.name] = check_ksize(max(1, int(round(params[p.name] / scale))))
+    if params == step.params:
+        return step
+    return Step(step.name, step.func, params)
+
+
+__all__ = ["ImagePyramid", "scale_step"]
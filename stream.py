@@ -0,0 +1,398 @@
+"""
+stream.py
+
+Streaming runner: applies a filter chain to every frame of a video file, a
+camera or a numbered image sequence, writing a video (or image sequence).
+
+Frames go through a three-stage pipeline so decoding, filtering and encoding
+overlap instead of taking turns:
+
+    reader thread  --cv2.VideoCapture-->  filter pool (frames in flight)
+                   -->  writer thread  --cv2.VideoWriter / cv2.imwrite-->
+
+At most `queue` frames are decoded but not yet written. When that budget is
+used up the backpressure policy decides what happens to the next frame:
+
+    block   the reader waits (lossless; the right choice for files)
+    drop    the new frame is dropped (keeps pace with a live camera)
+
+Frames are written in order whatever order the filter workers finish in.
+Seeded noise steps get a per-frame seed (filters.chain.reseed), so noise
+changes from frame to frame but a run is reproducible.
+
+Usage:
+    python stream.py clip.mp4 out.mp4 --chain gauss:5,sobel:3
+    python stream.py "frames/img_%04d.png" out.avi --chain median:5 --fourcc MJPG
+    python stream.py 0 out.mp4 --chain gauss:5 --policy drop --max-frames 300
+    python stream.py clip.mp4 "out/frame_%05d.png" --chain laplace --workers 4
+
+--precision float32 filters each frame in float32 and rounds once, instead
+of after every step (filters/precision.py).
+
+Chain syntax is described in filters/chain.py. --trace run.jsonl (or
+run.json for a Chrome trace) records every filter call; see filters/trace.py.
+
+Exports:
+    - StreamStats
+    - open_source(source) -> cv2.VideoCapture
+    - run_stream(source, output, steps, *, workers, threads, queue, policy, ...)
+"""
+
+from __future__ import annotations
+import argparse
+import os
+import queue as queue_mod
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, Union
+
+import numpy as np
+import cv2
+
+from filters import trace
+from filters.chain import parse_chain, reseed
+from filters.fuse import plan_chain
+from filters.parallel import run_chain_parallel
+from filters.precision import PRECISIONS, check_precision, run_chain_float
+
+ArrayLike = np.ndarray
+FilterFunc = Callable[[ArrayLike], ArrayLike]
+
+POLICIES = ("block", "drop")
+DEFAULT_FPS = 25.0
+# how often a blocked stage wakes up to check for a stop request
+_POLL_S = 0.1
+
+
+class StreamStats:
+    """Counters of one run; *_s fields are seconds spent in each stage."""
+
+    __slots__ = ("read", "written", "dropped", "decode_s", "filter_s", "encode_s", "_t0", "_t1")
+
+    def __init__(self):
+        self.read = 0
+        self.written = 0
+        self.dropped = 0
+        self.decode_s = 0.0
+        self.filter_s = 0.0  # summed over workers
+        self.encode_s = 0.0
+        self._t0 = time.perf_counter()
+        self._t1: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        return (self._t1 or time.perf_counter()) - self._t0
+
+    @property
+    def fps(self) -> float:
+        """Frames written per second of wall time."""
+        elapsed = self.elapsed
+        return self.written / elapsed if elapsed > 0 else 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"StreamStats(read={self.read}, written={self.written}, "
+            f"dropped={self.dropped}, fps={self.fps:.1f})"
+        )
+
+
+# -------------------- Input / output --------------------
+def open_source(source: str) -> cv2.VideoCapture:
+    """
+    Open a video file, a camera index ("0") or a printf-style image sequence
+    ("img_%04d.png"); cv2.VideoCapture handles all three.
+    """
+    cap = cv2.VideoCapture(int(source) if source.isdigit() else source)
+    if not cap.isOpened():
+        raise ValueError(f"could not open video source {source!r}")
+    return cap
+
+
+class _Sink:
+    """VideoWriter opened on the first frame, or numbered images for '%' paths."""
+
+    def __init__(self, output: str, fourcc: str, fps: float):
+        if len(fourcc) != 4:
+            raise ValueError(f"fourcc must be 4 characters, got {fourcc!r}")
+        self.output = output
+        self.fourcc = fourcc
+        self.fps = fps
+        self.sequence = "%" in output
+        self._writer: Optional[cv2.VideoWriter] = None
+        self._index = 0
+
+    def write(self, frame: ArrayLike):
+        if self.sequence:
+            path = self.output % self._index
+            if not cv2.imwrite(path, frame):
+                raise ValueError(f"could not write {path}")
+        else:
+            if self._writer is None:
+                h, w = frame.shape[:2]
+                self._writer = cv2.VideoWriter(
+                    self.output,
+                    cv2.VideoWriter_fourcc(*self.fourcc),
+                    self.fps,
+                    (w, h),
+                    frame.ndim == 3,
+                )
+                if not self._writer.isOpened():
+                    raise ValueError(
+                        f"could not open {self.output!r} for writing with fourcc {self.fourcc!r}"
+                    )
+            self._writer.write(frame)
+        self._index += 1
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.release()
+
+
+# -------------------- Pipeline --------------------
+def run_stream(
+    source: str,
+    output: str,
+    steps: Sequence[FilterFunc],
+    *,
+    workers: int = 2,
+    threads: Union[int, str] = 1,
+    queue: int = 8,
+    policy: str = "block",
+    fourcc: str = "mp4v",
+    fps: Optional[float] = None,
+    max_frames: Optional[int] = None,
+    progress: Optional[Callable[[StreamStats], None]] = None,
+    report_every: float = 1.0,
+    precision: str = "native",
+) -> StreamStats:
+    """
+    Filter every frame of source into output (see the module docstring).
+
+    workers frames are filtered at once; threads additionally splits each
+    frame into bands (filters/parallel.py). queue bounds the frames between
+    decode and encode, and policy ("block" or "drop") says what to do with a
+    new frame when they are all in use. fps defaults to the source's rate.
+    progress(stats) is called about every report_every seconds.
+    precision "float32" runs the chain in float32 (filters/precision.py).
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"policy must be one of {POLICIES}, got {policy!r}")
+    if workers < 1:
+        raise ValueError(f"workers must be >= 1, got {workers}")
+    if queue < workers:
+        raise ValueError(f"queue ({queue}) must be at least workers ({workers})")
+    check_precision(precision)
+    steps = list(steps)
+
+    cap = open_source(source)
+    if fps is None:
+        fps = cap.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+    sink = _Sink(output, fourcc, fps)
+    stats = StreamStats()
+    stop = threading.Event()
+    errors: List[BaseException] = []
+    slots = threading.Semaphore(queue)  # frames decoded but not yet written
+    pending: "queue_mod.Queue[Optional[Future]]" = queue_mod.Queue()
+    lock = threading.Lock()
+
+    def fail(exc: BaseException):
+        errors.append(exc)
+        stop.set()
+
+    def process(frame: ArrayLike, index: int) -> ArrayLike:
+        t0 = time.perf_counter()
+        frame_steps = [reseed(s, index) for s in steps]
+        if precision == "native":
+            out = run_chain_parallel(frame, frame_steps, threads)
+        else:
+            out = run_chain_float(
+                frame, frame_steps, run=lambda im, st: run_chain_parallel(im, st, threads)
+            )
+        with lock:
+            stats.filter_s += time.perf_counter() - t0
+        return out
+
+    def read_loop():
+        try:
+            index = 0
+            while not stop.is_set() and (max_frames is None or index < max_frames):
+                t0 = time.perf_counter()
+                ok, frame = cap.read()
+                stats.decode_s += time.perf_counter() - t0
+                if not ok:
+                    break
+                stats.read += 1
+                index += 1
+                if policy == "drop":
+                    if not slots.acquire(blocking=False):
+                        stats.dropped += 1
+                        continue
+                else:
+                    while not slots.acquire(timeout=_POLL_S):
+                        if stop.is_set():
+                            return
+                pending.put(pool.submit(process, frame, index - 1))
+        except BaseException as e:
+            fail(e)
+        finally:
+            pending.put(None)
+
+    def write_loop():
+        try:
+            while True:
+                fut = pending.get()
+                if fut is None:
+                    return
+                frame = fut.result()
+                t0 = time.perf_counter()
+                sink.write(frame)
+                stats.encode_s += time.perf_counter() - t0
+                stats.written += 1
+                slots.release()
+        except BaseException as e:
+            fail(e)
+            # free the reader if it is waiting for a slot
+            while True:
+                slots.release()
+                if pending.get() is None:
+                    return
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stream-filter")
+    reader = threading.Thread(target=read_loop, name="stream-read", daemon=True)
+    writer = threading.Thread(target=write_loop, name="stream-write", daemon=True)
+    try:
+        reader.start()
+        writer.start()
+        while writer.is_alive():
+            writer.join(report_every)
+            if progress is not None and writer.is_alive():
+                progress(stats)
+        reader.join()
+    except KeyboardInterrupt:
+        stop.set()
+        reader.join()
+        writer.join()
+    finally:
+        pool.shutdown(wait=True)
+        cap.release()
+        sink.close()
+        stats._t1 = time.perf_counter()
+    if errors:
+        raise errors[0]
+    return stats
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Apply a filter chain to every frame of a video or image sequence."
+    )
+    parser.add_argument("source", help="video file, camera index, or sequence like img_%%04d.png")
+    parser.add_argument("output", help="output video, or sequence like out_%%05d.png")
+    parser.add_argument(
+        "--chain", required=True, help="filter chain, e.g. gauss:5,median:3,sobel:3"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=2, help="frames filtered at once (default: 2)"
+    )
+    parser.add_argument(
+        "--threads",
+        default="1",
+        help="band-parallel threads per frame, or 'auto' (default: 1)",
+    )
+    parser.add_argument(
+        "--queue", type=int, default=8, help="max frames between decode and encode (default: 8)"
+    )
+    parser.add_argument(
+        "--policy",
+        choices=POLICIES,
+        default="block",
+        help="when the queue is full: block the reader or drop the frame (default: block)",
+    )
+    parser.add_argument("--fourcc", default="mp4v", help="output codec (default: mp4v)")
+    parser.add_argument(
+        "--fps", type=float, default=None, help="output frame rate (default: the source's)"
+    )
+    parser.add_argument("--max-frames", type=int, default=None, help="stop after this many frames")
+    parser.add_argument("--quiet", action="store_true", help="no progress line")
+    parser.add_argument(
+        "--precision",
+        choices=PRECISIONS,
+        default="native",
+        help="float32: filter in float32 and round once per frame (default: native)",
+    )
+    parser.add_argument(
+        "--trace", default=None, help="record filter calls (.json: Chrome trace, else JSON lines)"
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        steps = plan_chain(parse_chain(args.chain))
+    except ValueError as e:
+        parser.error(str(e))
+    if args.workers < 1:
+        parser.error("--workers must be >= 1")
+    if args.queue < args.workers:
+        parser.error("--queue must be at least --workers")
+    threads: Union[int, str] = args.threads
+    if threads != "auto":
+        try:
+            threads = int(threads)
+        except ValueError:
+            parser.error(f"bad --threads {args.threads!r}")
+        if threads < 1:
+            parser.error("--threads must be >= 1 or 'auto'")
+    out_dir = os.path.dirname(args.output)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+
+    def report(stats: StreamStats):
+        print(
+            f"\r{stats.written} frame(s), {stats.fps:.1f} fps, {stats.dropped} dropped",
+            end="",
+            file=sys.stderr,
+            flush=True,
+        )
+
+    sink = None
+    if args.trace:
+        if args.trace.endswith(".json"):
+            sink = trace.ChromeTraceSink(args.trace)
+        else:
+            sink = trace.JsonlSink(args.trace)
+        trace.add_sink(sink)
+    try:
+        stats = run_stream(
+            args.source,
+            args.output,
+            steps,
+            workers=args.workers,
+            threads=threads,
+            queue=args.queue,
+            policy=args.policy,
+            fourcc=args.fourcc,
+            fps=args.fps,
+            max_frames=args.max_frames,
+            progress=None if args.quiet else report,
+            precision=args.precision,
+        )
+    except ValueError as e:
+        print(f"\nFAILED: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if sink is not None:
+            trace.remove_sink(sink)
+            sink.close()
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(
+        f"Wrote {stats.written} frame(s) of {stats.read} read, {stats.dropped} dropped, "
+        f"in {stats.elapsed:.2f}s ({stats.fps:.1f} fps; decode {stats.decode_s:.2f}s, "
+        f"filter {stats.filter_s:.2f}s, encode {stats.encode_s:.2f}s)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+sweep.py
+
+Finds which smoothing filter and kernel size best removes a given kind and
+level of noise: crosses noise configurations with smoother configurations
+over a set of clean images on a process pool, scores each result with PSNR
+and SSIM, and prints a ranked table per noise configuration
+(filters/sweep.py).
+
+Usage:
+    python sweep.py clean/ --noise "salt_and_pepper:0.01|0.05|0.1:0.01|0.05|0.1"
+    python sweep.py "clean/*.png" --noise "gaussian_noise:5|15|30" --smooth gauss,mean,median --ksizes 3,5,7,9,11
+    python sweep.py clean.npy --noise "salt:0.05,pepper:0.05" --workers 8 --out sweep.csv --rank ssim
+
+Grid syntax: the chain syntax with '|' between the values to try. Smoothers
+without a kernel size use --ksizes; by default every registered smoothing
+filter is swept. A config whose mean PSNR trails the best one by more than
+--prune-db (and whose SSIM is lower too) is dropped early; --no-prune
+scores every config on every image.
+"""
+
+from __future__ import annotations
+import argparse
+import sys
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from batch import IMAGE_EXTS, collect_inputs
+from filters.registry import by_category
+from filters.sweep import METRICS, format_table, parse_grid, run_sweep, write_results
+
+DEFAULT_KSIZES = (3, 5, 7, 9)
+
+
+def _int_list(text: str) -> List[int]:
+    return [int(v) for v in text.split(",") if v.strip()]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Rank smoothing filters by how well they remove each noise configuration."
+    )
+    parser.add_argument("source", help="clean images: directory, glob pattern or stacked .npy")
+    parser.add_argument(
+        "--noise", required=True, help='noise grid, e.g. "salt_and_pepper:0.01|0.05:0.01|0.05"'
+    )
+    parser.add_argument(
+        "--smooth",
+        default=",".join(s.name for s in by_category("smooth")),
+        help="smoother grid, e.g. \"median:3|5,gauss\" (default: all smoothing filters)",
+    )
+    parser.add_argument(
+        "--ksizes",
+        type=_int_list,
+        default=list(DEFAULT_KSIZES),
+        help="kernel sizes for smoothers given without one (default: 3,5,7,9)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="worker processes (default: CPU count)"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="noise seed (default: 0)")
+    parser.add_argument("--rank", choices=METRICS, default="psnr", help="ranking metric")
+    parser.add_argument("--top", type=int, default=None, help="rows printed per noise config")
+    parser.add_argument("--out", default=None, help="write the ranked table (.csv or .json)")
+    parser.add_argument(
+        "--prune-db",
+        type=float,
+        default=2.0,
+        help="drop configs this many dB of mean PSNR behind the best (default: 2)",
+    )
+    parser.add_argument(
+        "--min-images", type=int, default=2, help="images scored before pruning (default: 2)"
+    )
+    parser.add_argument("--no-prune", action="store_true", help="score every config on every image")
+    parser.add_argument("--quiet", action="store_true", help="no progress line")
+    args = parser.parse_args(argv)
+
+    try:
+        noises = parse_grid(args.noise)
+        smoothers = parse_grid(args.smooth, args.ksizes)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be >= 1")
+    if args.min_images < 1:
+        parser.error("--min-images must be >= 1")
+
+    if args.source.endswith(".npy"):
+        # the path, not the pixels: every worker memory-maps the stack
+        images = args.source
+        count = len(np.load(images, mmap_mode="r"))
+    else:
+        _, paths = collect_inputs(args.source, IMAGE_EXTS)
+        images = [str(p) for p in paths]
+        count = len(images)
+    if not count:
+        parser.error(f"no images found in {args.source!r}")
+
+    def report(done: int, total: int):
+        print(f"\r{done}/{total} image(s)", end="", file=sys.stderr, flush=True)
+
+    print(
+        f"{len(noises)} noise x {len(smoothers)} smoother config(s) on {count} image(s)",
+        file=sys.stderr,
+    )
+    try:
+        scores = run_sweep(
+            images,
+            noises,
+            smoothers,
+            workers=args.workers,
+            seed=args.seed,
+            prune_db=None if args.no_prune else args.prune_db,
+            min_images=args.min_images,
+            progress=None if args.quiet else report,
+        )
+    except ValueError as e:
+        print(f"\nFAILED: {e}", file=sys.stderr)
+        return 1
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(format_table(scores, args.rank, args.top))
+    if args.out:
+        write_results(args.out, scores, args.rank)
+        print(f"Wrote {len(scores)} result(s) to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
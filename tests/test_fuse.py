@@ -0,0 +1,36 @@
+"""Fused chains behave like the unfused steps, errors included."""
+
+import numpy as np
+import pytest
+
+from filters.chain import Step, run_chain
+from filters.fuse import FusedStep, plan_chain
+from filters.sharp.laplace import Laplacian
+from filters.smooth.gauss import Gaussian
+
+
+def _chain(strength):
+    return [Step("gauss", Gaussian, {"ksize": 3}), Step("laplace", Laplacian, {"strength": strength})]
+
+
+def _image() -> np.ndarray:
+    return np.random.default_rng(0).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+
+
+def test_negative_laplace_strength_raises_fused_and_unfused():
+    steps = _chain(-1.0)
+    with pytest.raises(ValueError, match="strength must be >= 0"):
+        run_chain(_image(), steps)
+    with pytest.raises(ValueError, match="strength must be >= 0"):
+        run_chain(_image(), plan_chain(steps))
+
+
+def test_fused_laplace_matches_unfused():
+    steps = _chain(0.5)
+    plan = plan_chain(steps)
+    assert len(plan) == 1 and isinstance(plan[0], FusedStep)
+    fused = run_chain(_image(), plan).astype(int)
+    unfused = run_chain(_image(), steps).astype(int)
+    # unfused, the gauss output is rounded to uint8 (up to 0.5 off), and
+    # the Laplacian's absolute weights (1 + 8 * 0.5) amplify that
+    assert np.abs(fused - unfused).max() <= 3
@@ -0,0 +1,36 @@
+"""Sobel sharpening against a float64 reference, large apertures included."""
+
+import numpy as np
+import cv2
+import pytest
+
+from filters.sharp.sobel import Sobel
+
+
+def _image() -> np.ndarray:
+    rng = np.random.default_rng(0)
+    small = rng.integers(0, 256, (16, 16), dtype=np.uint8)
+    return cv2.resize(small, (128, 128), interpolation=cv2.INTER_CUBIC)
+
+
+def _reference(gray: np.ndarray, ksize: int) -> np.ndarray:
+    """img + sat(|gx|) + sat(|gy|), saturated, with float64 derivatives."""
+    gx = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=ksize)
+    gy = cv2.Sobel(gray, cv2.CV_64F, 0, 1, ksize=ksize)
+    mag = np.rint(np.minimum(np.abs(gx), 255)) + np.rint(np.minimum(np.abs(gy), 255))
+    return np.clip(gray + np.minimum(mag, 255), 0, 255).astype(np.uint8)
+
+
+@pytest.mark.parametrize("ksize", [3, 7, 15, 21, 31])
+def test_sobel_matches_float64_reference(ksize):
+    gray = _image()
+    out = Sobel(gray, ksize)
+    ref = _reference(gray, ksize)
+    # float32 derivatives may round differently by one level
+    assert np.abs(out.astype(int) - ref).max() <= 1
+
+
+@pytest.mark.parametrize("ksize", [21, 31])
+def test_large_aperture_still_sharpens(ksize):
+    gray = _image()
+    assert (Sobel(gray, ksize).astype(int) - gray).mean() > 100